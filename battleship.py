@@ -4,24 +4,212 @@
     100. Start game.
     120. Random shots
     140. Display shots
-    200. Start displaying statistics.
-    300. Update display with every shot.
+    200. Start displaying statistics (streaming statistics, see gamestats.py).
+    300. Update display with every shot (live view, see live.py).
     1000. Add ability to: save game mid-session,
 """
 
 # Import statements
 from setup_battleship import *
+from bitboard import *
+from density import *
+from fleets import *
+from gamestats import *
+from live import *
+from lockstep import *
+from shotlog import *
+from collections import deque
+import importlib
+import instrument
+import random
 import sys
+import time
 
 
-def find_available_spot(max_x, max_y, shot_grid):
+def create_cell_pool(max_x, max_y, parity = None, spacing = 2):
+    """Create pool of untried grid spots that supports constant time random draw and removal
+       Spots are kept in a list; a dictionary maps each spot to its position in the list
+       so a spot can be removed by swapping the last spot into its place.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       parity: None for every spot, 0 for spots where x + y is even, 1 for spots where x + y is odd
+       spacing: with parity, keep spots where (x + y) % spacing == parity instead; a ship at
+                least spacing spots long always covers one of them (lattice used for hunting)
+
+       Return:
+       pool: tuple of (spots, index) where spots is list of (x, y) and index maps (x, y) to list position
+    """
+    spots = []
+    index = {}
+    y = 1
+    while y <= max_y:
+        x = 1
+        while x <= max_x:
+            if parity is None or (x + y) % spacing == parity:
+                index[(x, y)] = len(spots)
+                spots.append((x, y))
+            x = x + 1
+        y = y + 1
+    return (spots, index)
+
+
+def pool_remove(pool, xy):
+    """Remove a spot from a cell pool if it is still there
+
+       Parameters:
+       pool: cell pool from create_cell_pool
+       xy: (x, y) spot to remove
+
+       Return:
+       nothing
+    """
+    (spots, index) = pool
+    position = index.pop(xy, None)
+    if position is None:
+        return
+    last = spots.pop()
+    if position < len(spots):   # move last spot into the hole left by the removed spot
+        spots[position] = last
+        index[last] = position
+
+
+def pool_random_choice(pool, rng = random):
+    """Pick a random untried spot from a cell pool
+       The spot stays in the pool until the shot is recorded by mark_shot_taken.
+
+       Parameters:
+       pool: cell pool from create_cell_pool
+       rng: random number generator from create_rng
+
+       Return:
+       (x, y): random spot or None if pool is empty
+    """
+    (spots, index) = pool
+    if len(spots) == 0:
+        return None
+    return spots[rng.randrange(len(spots))]
+
+
+def create_shot_state(max_x, max_y, ships = None, rng = random, params = None):
+    """Create the per game state used by the shot patterns between shots
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ships: fleet from setup_ships; needed by the "density" pattern
+       rng: random number generator from create_rng used by every random shot of the game
+       params: optional dictionary of strategy settings (see SHOT_PARAMS); missing settings use defaults
+
+       Return:
+       shot_state: dictionary with untried spot pools and sweep position
+           "all": every untried spot
+           "even": untried spots where x + y is even
+           "odd": untried spots where x + y is odd
+           "cursor": spot number where top_left_to_bottom_right continues its sweep
+           "ships": fleet being shot at
+           "density": density state, only built when the "density" pattern first shoots
+           "smart": hunt/target state, only built when the "random_smart" pattern first shoots
+           "max_x", "max_y": size of grid
+           "log": open shot log to stream shots to (see shotlog.py) or None
+           "game_id": game number written with every logged shot
+           "rng": random number generator for this game
+           "registry": ship registry from create_ship_registry, or None; play_game then
+                       reports which ship every hit struck and when it sank
+           "event": (event, ship id) from register_shot for the latest shot, or None unless
+                    that shot was the first hit on a ship spot
+           "strategy": strategy choosing the shots (see start_strategy), set on the first shot
+           "params": strategy settings
+           "lattice": untried spots of a hunting lattice wider than even/odd, or None
+           "lattice_until": shots after which "lattice" stops hunting on its lattice
+    """
+    shot_state = {}
+    shot_state["log"] = None
+    shot_state["game_id"] = 0
+    shot_state["rng"] = rng
+    shot_state["registry"] = None
+    shot_state["event"] = None
+    shot_state["strategy"] = None
+    shot_state["params"] = {} if params is None else params
+    shot_state["lattice"] = None
+    shot_state["lattice_until"] = max_x * max_y
+    shot_state["max_x"] = max_x
+    shot_state["max_y"] = max_y
+    shot_state["smart"] = None
+    shot_state["ships"] = ships
+    shot_state["density"] = None
+    shot_state["cursor"] = max_x   # first spot is top left (see find_available_spot)
+    shot_state["all"] = create_cell_pool(max_x, max_y)
+    shot_state["even"] = create_cell_pool(max_x, max_y, 0)
+    shot_state["odd"] = create_cell_pool(max_x, max_y, 1)
+    return shot_state
+
+
+def mark_shot_taken(shot_state, max_x, x, y, hit, event = None):
+    """Remove a spot that has just been shot from every untried spot pool
+       and let the strategy in use observe the result
+
+       Parameters:
+       shot_state: per game state from create_shot_state
+       max_x: width of grid
+       x: horizontal location of shot
+       y: vertical location of shot
+       hit: boolean; True if shot hit a ship
+       event: (event, ship id) from register_shot, or None if not known
+
+       Return:
+       nothing
+    """
+    pool_remove(shot_state["all"], (x, y))
+    if (x + y) % 2 == 0:
+        pool_remove(shot_state["even"], (x, y))
+    else:
+        pool_remove(shot_state["odd"], (x, y))
+    if shot_state["lattice"] is not None:
+        pool_remove(shot_state["lattice"], (x, y))
+    strategy = shot_state["strategy"]
+    if strategy is not None and strategy["observe"] is not None:
+        strategy["observe"](shot_state, x, y, hit, event)
+
+
+def mark_ship_sunk(shot_state, spots):
+    """Forget hits on a ship that has just sunk so "random_smart" stops shooting around it
+       Targets are queued again around any hits left on other ships, or hunting starts again.
+
+       Parameters:
+       shot_state: per game state from create_shot_state
+       spots: spot numbers (y - 1) * max_x + (x - 1) of sunk ship (from the ship registry)
+
+       Return:
+       nothing
+    """
+    smart_state = shot_state["smart"]
+    if smart_state is None:
+        return
+    max_x = shot_state["max_x"]
+    hits = smart_state["hits"]
+    for c in spots:
+        hits.discard((c % max_x + 1, c // max_x + 1))
+    smart_state["line"].clear()
+    smart_state["frontier"].clear()
+    left = list(hits)
+    hits.clear()
+    for (x, y) in left:
+        try_to_sink_ship(shot_state, x, y)
+
+
+def find_available_spot(max_x, max_y, shot_grid, shot_state):
     """Find location on grid to shoot
        Return that grid location
+       The sweep continues from the cursor kept in shot_state so spots
+       already passed are never checked again.
 
        Parameters:
        max_x:
        max_y:
-       shot_grid: 
+       shot_grid: not read; untried spots come from the pool in shot_state
+       shot_state: per game state holding the sweep "cursor" and untried spot pools
 
        Return:
        (x, y): shot location
@@ -29,7 +217,8 @@ def find_available_spot(max_x, max_y, shot_grid):
     game_over = False
 
     last_spot =  max_x * (max_y + 1) - 1
-    spot = max_x 
+    spot = shot_state["cursor"]
+    (spots, untried) = shot_state["all"]
     
     while spot <= last_spot:
         x = spot % max_x + 1
@@ -38,66 +227,61 @@ def find_available_spot(max_x, max_y, shot_grid):
         if x == max_x and y == max_y:
             game_over = True
 
-        if shot_grid[y][x] == NO_SHOT_CHAR:
+        if (x, y) in untried:
             break  # this is empty spot so return this value
         else:
             spot = spot + 1
             #print(shot_grid[y][x], x, y)
 
+    if instrument.stats is not None:
+        instrument.count("sweep_spots_skipped", spot - shot_state["cursor"])
+    shot_state["cursor"] = spot  # resume here next shot
     return (x, y)
 
 
-def find_random_even_spot(max_x, max_y, shot_grid, count):
+def find_random_even_spot(max_x, max_y, shot_grid, count, shot_state):
     """Select a spot for the shot where x + y is even so
        select every second spot on the diagonal so quickly cover half the grid
-       If spot was chosen previously, must select another spot
+       Spots are drawn from the pool of untried even spots so no spot is chosen twice
 
        Parameters:
        max_x: width of grid
        max_y: height of grid
        shot_grid: record of shots already taken
        count: number of shots already taken
+       shot_state: per game state with untried spot pools
 
        Return:
        (x, y, count): tuple with shot locations x,y and updated count of shots taken
     """
-    valid_choice = False
-    while not valid_choice:
-        (x, y) = generate_random_position(max_x, max_y)
-     
-        if shot_grid[y][x] == NO_SHOT_CHAR:
-            if count <= max_x * max_y / 2 and (x+y) % 2 == 0:
-                valid_choice = True
-            elif count > max_x * max_y / 2: #After all even spots taken, then guess randomly
-                valid_choice = True
+    xy = pool_random_choice(shot_state["even"], shot_state["rng"])
+    if xy is None: #After all even spots taken, then guess randomly
+        xy = pool_random_choice(shot_state["odd"], shot_state["rng"])
+    (x, y) = xy
 
     return (x, y, count)
 
 
-def find_random_odd_spot(max_x, max_y, shot_grid, count):
+def find_random_odd_spot(max_x, max_y, shot_grid, count, shot_state):
     """Select a spot for the shot where x + y is odd so
        select every second spot on the diagonal so quickly cover half the grid
-       If spot was chosen previously, must select another spot
+       Spots are drawn from the pool of untried odd spots so no spot is chosen twice
 
        Parameters:
        max_x: width of grid
        max_y: height of grid
        shot_grid: record of shots already taken
        count: number of shots already taken
+       shot_state: per game state with untried spot pools
 
        Return:
        (x, y, count): tuple with shot locations x,y and updated count of shots taken
 
     """
-    valid_choice = False
-    while not valid_choice:
-        (x, y) = generate_random_position(max_x, max_y)
-     
-        if shot_grid[y][x] == NO_SHOT_CHAR: 
-            if count <= max_x * max_y / 2 and (x+y) % 2 == 1:
-                valid_choice = True
-            elif count > max_x * max_y / 2: #After all odd spots taken, then guess randomly
-                valid_choice = True
+    xy = pool_random_choice(shot_state["odd"], shot_state["rng"])
+    if xy is None: #After all odd spots taken, then guess randomly
+        xy = pool_random_choice(shot_state["even"], shot_state["rng"])
+    (x, y) = xy
 
     return (x, y, count)
 
@@ -126,39 +310,68 @@ def update_orientation(orient, current):
             orient = "both"     # both orientations are possible
         elif orient == "horizontal" and current == "vertical":
             orient = "both"       # both orientations are possible
-        fi
-    fi
 
     return orient
 
 
-def determine_next_smart_shot(last_hit_xy, last_shot_xy, shot_grid, orient):
-    """Determine next shot based on last hit, last shot, shot grid and suspected ship orientation.
-       If orientation is vertical and spot above is available, then return that value.
-       If orientation is vertical and spot above is MISS, then return available spot below hit.
-       If orientation is horizontal and spot to left is available, then return that point.
-       If orientation is horizontal and spot to left is not available, then return spot to the right of hit.
+def create_smart_state():
+    """Create the hunt/target state used by the "random_smart" pattern
+
+       Return:
+       smart_state: dictionary with
+           "line": spots at either end of a line of hits; shot first
+           "frontier": untried spots next to unresolved hits
+           "hits": hits not yet resolved by emptying the frontier
+           "line_first": True to shoot past the ends of a line of hits before other neighbours
     """
+    smart_state = {}
+    smart_state["line"] = deque()
+    smart_state["frontier"] = deque()
+    smart_state["hits"] = set()
+    smart_state["line_first"] = True
+    return smart_state
 
-       
 
-    return(x, y)
+def determine_next_smart_shot(shot_state):
+    """Determine next shot from the spots queued around unresolved hits.
+       Spots at the ends of a line of hits are tried before other neighbours.
+       Spots that were shot since they were queued are skipped.
 
+       Parameters:
+       shot_state: per game state with "smart" state and untried spot pools
 
-def adjacent_hit(last_hit_xy, last_shot_xy, shot_grid):
-    """Determine if an adjacent row or column exists and if there was a previous hit 
-       adjacent to latest hit.
+       Return:
+       (x, y): next spot to shoot or None if nothing is queued (back to hunting)
+    """
+    smart_state = shot_state["smart"]
+    (spots, untried) = shot_state["all"]
+    skipped = 0
+    next_xy = None
+    for queue in (smart_state["line"], smart_state["frontier"]):
+        while len(queue) > 0 and next_xy is None:
+            xy = queue.popleft()
+            if xy in untried:
+                next_xy = xy
+            else:
+                skipped = skipped + 1
+    if instrument.stats is not None:
+        instrument.count("smart_targets_already_shot", skipped)
+    return next_xy
+
+
+def adjacent_hit(x, y, hits):
+    """Determine if there was a previous hit adjacent to latest hit.
 
        That is a good indication that the same ship was hit so we
        can guess what orientation the ship has.
 
        There is a small chance that the adjacent hit is on a different ship so also
-       need to handle that scenario.
+       need to handle that scenario ("both").
 
        Parameters:
-       last_hit_xy: (x, y) tuple with coordinates of last hit
-       last_shot_xy: (x, y) tuple with coords of last shot
-       shot_grid: record of all previous shots
+       x: horizontal location of latest hit
+       y: vertical location of latest hit
+       hits: set of (x, y) unresolved hits
 
        Return:
        a_hit: boolean - True if there was an adjacent hit 
@@ -167,67 +380,69 @@ def adjacent_hit(last_hit_xy, last_shot_xy, shot_grid):
     a_hit = False
     orient = "none"
 
-    #Check if row above exists and was a hit
-    if y >= 2:
-        if shot_grid[x][y - 1] != (NO_SHOT_CHAR or MISS_CHAR):
-            a_hit = True  # adjacent shot above is hit so ship orientation is vertical
-            orient = update_orientation (orient, "vertical")
-            print("____________________ ORIENT = vertical     DEBUG_F")
-
-    # Check if column exists to right and was a hit
-    if x <= 9:
-        if shot_grid[x + 1][y] != (NO_SHOT_CHAR or MISS_CHAR):
-            a_hit = True  # adjacent shot above is to right so ship orientation is horizontal
-            orient = update_orientation (orient, "horizontal")
-            print("____________________ ORIENT = horizontal    DEBUG_F")
-
-    #Check if row below exists and was a hit
-    if y <= 9:
-        if shot_grid[x][y + 1] != (NO_SHOT_CHAR or MISS_CHAR):
-            a_hit = True  # adjacent shot below is hit so ship orientation is vertical
-            orient = update_orientation (orient, "vertical")
-            print("____________________ ORIENT = vertical    DEBUG_F")
-
-    # Check if column exists to left and was a hit
-    if x >= 2:
-        if shot_grid[x - 1][y] != (NO_SHOT_CHAR or MISS_CHAR):
-            a = True  # adjacent shot above is to left so ship orientation is horizontal
-            orient = update_orientation (orient, "horizontal")
-            print("____________________ ORIENT = horizontal    DEBUG_F")
+    if (x, y - 1) in hits or (x, y + 1) in hits:
+        a_hit = True  # adjacent hit above or below so ship orientation is vertical
+        orient = update_orientation(orient, "vertical")
 
-    return (a_hit, orient)
+    if (x - 1, y) in hits or (x + 1, y) in hits:
+        a_hit = True  # adjacent hit to left or right so ship orientation is horizontal
+        orient = update_orientation(orient, "horizontal")
 
+    return (a_hit, orient)
 
-def try_to_sink_ship (last_hit_xy, last_shot_xy, shot_grid, count):
-    """Since last shot hit ship but did not sink it, search for adjacent shots that have also hit.
-       If those shots are found, determine the orientation of the ship and try on either side of the hits.
-       If no adjacent hits, then start one row above in grid (if row exists) and then work clockwise.
 
-       NEW  Or can create a list of adjacent possible shots and go through that list
-       testing every untried spot until ship sinks
+def queue_line_ends(shot_state, x, y, dx, dy):
+    """Queue the first spot past each end of the line of hits through (x, y)
 
        Parameters:
-       last_hit_xy: tuple with (x, y) co-ordinates of hit on ship
-       last_shot_xy: last attempt to hit ship
-       shot_grid: record of previous shots (so not overlap)
-       count: count of total shots taken
+       shot_state: per game state with "smart" state
+       x: horizontal location of latest hit
+       y: vertical location of latest hit
+       dx, dy: direction of the line, (1, 0) for horizontal or (0, 1) for vertical
 
        Return:
-       (x, y, count): next shot to take and incremented count
+       nothing
     """
+    smart_state = shot_state["smart"]
+    for step in (1, -1):
+        (end_x, end_y) = (x + step * dx, y + step * dy)
+        while (end_x, end_y) in smart_state["hits"]:
+            (end_x, end_y) = (end_x + step * dx, end_y + step * dy)
+        if 1 <= end_x <= shot_state["max_x"] and 1 <= end_y <= shot_state["max_y"]:
+            smart_state["line"].appendleft((end_x, end_y))
 
-    (a_hit, orient) =  adjacent_hit(last_hit_xy, last_shot_xy, shot_grid)
 
-    if a_hit == True:
-        (x, y) = determine_next_smart_shot(last_hit_xy, last_shot_xy, shot_grid, orient)
-    else:
-        (x, y) = determine_next_smart_shot(last_hit_xy, last_shot_xy, shot_grid, orient)
+def try_to_sink_ship(shot_state, x, y):
+    """Since last shot hit ship but did not sink it, search for adjacent shots that have also hit.
+       If those shots are found, determine the orientation of the ship and queue the spots
+       on either side of the line of hits so they are tried first.
+       Every neighbour of the hit is also queued in case the orientation guess is wrong.
 
-    return (x, y)
+       Parameters:
+       shot_state: per game state with "smart" state
+       x: horizontal location of latest hit
+       y: vertical location of latest hit
+
+       Return:
+       nothing
+    """
+    smart_state = shot_state["smart"]
+    (a_hit, orient) = adjacent_hit(x, y, smart_state["hits"])
+    smart_state["hits"].add((x, y))
+
+    if not smart_state["line_first"]:
+        orient = "none"
+    if orient == "horizontal" or orient == "both":
+        queue_line_ends(shot_state, x, y, 1, 0)
+    if orient == "vertical" or orient == "both":
+        queue_line_ends(shot_state, x, y, 0, 1)
 
+    for (next_x, next_y) in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):  # above then clockwise
+        if 1 <= next_x <= shot_state["max_x"] and 1 <= next_y <= shot_state["max_y"]:
+            smart_state["frontier"].append((next_x, next_y))
 
 
-def find_smart_random_spot(max_x, max_y, shot_grid, count, last_hit_xy, last_shot_xy):
+def find_smart_random_spot(max_x, max_y, shot_grid, count, last_hit_xy, last_shot_xy, shot_state):
     """Start game with random shots or after a ship sinks.
     
        When random shot hits ship, next shot should try to hit same ship
@@ -236,15 +451,10 @@ def find_smart_random_spot(max_x, max_y, shot_grid, count, last_hit_xy, last_sho
        If there are already two hits side by side then the smart shot is to try to get third 
        and fourth etc hits along that (vertical or horizontal) line until the ship sinks.
 
-       If just a single hit, there is no "best guess" at the next shot,  so start with shot 
-       above and move clockwise and try again
-
-       If next shot also hits, then figure out ship orientation and shot along that track.
-
-       So unlike other random shot selections, this function needs to track last successful hit 
-       so that next attempt can be based on that information.
-
-       Several ways to record last hit: either x,y co-ordinates or mark that somehow on shot_grid.
+       Spots to try are queued by try_to_sink_ship after every hit so choosing the next
+       shot never needs to look at the grid. When nothing is left queued the unresolved
+       hits are forgotten and hunting starts again on the even spots (every ship covers
+       at least one) before the odd spots.
 
        Parameters:
        max_x: width of grid
@@ -253,51 +463,310 @@ def find_smart_random_spot(max_x, max_y, shot_grid, count, last_hit_xy, last_sho
        count: number of shots already taken
        last_hit_xy: x,y co-ordinates tuple of last hit
        last_shot_xy: x,y co-ordinates tuple of last shot
+       shot_state: per game state with "smart" state and untried spot pools
 
        Return:
        (x, y, count): tuple with shot locations x,y and updated count of shots taken
     """
-    
-    valid_choice = False
-
-    while not valid_choice:
-        if last_hit_xy == (0,0): # if no previous shots have hit then take random shot
-            (x, y) = generate_random_position(max_x, max_y)  # take random shots when game starts or after a ship sinks
-     
-            if shot_grid[y][x] == NO_SHOT_CHAR:
-                valid_choice = True
+    if shot_state["smart"] is None:
+        shot_state["smart"] = create_smart_state()
+
+    xy = determine_next_smart_shot(shot_state)
+    if xy is None:
+        shot_state["smart"]["hits"].clear()  # take random shots when game starts or after a ship sinks
+        if shot_state["lattice"] is not None:
+            xy = pool_random_choice(shot_state["lattice"], shot_state["rng"])
+            if xy is None:
+                xy = pool_random_choice(shot_state["all"], shot_state["rng"])
         else:
-            (x, y) = try_to_sink_ship (last_hit_xy, last_shot_xy, shot_grid, count)
+            xy = pool_random_choice(shot_state["even"], shot_state["rng"])
+            if xy is None:
+                xy = pool_random_choice(shot_state["odd"], shot_state["rng"])
+    (x, y) = xy
 
-    print(x, y, count, "DEBUG_A")
     return (x, y, count)
 
 
-def find_random_spot(max_x, max_y, shot_grid, count):
+def find_random_spot(max_x, max_y, shot_grid, count, shot_state):
     """Select a random spot for the shot
-       If spot was chosen previously, must select another spot
+       Spots are drawn from the pool of untried spots so no spot is chosen twice
 
        Parameters:
        max_x: width of grid
        max_y: height of grid
        shot_grid: record of shots already taken
        count: number of shots already taken
+       shot_state: per game state with untried spot pools
 
        Return:
        (x, y, count): tuple with shot locations x,y and updated count of shots taken
 
     """
-    valid_choice = False
+    (x, y) = pool_random_choice(shot_state["all"], shot_state["rng"])
+
+    return (x, y, count)
+
+
+def find_density_spot(max_x, max_y, shot_grid, count, shot_state):
+    """Select the untried spot that the most remaining ship placements could cover
+       (see density.py). Density scores are built on the first shot of the game.
 
-    while not valid_choice:
-        (x, y) = generate_random_position(max_x, max_y)
-     
-        if shot_grid[y][x] == NO_SHOT_CHAR:
-            valid_choice = True
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       shot_grid: record of shots already taken
+       count: number of shots already taken
+       shot_state: per game state with fleet and density scores
+
+       Return:
+       (x, y, count): tuple with shot locations x,y and updated count of shots taken
+    """
+    if shot_state["density"] is None:
+        shot_state["density"] = create_density_state(max_x, max_y, shot_state["ships"], shot_state["rng"])
+
+    xy = best_density_spot(shot_state["density"], max_x)
+    if xy is None:
+        xy = pool_random_choice(shot_state["all"], shot_state["rng"])
+    (x, y) = xy
 
     return (x, y, count)
 
 
+def create_strategy(name, next_shot, observe = None, reset = None, next_bit = None):
+    """Create a shot strategy
+       A strategy keeps whatever it needs between shots in shot_state (under its own keys)
+       so nothing has to be worked out again from the shot grid.
+
+       Parameters:
+       name: pattern name used in "pattern=" and play_game
+       next_shot: function(shot_state) returning (x, y) of an untried spot
+       observe: optional function(shot_state, x, y, hit, event) called after every shot,
+                once the spot is out of the untried pools; event is (event, ship id)
+                from register_shot or None (see create_ship_registry)
+       reset: optional function(shot_state) called once at the start of every game
+       next_bit: optional function(board, rng) returning the spot number of an unshot spot
+                 from the masks of a bitboard alone; play_bitboard_game then needs no shot_state
+
+       Return:
+       strategy: dictionary with "name", "next_shot", "observe", "reset" and "next_bit"
+    """
+    return {"name": name, "next_shot": next_shot, "observe": observe, "reset": reset, "next_bit": next_bit}
+
+
+def register_strategy(strategy):
+    """Add a strategy to SHOT_STRATEGIES under its name (replacing any strategy of that name)
+
+       Return:
+       strategy: the strategy added
+    """
+    SHOT_STRATEGIES[strategy["name"]] = strategy
+    return strategy
+
+
+def load_strategy(name):
+    """Load a strategy from another module without editing this file
+       name is "module:attribute"; the module must be importable (next to this file
+       or on PYTHONPATH) and attribute is a strategy dictionary or a function returning one.
+
+       Parameters:
+       name: "module:attribute"
+
+       Return:
+       strategy: the loaded strategy, registered under name
+    """
+    (module_name, attribute) = name.split(":", 1)
+    found = getattr(importlib.import_module(module_name), attribute)
+    if callable(found):
+        found = found()
+    if not isinstance(found, dict) or not callable(found.get("next_shot")):
+        raise ValueError(f"{name} is not a strategy; expected a dictionary from create_strategy")
+    return register_strategy(create_strategy(name, found["next_shot"], found.get("observe"), found.get("reset"),
+                                             found.get("next_bit")))
+
+
+def get_strategy(name):
+    """Return the strategy for a pattern name, loading "module:attribute" names on first use
+
+       Return:
+       strategy: strategy dictionary, or None if name is not a known pattern
+    """
+    if name in SHOT_STRATEGIES:
+        return SHOT_STRATEGIES[name]
+    if ":" in name:
+        return load_strategy(name)
+    return None
+
+
+def start_strategy(shot_state, name, quiet = True):
+    """Look up the strategy for a game once and reset it
+       An unknown name shoots at random positions (and may repeat spots).
+
+       Parameters:
+       shot_state: per game state from create_shot_state
+       name: pattern name
+       quiet: boolean; True to suppress debug printing
+
+       Return:
+       strategy: strategy now in shot_state["strategy"]
+    """
+    strategy = get_strategy(name)
+    if strategy is None:
+        if not quiet:
+            print(name, "DEBUG_B")
+        strategy = create_strategy(name, unknown_next_shot)
+    shot_state["strategy"] = strategy
+    if strategy["reset"] is not None:
+        strategy["reset"](shot_state)
+    return strategy
+
+
+def sweep_next_shot(shot_state):
+    """Next shot of "top_left_to_bottom_right" (see find_available_spot)"""
+    return find_available_spot(shot_state["max_x"], shot_state["max_y"], None, shot_state)
+
+
+def random_next_shot(shot_state):
+    """Next shot of "random" (see find_random_spot)"""
+    return pool_random_choice(shot_state["all"], shot_state["rng"])
+
+
+def random_odd_next_shot(shot_state):
+    """Next shot of "random_odd" (see find_random_odd_spot)"""
+    (x, y, count) = find_random_odd_spot(shot_state["max_x"], shot_state["max_y"], None, 0, shot_state)
+    return (x, y)
+
+
+def random_even_next_shot(shot_state):
+    """Next shot of "random_even" (see find_random_even_spot)"""
+    (x, y, count) = find_random_even_spot(shot_state["max_x"], shot_state["max_y"], None, 0, shot_state)
+    return (x, y)
+
+
+def sweep_next_bit(board, rng):
+    """Next shot of "top_left_to_bottom_right" on a bitboard"""
+    return bb_first_unshot_spot(board)
+
+
+def random_next_bit(board, rng):
+    """Next shot of "random" on a bitboard"""
+    return bb_random_unshot_spot(board, rng)
+
+
+def random_odd_next_bit(board, rng):
+    """Next shot of "random_odd" on a bitboard: odd spots, then even spots"""
+    spot = bb_random_unshot_spot(board, rng, parity_mask(board["max_x"], board["max_y"], 1))
+    if spot is None:
+        spot = bb_random_unshot_spot(board, rng, parity_mask(board["max_x"], board["max_y"], 0))
+    return spot
+
+
+def random_even_next_bit(board, rng):
+    """Next shot of "random_even" on a bitboard: even spots, then odd spots"""
+    spot = bb_random_unshot_spot(board, rng, parity_mask(board["max_x"], board["max_y"], 0))
+    if spot is None:
+        spot = bb_random_unshot_spot(board, rng, parity_mask(board["max_x"], board["max_y"], 1))
+    return spot
+
+
+def lattice_pool(shot_state, spacing, offset):
+    """Put a pool of the untried spots where (x + y) % spacing == offset in shot_state["lattice"]"""
+    shot_state["lattice"] = create_cell_pool(shot_state["max_x"], shot_state["max_y"], offset % spacing, spacing)
+    for xy in list(shot_state["lattice"][0]):
+        if xy not in shot_state["all"][1]:
+            pool_remove(shot_state["lattice"], xy)
+
+
+def smart_reset(shot_state):
+    """Start "random_smart" with nothing queued
+       Settings: "hunt_spacing" (2 hunts even spots then odd; wider hunts a lattice then
+       every spot), "hunt_offset" and "line_first" (see create_smart_state)
+    """
+    params = shot_state["params"]
+    shot_state["smart"] = create_smart_state()
+    shot_state["smart"]["line_first"] = bool(params.get("line_first", True))
+    spacing = int(params.get("hunt_spacing", 2))
+    if spacing != 2:
+        lattice_pool(shot_state, spacing, int(params.get("hunt_offset", 0)))
+
+
+def smart_next_shot(shot_state):
+    """Next shot of "random_smart" (see find_smart_random_spot)"""
+    (x, y, count) = find_smart_random_spot(shot_state["max_x"], shot_state["max_y"], None, 0, None, None, shot_state)
+    return (x, y)
+
+
+def smart_observe(shot_state, x, y, hit, event):
+    """Queue spots around a hit; forget a ship's hits once it sinks"""
+    if hit:
+        try_to_sink_ship(shot_state, x, y)
+    if event is not None and event[0] != "hit":
+        mark_ship_sunk(shot_state, shot_state["registry"]["ships"][event[1]][3])
+
+
+def density_reset(shot_state):
+    """Start "density" with scores from every placement on the empty grid
+       Setting: "hit_weight" (defaults to DENSITY_HIT_WEIGHT)
+    """
+    shot_state["density"] = create_density_state(shot_state["max_x"], shot_state["max_y"], shot_state["ships"], shot_state["rng"],
+                                                 shot_state["params"].get("hit_weight", DENSITY_HIT_WEIGHT))
+
+
+def density_next_shot(shot_state):
+    """Next shot of "density" (see find_density_spot)"""
+    (x, y, count) = find_density_spot(shot_state["max_x"], shot_state["max_y"], None, 0, shot_state)
+    return (x, y)
+
+
+def density_observe(shot_state, x, y, hit, event):
+    """Take placements through a miss out of the scores, weight placements through a hit
+       and take a sunk ship out of the scores"""
+    update_density(shot_state["density"], shot_state["max_x"], x, y, hit)
+    if event is not None and event[0] != "hit":
+        sink_density_ship(shot_state["density"], shot_state["registry"]["ships"][event[1]][3])
+
+
+def lattice_reset(shot_state):
+    """Start "lattice"
+       Settings: "spacing" (2 is the even/odd parity), "offset" and "switch", the fraction of
+       the grid shot before the lattice gives way to uniform random shots (1.0 waits until
+       every lattice spot is tried)
+    """
+    params = shot_state["params"]
+    lattice_pool(shot_state, int(params.get("spacing", 2)), int(params.get("offset", 0)))
+    shot_state["lattice_until"] = round(float(params.get("switch", 1.0)) * shot_state["max_x"] * shot_state["max_y"])
+
+
+def lattice_next_shot(shot_state):
+    """Next shot of "lattice": random lattice spot, then random spot once lattice is done or switched off"""
+    xy = None
+    if shot_state["max_x"] * shot_state["max_y"] - len(shot_state["all"][0]) < shot_state["lattice_until"]:
+        xy = pool_random_choice(shot_state["lattice"], shot_state["rng"])
+    if xy is None:
+        xy = pool_random_choice(shot_state["all"], shot_state["rng"])
+    return xy
+
+
+def unknown_next_shot(shot_state):
+    """Next shot for an unknown pattern: any random position, tried or not"""
+    return generate_random_position(shot_state["max_x"], shot_state["max_y"], shot_state["rng"])
+
+
+SHOT_STRATEGIES = {}   # pattern name to strategy; start_strategy looks a game's strategy up once
+register_strategy(create_strategy("top_left_to_bottom_right", sweep_next_shot, next_bit = sweep_next_bit))
+register_strategy(create_strategy("random", random_next_shot, next_bit = random_next_bit))
+register_strategy(create_strategy("random_odd", random_odd_next_shot, next_bit = random_odd_next_bit))
+register_strategy(create_strategy("random_even", random_even_next_shot, next_bit = random_even_next_bit))
+register_strategy(create_strategy("random_smart", smart_next_shot, smart_observe, smart_reset))
+register_strategy(create_strategy("density", density_next_shot, density_observe, density_reset))
+register_strategy(create_strategy("lattice", lattice_next_shot, None, lattice_reset))
+
+SHOT_PARAMS = {   # settings every built in strategy reads from shot_state["params"], with defaults
+    "random_smart": {"hunt_spacing": 2, "hunt_offset": 0, "line_first": 1},
+    "density": {"hit_weight": DENSITY_HIT_WEIGHT},
+    "lattice": {"spacing": 2, "offset": 0, "switch": 1.0},
+}
+
+
 def determine_hit_or_miss(x, y, ship_grid, shot_grid):
     """Figure out if the shot landed in an empty spot
        or where a ship is located.
@@ -322,6 +791,9 @@ def all_ships_sunk(max_x, max_y, ship_grid, shot_grid, count):
     """Determine if all ships have been sunk
        Return boolean True or False
 
+       This scans the whole grid so games use the remaining ship spot counter
+       from play_game instead; keep this to verify the counter when debugging.
+
        Parameters:
        max_x:
        max_y:
@@ -347,66 +819,26 @@ def all_ships_sunk(max_x, max_y, ship_grid, shot_grid, count):
     #print("ALL SUNK=", all_sunk, "COUNT =", count)
     return all_sunk
 
- 
-
-def is_game_over(max_x, max_y, shot_pattern, count):
-    """
-    game_over = False
-    count = count + 1  # increment shot counter
-
-    if count >= max_x * max_y and shot_pattern == "top_left_to_bottom_right": 
-        game_over = True  # if shot count exceeds number of grid spots then game is over
-    elif count >= max_x * max_y and shot_pattern == "random":
-        game_over = True  # if shot count exceeds number of grid spots then game is over
-    elif count >= max_x * max_y / 2 and shot_pattern == "random_odd":
-        game_over = True
-    elif count >= max_x * max_y / 2 and shot_pattern == "random_even":
-        game_over = True
-    else:
-        pass
-
-    return(game_over, count)
-    """
- 
-    """ Move logic to new function 'all_ships_sunk'
-    See if all ships have been sunk. If yes then game is over
-    """
 
-def choose_shot(max_x, max_y, shot_grid, shot_pattern, count, last_hit_xy, last_shot_xy):
-    """Select location on grid to shoot
-       Return that grid location
+def choose_shot(shot_state, shot_pattern, quiet = False):
+    """Select location on grid to shoot with the strategy of the game (see SHOT_STRATEGIES)
+       The strategy is looked up and reset on the first shot of a game (see start_strategy).
 
        Parameters:
-       max_x:
-       max_y:
-       shot_grid: 
-       shot_pattern: 
-       count: 
+       shot_state: per game state from create_shot_state
+       shot_pattern: how shots are determined (see play_game)
+       quiet: boolean; True to suppress debug printing
 
        Return:
-       (x, y, game_over, count) = location of shot and boolean game over
+       (x, y): location of shot
     """
-    count = count + 1
+    strategy = shot_state["strategy"]
+    if strategy is None or strategy["name"] != shot_pattern:
+        strategy = start_strategy(shot_state, shot_pattern, quiet)   # once per game
+    return strategy["next_shot"](shot_state)
 
-    if shot_pattern == "top_left_to_bottom_right":
-        (x, y) = find_available_spot(max_x, max_y, shot_grid)
-    elif shot_pattern == "random":
-        (x, y, count) = find_random_spot(max_x, max_y, shot_grid, count)
-    elif shot_pattern == "random_odd":
-        (x, y, count) = find_random_odd_spot(max_x, max_y, shot_grid, count)
-    elif shot_pattern == "random_even":
-        (x, y, count) = find_random_even_spot(max_x, max_y, shot_grid, count)
-    elif shot_pattern == "random_smart":
-        (x, y, count) = find_smart_random_spot(max_x, max_y, shot_grid, count, last_hit_xy, last_shot_xy)
-
-    else:
-        print(shot_pattern, "DEBUG_B")
-        (x, y) = generate_random_position(max_x, max_y)
-
-    return (x, y, count)
 
-
-def play_game(max_x, max_y, ship_grid, shot_grid, shot_pattern, count, last_hit_xy, last_shot_xy, shot_history):
+def play_game(max_x, max_y, ship_grid, shot_grid, shot_pattern, count, last_hit_xy, last_shot_xy, shot_history, remaining, shot_state, quiet = False):
     """Generate shot location and track results on shot_grid.
        If shot hits then get another free shot?
        Concentrate on damaged ship or keep shooting randomly?
@@ -424,29 +856,236 @@ def play_game(max_x, max_y, ship_grid, shot_grid, shot_pattern, count, last_hit_
                "random_even": sum of row number and column number add to even number
                "random_odd": sum of row number and column number add to odd number
                "random_smart": continue trying to sink damaged ship
-               "manual": manually selected by player
+               "density": spot most remaining ship placements could cover
+               "manual": manually selected by player (shots sent to a game on server.py)
        count: if "random" need to count how many turns have been taken
+       shot_history: list that every shot is appended to, or None to keep no history
+                     (batch runs stream shots to shot_state["log"] instead)
+       remaining: number of ship spots not yet hit (from count_ship_cells at start of game)
+       shot_state: per game state from create_shot_state
+       quiet: boolean; True to suppress HIT/MISS debug printing (batch mode)
 
        Return:
-       game_over: boolean
+       (count, last_hit_xy, last_shot_xy, shot_history, remaining): updated game state;
+           game is over when remaining reaches 0
     """
 
-    # (game_over, count) = is_game_over(max_x, max_y, shot_pattern, count)
-
-    (x, y, count) = choose_shot(max_x, max_y, shot_grid, shot_pattern, count, last_hit_xy, last_shot_xy)
+    count = count + 1
+    (x, y) = choose_shot(shot_state, shot_pattern, quiet)
+    if not quiet:
+        print(x, y, count, "DEBUG_A")
 
-    shot_history.append((x, y))
+    if shot_history is not None:
+        shot_history.append((x, y))
+    last_shot_xy = (x, y)
     
     hit = determine_hit_or_miss(x, y, ship_grid, shot_grid)
+    event = None
+    if hit and shot_grid[y][x] == NO_SHOT_CHAR:
+        remaining = remaining - 1     # only first hit on a ship spot counts
+        if shot_state["registry"] is not None:
+            event = register_shot(shot_state["registry"], x, y)
+    shot_state["event"] = event
+    mark_shot_taken(shot_state, max_x, x, y, hit, event)
+    if shot_state["log"] is not None:
+        log_shot(shot_state["log"], shot_state["game_id"], max_x, x, y, hit, ship_grid[y][x])
     if hit:
         shot_grid[y][x] = ship_grid[y][x] #update shot grid to show hit ship character
-        print("......................   HIT   DEBUG_C")
-        last_hit_xy = last_shot_xy        # Update last hit xy to be last shot
+        if not quiet:
+            print("......................   HIT   DEBUG_C")
+            if event is not None and event[0] != "hit":
+                print("......................   SUNK", shot_state["registry"]["ships"][event[1]][1].upper(), "  DEBUG_E")
+        last_hit_xy = (x, y)        # Update last hit xy to be this shot
     else:
         shot_grid[y][x] = MISS_CHAR #update shot grid to show a miss
-        print("......................   MISS   DEBUG_D")
+        if not quiet:
+            print("......................   MISS   DEBUG_D")
+
+    return (count, last_hit_xy, last_shot_xy, shot_history, remaining)
 
-    return (count, last_hit_xy, last_shot_xy, shot_history)
+
+def play_headless_game(max_x, max_y, ship_grid, shot_pattern, ships, shot_log = None, game_id = 0, rng = random, layout = None, params = None):
+    """Play one complete game against an already populated ship grid without printing
+       The ship grid is only read so the same fleet can be played by several patterns.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ship_grid: grid with placed ships
+       shot_pattern: how shots are determined (see play_game)
+       ships: fleet placed on ship grid (from setup_ships)
+       shot_log: optional open shot log (see shotlog.py) to stream every shot to
+       game_id: game number written with every logged shot
+       rng: random number generator from create_rng
+       layout: optional ship layout filled in by place_ships; gives the game a ship
+               registry so sunk ships are known (see play_game)
+       params: optional strategy settings (see SHOT_PARAMS)
+
+       Return:
+       count: number of shots taken to sink all ships
+    """
+    count = 0
+    last_hit_xy = (0, 0)
+    last_shot_xy = (0, 0)
+    shot_history = None   # no in-memory history; use shot_log to keep shots
+    remaining = count_ship_cells(ships)
+    (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+    shot_state = create_shot_state(max_x, max_y, ships, rng, params)
+    shot_state["log"] = shot_log
+    shot_state["game_id"] = game_id
+    if layout is not None:
+        shot_state["registry"] = create_ship_registry(max_x, ships, layout)
+
+    while remaining > 0:
+        (count, last_hit_xy, last_shot_xy, shot_history, remaining) = play_game(max_x, max_y, ship_grid, shot_grid, shot_pattern, count, last_hit_xy, last_shot_xy, shot_history, remaining, shot_state, True)
+
+    return count
+
+
+def play_bitboard_game(board, shot_pattern, ships, shot_log = None, game_id = 0, rng = random, layout = None, params = None):
+    """Play one complete game on a bitboard without printing
+       Hits, misses and game over are bit operations; no grid of characters is used.
+       Strategies with a "next_bit" function also pick every shot from the board masks;
+       other strategies get a shot_state as in play_game.
+
+       Parameters:
+       board: bitboard with ships placed (see bitboard.py)
+       shot_pattern: how shots are determined (see play_game)
+       ships: fleet placed on board (from setup_ships)
+       shot_log: optional open shot log (see shotlog.py) to stream every shot to
+       game_id: game number written with every logged shot
+       rng: random number generator from create_rng
+       layout: optional ship layout filled in by bb_place_ships; gives a strategy using
+               shot_state a ship registry so sunk ships are known (see play_game)
+       params: optional strategy settings (see SHOT_PARAMS)
+
+       Return:
+       count: number of shots taken to sink all ships
+    """
+    max_x = board["max_x"]
+    count = 0
+    shot_state = None
+    strategy = get_strategy(shot_pattern)
+    next_bit = strategy["next_bit"] if strategy is not None else None
+    if next_bit is None:
+        shot_state = create_shot_state(max_x, board["max_y"], ships, rng, params)
+        if layout is not None:
+            shot_state["registry"] = create_ship_registry(max_x, ships, layout)
+        strategy = start_strategy(shot_state, shot_pattern)
+
+    while not bb_all_ships_sunk(board):
+        count = count + 1
+        if shot_state is None:
+            spot = next_bit(board, rng)
+            hit = bb_shoot_spot(board, spot)
+        else:
+            (x, y) = strategy["next_shot"](shot_state)
+            spot = (y - 1) * max_x + (x - 1)
+            first = board["shots"] >> spot & 1 == 0
+            hit = bb_shoot_spot(board, spot)
+            event = None
+            if hit and first and shot_state["registry"] is not None:
+                event = register_shot(shot_state["registry"], x, y)   # only first hit on a ship spot counts
+            shot_state["event"] = event
+            mark_shot_taken(shot_state, max_x, x, y, hit, event)
+        if shot_log is not None:
+            (x, y) = (spot % max_x + 1, spot // max_x + 1)
+            log_shot(shot_log, game_id, max_x, x, y, hit, bb_ship_char(board, x, y) if hit else EMPTY_CHAR)
+
+    return count
+
+
+def run_games(n, max_x, max_y, num_groups, shot_pattern, seed = None, backend = "grid", log_file = None, first_game = 0, params = None,
+              fleets = None):
+    """Play n complete games without printing anything (batch mode)
+       Used to evaluate shot patterns over many games.
+
+       Parameters:
+       n: number of games to play
+       max_x: width of grid
+       max_y: height of grid
+       num_groups: number of ship groups passed to setup_ships
+       shot_pattern: how shots are determined (see play_game)
+       seed: optional seed so runs can be repeated; game g places its fleet with stream
+             create_rng(seed, g) and shoots with stream create_rng(seed, g, shot_pattern),
+             the streams a tournament uses, so any single game can be repeated on its own.
+             Without a seed one is drawn from the random module.
+       backend: "grid" for lists of characters, "bitboard" for integer bitboards or "numpy"
+                for batches played in lockstep (see lockstep.py; no shot log)
+       log_file: optional file name; every shot of every game is appended to it (see shotlog.py)
+       first_game: number of the first game (to repeat later games of an earlier run)
+       params: optional strategy settings (see SHOT_PARAMS; not used by the "numpy" backend)
+       fleets: optional fleet corpus file name (see fleets.py); game g plays fleet g of the corpus
+               instead of placing ships with create_rng(seed, g); shots are the same.
+               Grid size and ship groups must match the corpus. Not used by the "numpy" backend.
+
+       Return:
+       stats: statistics record from create_game_stats with every game added
+              (its number as game); a game whose ships could not be placed
+              only counts in stats["timeouts"]
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if backend == "numpy":
+        return run_lockstep_games(n, max_x, max_y, num_groups, shot_pattern, seed, first_game)
+
+    (max_x, max_y) = set_grid_size(max_x, max_y)
+    ships = setup_ships(num_groups)
+    stats = create_game_stats(max_x, max_y)
+    shot_log = None
+    corpus = None
+    try:
+        if log_file is not None:
+            shot_log = open_shot_log(log_file)
+        if fleets is not None:
+            corpus = open_fleet_corpus(fleets)
+
+        game = first_game
+        while game < first_game + n:
+            start = time.perf_counter()
+            count = 0
+            rng = create_rng(seed, game, shot_pattern)
+
+            if corpus is not None:
+                layout = corpus_layout(corpus, game)
+                timeout = layout is None
+                placed = time.perf_counter()
+                if not timeout and backend == "bitboard":
+                    count = play_bitboard_game(layout_bitboard(max_x, max_y, ships, layout), shot_pattern, ships, shot_log, game, rng, layout, params)
+                elif not timeout:
+                    ship_grid = layout_ship_grid(max_x, max_y, layout)
+                    count = play_headless_game(max_x, max_y, ship_grid, shot_pattern, ships, shot_log, game, rng, layout, params)
+            elif backend == "bitboard":
+                layout = []
+                (board, timeout) = bb_place_ships(create_bitboard(max_x, max_y, ships), ships, create_rng(seed, game), layout)
+                placed = time.perf_counter()
+                if not timeout:
+                    count = play_bitboard_game(board, shot_pattern, ships, shot_log, game, rng, layout, params)
+            else:
+                (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+                layout = []
+                (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(seed, game), layout)
+                placed = time.perf_counter()
+                if not timeout:
+                    count = play_headless_game(max_x, max_y, ship_grid, shot_pattern, ships, shot_log, game, rng, layout, params)
+
+            end = time.perf_counter()
+            if timeout:
+                stats["timeouts"] = stats["timeouts"] + 1
+            else:
+                add_game_stats(stats, count, end - start, game)
+            if instrument.stats is not None:
+                instrument.add_phase("setup", placed - start)
+                instrument.add_phase("shooting", end - placed)
+                instrument.count("games")
+                instrument.count("shots", count)
+            game = game + 1
+    finally:
+        if shot_log is not None:
+            close_shot_log(shot_log)
+        if corpus is not None:
+            close_fleet_corpus(corpus)
+    return stats
 
 
 def show_help():
@@ -459,11 +1098,73 @@ def show_help():
     print("Parameter to set grid width is 'x=' followed by number 5 through 26 inclusive")
     print("Parameter to set grid height is 'y=' followed by number 5 through 26 inclusive")
     print("One parameter is 'num=' followed by 0 through 4 inclusive for number of ship groups")
-    print("Another parameter is 'pattern=' followed by possible values of 'random' or 'random_even' or 'random_odd'")
+    print("Another parameter is 'pattern=' followed by one of", ", ".join(SHOT_STRATEGIES))
+    print("    or 'module:name' to load strategy 'name' from another module (see create_strategy)")
+    print("Parameter 'games=' followed by number of games to play in batch mode (defaults to 1)")
+    print("Parameter 'quiet' plays without printing grids or shots and only prints a summary")
+    print("Parameter 'board=' followed by 'grid' (default) or 'bitboard' or 'numpy' selects how boards are stored in batch mode")
+    print("    ('numpy' plays whole batches at once and needs numpy; patterns", ", ".join(LOCKSTEP_PATTERNS) + ")")
+    print("Parameter 'log=' followed by file name streams every shot to that file instead of keeping a shot history")
+    print("Parameter 'seed=' followed by a number makes the run repeatable (the seed used is always printed)")
+    print("Parameter 'game=' followed by a game number starts from that game of a seeded run, to repeat it alone")
+    print("Parameter 'params=' followed by 'name:value' pairs separated by ',' sets strategy settings, for example",
+          "'params=hunt_spacing:3' (see SHOT_PARAMS and optimize.py)")
+    print("Parameter 'fleets=' followed by a fleet corpus file (see fleets.py) plays its fleets instead of placing ships;",
+          "grid size and ship groups come from the file")
+    print("Parameter 'stats' prints time per phase and hot path counters per game and per shot at the end")
+    print("Parameter 'profile' also runs under cProfile and tracemalloc; 'profile=' followed by a file name prefix for the reports")
+    print("Parameter 'live' redraws only changed spots after every shot; 'live=' followed by frames per second (0 draws every shot)")
     print("For example, 'battleship.py x=20 y=15 num=2 pattern=random'")
     print("")
 
 
+def parse_params(text):
+    """Turn "name:value,name:value" into a dictionary of strategy settings
+       Values that look like whole numbers become int, other numbers float, anything else stays a string.
+
+    Parameters:
+    text: settings string, for example "hunt_spacing:3,line_first:0"
+
+    Return:
+    params: dictionary of setting name to value
+    """
+    params = {}
+    for item in text.split(','):
+        if item == "":
+            continue
+        (name, value) = item.split(':', 1)
+        try:
+            params[name] = int(value)
+        except ValueError:
+            try:
+                params[name] = float(value)
+            except ValueError:
+                params[name] = value
+    return params
+
+
+def params_text(params):
+    """Return settings in the form parse_params takes"""
+    return ",".join(f"{name}:{value}" for (name, value) in params.items())
+
+
+def unknown_params(shot_pattern, names):
+    """Return the setting names a built in shot pattern does not read (see SHOT_PARAMS)
+       Strategies loaded as "module:name" declare no settings so their names are not checked.
+
+    Parameters:
+    shot_pattern: how shots are determined
+    names: setting names
+
+    Return:
+    unknown: list of names the pattern would ignore
+    """
+    if ":" in shot_pattern:
+        return []
+    known = SHOT_PARAMS.get(shot_pattern, {})
+    return [name for name in names if name not in known]
+
+
 def handle_args(args): 
     """Handle arguments if any
     Check if "--h" or "-help" or "-h" or "--help" are included then display Help options and exit
@@ -473,14 +1174,40 @@ def handle_args(args):
     "y=B" where B is the height of the grid (defaults to 10)
     "num=X" for X number of ship groups
     "pattern=Y" for shot_pattern Y is "random" or "random_even" or "random"odd" or "top_left_to_bottom_right" etc
+                or "module:name" for a strategy from another module (see load_strategy)
+    "games=G" for G number of games to play in batch mode
+    "quiet" to play without printing grids or shots
+    "board=B" for board backend B in batch mode, "grid", "bitboard" or "numpy"
+    "log=F" to append every shot to shot log file F
+    "seed=S" for seed S so games can be repeated
+    "game=K" for number K of first game (each game has its own random stream, see create_rng)
+    "live" or "live=F" to watch a single game in a live view drawn at most F frames per second
+    "params=N:V,M:W" for strategy settings (see SHOT_PARAMS)
+    "fleets=F" to play the fleets of corpus file F; game K plays fleet K (see fleets.py)
+    "stats" to print phase times and hot path counters (see instrument.py)
+    "profile" or "profile=P" to also write cProfile and tracemalloc reports to files starting with P
 
 
     Parameters:
     args: full command line contents
+
+    Return:
+    (game_over, x, y, n, p, games, quiet, board, log, seed, first_game, live, stats, profile, params, fleets): tuple of settings
     """
     game_over = False
     n = 1  # set default in case ask for help
     p = "random" # set defaults in case ask for help
+    games = 1 # set default in case ask for help
+    quiet = False # set default in case ask for help
+    board = "grid" # set default in case ask for help
+    log = None # set default in case ask for help
+    seed = None # set default in case ask for help
+    first_game = 0 # set default in case ask for help
+    live = None # set default in case ask for help
+    stats = False # set default in case ask for help
+    profile = None # set default in case ask for help
+    params = None # set default in case ask for help
+    fleets = None # set default in case ask for help
 
     print("CLI=", args[:])
 
@@ -516,50 +1243,209 @@ def handle_args(args):
                 val4 = arg.split('=')   #split value to get string following the '=' sign
                 p = val4[1]
 
-    return (game_over, x, y, n, p)
+            if "games=" in arg:
+                val5 = arg.split('=')   #split value to get number following the '=' sign
+                games = int(val5[1])
+
+            if arg == "quiet":
+                quiet = True
+
+            if "board=" in arg:
+                val6 = arg.split('=')   #split value to get string following the '=' sign
+                board = val6[1]
+
+            if "log=" in arg:
+                val7 = arg.split('=')   #split value to get file name following the '=' sign
+                log = val7[1]
+
+            if "seed=" in arg:
+                val8 = arg.split('=')   #split value to get number following the '=' sign
+                seed = int(val8[1])
+
+            if "game=" in arg:
+                val9 = arg.split('=')   #split value to get number following the '=' sign
+                first_game = int(val9[1])
+
+            if arg == "live":
+                live = LIVE_FPS
+
+            if "live=" in arg:
+                val10 = arg.split('=')   #split value to get number following the '=' sign
+                live = int(val10[1])
+
+            if arg == "stats":
+                stats = True
+
+            if arg == "profile":
+                profile = instrument.PROFILE_PREFIX
+                stats = True
+
+            if "profile=" in arg:
+                val11 = arg.split('=')   #split value to get file name prefix following the '=' sign
+                profile = val11[1]
+                stats = True
+
+            if "params=" in arg:
+                params = parse_params(arg.split('=', 1)[1])   #settings follow the first '=' sign
+
+            if "fleets=" in arg:
+                fleets = arg.split('=', 1)[1]   #file name follows the first '=' sign
+
+    return (game_over, x, y, n, p, games, quiet, board, log, seed, first_game, live, stats, profile, params, fleets)
 
 
 
 def main():
-    game_over = False
+    (game_over, x, y, n, p, games, quiet, board, log, seed, first_game, live, stats, profile, params, fleets) = handle_args(sys.argv)   # handle command line arguments
+    shot_pattern = p
+    print("SHOT_PATTERN=", shot_pattern)
+    if seed is None:
+        seed = random.randrange(2 ** 32)   # still print it so this run can be repeated
+    try:
+        get_strategy(shot_pattern)   # load "module:name" strategies once, before any game
+    except (ImportError, AttributeError, TypeError, ValueError) as error:
+        print("PATTERN", shot_pattern, "COULD NOT BE LOADED:", error)
+        return
+    unknown = unknown_params(shot_pattern, params or {})
+    if unknown:
+        print("PARAMS", ", ".join(unknown), "NOT USED BY", shot_pattern, "    ",
+              "SETTINGS=", ", ".join(SHOT_PARAMS.get(shot_pattern, {})) or "none")
+        return
+    if fleets is not None and not game_over:
+        try:
+            (x, y, n) = corpus_settings(fleets, first_game + games)
+        except (OSError, ValueError) as error:
+            print("FLEETS", fleets, "COULD NOT BE READ:", error)
+            return
+
+    if stats:
+        instrument.enable_stats()
+    settings = (game_over, x, y, n, shot_pattern, games, quiet, board, log, seed, first_game, live, params, fleets)
+    if profile is not None:
+        instrument.profile_run(run_session, settings, profile)
+    else:
+        run_session(*settings)
+    if stats:
+        print("")
+        instrument.print_stats(instrument.disable_stats())
+
+
+def run_session(game_over, x, y, n, shot_pattern, games, quiet, board, log, seed, first_game, live, params = None, fleets = None):
+    """Play a batch of games or one displayed game with settings from handle_args
+
+       Return:
+       nothing
+    """
     max_x = 0
     max_y = 0
     count = 0  # initialize number of shots taken
     last_hit_xy = (0, 0) # initialize
     last_shot_xy = (0, 0)  # Initialize
     shot_history = []  # Initialize shot history list
-    (game_over, x, y, n, p) = handle_args(sys.argv)   # handle command line arguments
-    shot_pattern = p
-    print("SHOT_PATTERN=", shot_pattern)
 
-    if game_over == False:
-        # Set grid size and place ships on grid
-        (max_x, max_y) = set_grid_size(x, y)
-        (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
-        ships = setup_ships(n)
-        (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships)
+    if not game_over and games > 0 and (quiet or games > 1):
+        # Batch mode: play all games without printing then show summary
+        if board == "numpy" and not LOCKSTEP_AVAILABLE:
+            print("BOARD numpy NEEDS NUMPY; INSTALL IT WITH 'pip install numpy' OR USE board=grid")
+            return
+        if board == "numpy" and (shot_pattern not in LOCKSTEP_PATTERNS or log is not None or fleets is not None):
+            print("BOARD numpy PLAYS ONLY", LOCKSTEP_PATTERNS, "WITHOUT A SHOT LOG OR FLEET CORPUS; USE board=grid")
+            return
+        stats = run_games(games, x, y, n, shot_pattern, seed, board, log, first_game, params, fleets)
+        summary = summarize_game_stats(stats)
+        print(shot_pattern, "     ", "GAMES=", summary["games"], "    ", "SHIP GROUPS=", n, "    ",
+              "AVERAGE COUNT=", round(summary["mean"], 2), "    ",
+              "GAMES/SEC=", round(summary["games_per_second"], 1))
+        print("STD DEV=", round(summary["std_dev"], 2), "    ", "MIN=", summary["min"], "    ", "P50=", summary["p50"], "    ",
+              "P90=", summary["p90"], "    ", "P99=", summary["p99"], "    ", "MAX=", summary["max"], "    ", "SETUP TIMEOUTS=", summary["timeouts"])
+        print("SEED=", seed, "    ", "LONGEST GAME=", summary["max_game"], "    ", "COUNT=", summary["max"])
+        print_histogram(stats)
+        return
+
+    shot_log = None
+    try:
+        if game_over == False:
+            start = time.perf_counter()
+            # Set grid size and place ships on grid
+            (max_x, max_y) = set_grid_size(x, y)
+            (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+            ships = setup_ships(n)
+            rng = create_rng(seed, first_game, shot_pattern)   # same streams as this game of a batch run
+            print("SEED=", seed, "    ", "GAME=", first_game)
+            if fleets is None:
+                layout = []
+                (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(seed, first_game), layout)
+            else:
+                corpus = open_fleet_corpus(fleets)
+                (ship_grid, layout, timeout) = load_fleet(corpus, first_game)
+                close_fleet_corpus(corpus)
+                if timeout:
+                    (ship_grid, layout) = (empty_grid, [])
+            remaining = count_ship_cells(ships)  # ship spots not yet hit
         
-        if timeout:
-            game_over = True
-
-        print_grid(max_x, max_y, ship_grid)
-        print("")    # blank line after ship grid
-        (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
-        #print_grid(max_x, max_y, shot_grid)  #print empty shot grid
-
-    # Start playing game 
-    while not game_over:
-        (count, last_hit_xy, last_shot_xy, shot_history) = play_game(max_x, max_y, ship_grid, shot_grid, shot_pattern, count, last_hit_xy, last_shot_xy, shot_history)
-        game_over = all_ships_sunk(max_x, max_y, ship_grid, shot_grid, count)
-        # print_grid(max_x, max_y, shot_grid)
-
-    # if game was played (not "--h" in command line)
-    if count > 0:
-        print_grid(max_x, max_y, shot_grid)
-        print("")
-
-    print(shot_pattern,"     ", "GAME OVER","     "," SHIP GROUPS=", n, "    ", "COUNT=", count, "of", max_x * max_y)
-    print(shot_history, "DEBUG_J")
+            if timeout:
+                print('SETUP TIMEOUT')
+                game_over = True
+
+            (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+            shot_state = create_shot_state(max_x, max_y, ships, rng, params)
+            shot_state["game_id"] = first_game
+            shot_state["registry"] = create_ship_registry(max_x, ships, layout)
+            if log is not None:
+                shot_log = open_shot_log(log)
+                shot_state["log"] = shot_log
+                shot_history = None   # shots go to log file instead
+            setup = time.perf_counter()
+
+            if live is None:
+                print_grid(max_x, max_y, ship_grid)
+                print("")    # blank line after ship grid
+            #print_grid(max_x, max_y, shot_grid)  #print empty shot grid
+            if live is not None and not game_over:
+                cells = remaining
+                registry = shot_state["registry"]
+                view = create_live_view(max_x, max_y, live, None, lambda: (("COUNT", count), ("HITS", cells - remaining), ("REMAINING", remaining),
+                                                                          ("SUNK", len(ships) - registry["afloat"])))
+                live_draw_grid(view, shot_grid)
+            if instrument.stats is not None:
+                instrument.add_phase("setup", setup - start)
+                instrument.add_phase("display", time.perf_counter() - setup)
+                instrument.count("games")
+
+        # Start playing game 
+        start = time.perf_counter()
+        while not game_over:
+            (count, last_hit_xy, last_shot_xy, shot_history, remaining) = play_game(max_x, max_y, ship_grid, shot_grid, shot_pattern, count, last_hit_xy, last_shot_xy, shot_history, remaining, shot_state, live is not None)
+            game_over = remaining == 0
+            if live is not None:
+                (x, y) = last_shot_xy
+                live_update(view, x, y, shot_grid[y][x])
+            # print_grid(max_x, max_y, shot_grid)
+        if instrument.stats is not None:
+            instrument.add_phase("shooting", time.perf_counter() - start)
+            instrument.count("shots", count)
+
+        start = time.perf_counter()
+        if live is not None and count > 0:
+            live_close(view)
+        elif count > 0:   # if game was played (not "--h" in command line)
+            print_grid(max_x, max_y, shot_grid)
+            print("")
+            checked = time.perf_counter()
+            if not all_ships_sunk(max_x, max_y, ship_grid, shot_grid, count):
+                print("REMAINING SHIP SPOT COUNTER DISAGREES WITH GRID     DEBUG_K")
+            if instrument.stats is not None:
+                instrument.add_phase("end_of_game_check", time.perf_counter() - checked)
+                start = start + time.perf_counter() - checked   # leave check out of display time
+        if instrument.stats is not None and count > 0:
+            instrument.add_phase("display", time.perf_counter() - start)
+
+        print(shot_pattern,"     ", "GAME OVER","     "," SHIP GROUPS=", n, "    ", "COUNT=", count, "of", max_x * max_y)
+        if shot_history is not None and live is None:
+            print(shot_history, "DEBUG_J")
+    finally:
+        if shot_log is not None:
+            close_shot_log(shot_log)   # also when placement timed out or the game stopped early
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+
+""" Benchmark suite to catch performance regressions.
+    10. Time grid creation, ship placement at several fleet densities, loading fleets from a corpus,
+        per-shot latency of every shot pattern, replay of recorded games
+        and complete games on 5x5 through 26x26 grids (and lockstep batches when numpy is installed).
+    20. Every repetition reseeds the random number generator so it repeats the same work.
+    30. Warm up, repeat and keep the median and minimum of every benchmark.
+    40. Write results as JSON and compare against a saved baseline run.
+"""
+
+# Import statements
+from battleship import *
+from replay import create_replay, seek_replay
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+
+# Set constants
+BENCH_SEED = 12345
+BENCH_PATTERNS = ["top_left_to_bottom_right", "random", "random_odd", "random_even", "random_smart", "density"]
+BENCH_BOARD_SIZES = [5, 10, 15, 20, 26]
+BENCH_GAME_PATTERNS = ["random", "random_smart", "density"]
+BENCH_PLACEMENT_GROUPS = [1, 10, 25, 37]   # ship groups on 26x26: sparse through nearly full
+DEFAULT_REPEAT = 5
+DEFAULT_WARMUP = 1
+DEFAULT_THRESHOLD = 0.10   # flag benchmarks more than 10% slower than baseline
+
+
+def bench_create_grid(max_x, max_y, calls):
+    """Create empty grids
+
+       Return:
+       operations: number of grids created
+    """
+    n = 0
+    while n < calls:
+        create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+        n = n + 1
+    return calls
+
+
+def bench_place_ships(max_x, max_y, num_groups, calls):
+    """Place a fleet on an empty grid
+
+       Return:
+       operations: number of fleets placed (or timed out)
+    """
+    ships = setup_ships(num_groups)
+    n = 0
+    while n < calls:
+        (max_x, max_y, grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+        place_ships(max_x, max_y, grid, ships)
+        n = n + 1
+    return calls
+
+
+def bench_load_fleets(max_x, max_y, num_groups, calls):
+    """Load fleets from a fleet corpus as ready to play grids (compare with bench_place_ships)
+       The corpus is written before the timer starts.
+
+       Return:
+       (operations, seconds): number of fleets loaded and time spent loading
+    """
+    (handle, filename) = tempfile.mkstemp(suffix = ".bin")
+    os.close(handle)
+    try:
+        write_fleet_corpus(filename, calls, max_x, max_y, num_groups, BENCH_SEED, 1, calls)
+        start = time.perf_counter()
+        corpus = open_fleet_corpus(filename)
+        n = 0
+        while n < calls:
+            load_fleet(corpus, n)
+            n = n + 1
+        close_fleet_corpus(corpus)
+        seconds = time.perf_counter() - start
+    finally:
+        os.remove(filename)
+    return (calls, seconds)
+
+
+def bench_shots(max_x, max_y, shot_pattern, games):
+    """Play complete games and count shots so time per shot can be reported
+       Fleets are placed before the timer starts.
+
+       Return:
+       (operations, seconds): number of shots taken and time spent shooting
+    """
+    ships = setup_ships(1)
+    grids = []
+    while len(grids) < games:
+        (max_x, max_y, grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+        layout = []
+        (ship_grid, timeout) = place_ships(max_x, max_y, grid, ships, random, layout)
+        if not timeout:
+            grids.append((ship_grid, layout))
+
+    start = time.perf_counter()
+    shots = 0
+    for (ship_grid, layout) in grids:
+        shots = shots + play_headless_game(max_x, max_y, ship_grid, shot_pattern, ships, None, 0, random, layout)
+    return (shots, time.perf_counter() - start)
+
+
+def bench_replay(max_x, max_y, shot_pattern, games):
+    """Replay recorded games and seek to every shot so time per replayed shot can be reported
+       Games are played and recorded before the timer starts.
+
+       Return:
+       (operations, seconds): number of shots replayed and time spent replaying
+    """
+    ships = setup_ships(1)
+    recorded = []
+    while len(recorded) < games:
+        (max_x, max_y, grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+        layout = []
+        (ship_grid, timeout) = place_ships(max_x, max_y, grid, ships, random, layout)
+        if timeout:
+            continue
+        (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+        shot_state = create_shot_state(max_x, max_y, ships)
+        shot_state["registry"] = create_ship_registry(max_x, ships, layout)
+        shot_history = []
+        count = 0
+        last_hit_xy = (0, 0)
+        last_shot_xy = (0, 0)
+        remaining = count_ship_cells(ships)
+        while remaining > 0:
+            (count, last_hit_xy, last_shot_xy, shot_history, remaining) = play_game(max_x, max_y, ship_grid, shot_grid, shot_pattern, count, last_hit_xy, last_shot_xy, shot_history, remaining, shot_state, True)
+        recorded.append((ship_grid, shot_history))
+
+    start = time.perf_counter()
+    shots = 0
+    for (ship_grid, shot_history) in recorded:
+        replay = create_replay(max_x, max_y, ship_grid, shot_history)
+        n = 1
+        while n <= len(shot_history):
+            seek_replay(replay, n)
+            n = n + 1
+        shots = shots + len(shot_history)
+    return (shots, time.perf_counter() - start)
+
+
+def bench_games(max_x, max_y, shot_pattern, games, backend = "grid"):
+    """Play complete games including grid creation and ship placement
+
+       Return:
+       operations: number of games played
+    """
+    run_games(games, max_x, max_y, 1, shot_pattern, None, backend)
+    return games
+
+
+def list_benchmarks(quick = False):
+    """List every benchmark as (name, function, arguments)
+       Quick mode does less work per repetition for a fast smoke test.
+
+       Parameters:
+       quick: boolean; True for smaller workloads
+
+       Return:
+       benchmarks: list of (name, function, arguments) tuples
+    """
+    scale = 1 if quick else 10
+    benchmarks = []
+    benchmarks.append(("create_grid_10x10", bench_create_grid, (10, 10, 100 * scale)))
+    benchmarks.append(("create_grid_26x26", bench_create_grid, (26, 26, 20 * scale)))
+
+    for num_groups in BENCH_PLACEMENT_GROUPS:
+        calls = 1 if num_groups > 10 else 2 * scale
+        benchmarks.append((f"place_ships_26x26_num{num_groups}", bench_place_ships, (26, 26, num_groups, calls)))
+    benchmarks.append(("load_fleets_10x10", bench_load_fleets, (10, 10, 1, 100 * scale)))
+    benchmarks.append(("load_fleets_26x26_num10", bench_load_fleets, (26, 26, 10, 2 * scale)))
+
+    for pattern in BENCH_PATTERNS:
+        benchmarks.append((f"shot_{pattern}_10x10", bench_shots, (10, 10, pattern, 20 * scale)))
+    benchmarks.append(("replay_random_26x26", bench_replay, (26, 26, "random", 2 * scale)))
+
+    for size in BENCH_BOARD_SIZES:
+        for pattern in BENCH_GAME_PATTERNS:
+            games = max(1, (2 * scale * 100) // (size * size))
+            benchmarks.append((f"game_{pattern}_{size}x{size}", bench_games, (size, size, pattern, games)))
+
+    for size in [10, 26]:
+        for pattern in BENCH_GAME_PATTERNS:
+            games = max(1, (2 * scale * 100) // (size * size))
+            benchmarks.append((f"bitboard_{pattern}_{size}x{size}", bench_games, (size, size, pattern, games, "bitboard")))
+
+    if LOCKSTEP_AVAILABLE:
+        for size in [10, 26]:
+            benchmarks.append((f"lockstep_random_{size}x{size}", bench_games, (size, size, "random", 400 * scale, "numpy")))
+
+    return benchmarks
+
+
+def time_benchmark(function, arguments, repeat, warmup):
+    """Run one benchmark several times with the same seed
+       Garbage collection is turned off while timing (as timeit does) to reduce noise.
+
+       Parameters:
+       function: benchmark function; returns number of operations
+                 or (operations, seconds) when it times only part of its work
+       arguments: tuple of arguments for function
+       repeat: number of timed repetitions
+       warmup: number of untimed repetitions first
+
+       Return:
+       times: list of seconds per operation for every timed repetition
+    """
+    times = []
+    run = 0
+    while run < warmup + repeat:
+        random.seed(BENCH_SEED)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = function(*arguments)
+            seconds = time.perf_counter() - start
+        finally:
+            gc.enable()
+        if isinstance(result, tuple):
+            (operations, seconds) = result
+        else:
+            operations = result
+        if run >= warmup:
+            times.append(seconds / max(operations, 1))
+        run = run + 1
+    return times
+
+
+def run_benchmarks(repeat = DEFAULT_REPEAT, warmup = DEFAULT_WARMUP, quick = False, only = None):
+    """Run every benchmark and collect results
+
+       Parameters:
+       repeat: number of timed repetitions per benchmark
+       warmup: number of untimed repetitions per benchmark
+       quick: boolean; True for smaller workloads
+       only: optional text; run only benchmarks whose name contains it
+
+       Return:
+       report: dictionary ready to write as JSON
+    """
+    results = {}
+    for (name, function, arguments) in list_benchmarks(quick):
+        if only is not None and only not in name:
+            continue
+        times = time_benchmark(function, arguments, repeat, warmup)
+        results[name] = {"median": statistics.median(times), "min": min(times), "repeat": repeat}
+
+    report = {}
+    report["python"] = platform.python_version()
+    report["machine"] = platform.machine()
+    report["seed"] = BENCH_SEED
+    report["quick"] = quick
+    report["results"] = results
+    return report
+
+
+def compare_to_baseline(report, baseline, threshold = DEFAULT_THRESHOLD):
+    """Compare median time per operation of every benchmark to a baseline run
+
+       Parameters:
+       report: results from run_benchmarks
+       baseline: results from an earlier run_benchmarks (loaded from JSON)
+       threshold: fraction slower than baseline that counts as a regression
+
+       Return:
+       rows: list of (name, baseline median, current median, ratio, regressed) tuples
+    """
+    rows = []
+    for (name, result) in report["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["median"]
+        after = result["median"]
+        ratio = after / before if before > 0 else 1.0
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def print_report(report, rows = None):
+    """Print results and comparison with baseline if there is one
+
+       Parameters:
+       report: results from run_benchmarks
+       rows: optional comparison rows from compare_to_baseline
+
+       Return:
+       nothing
+    """
+    if rows is None:
+        print(f"{'BENCHMARK':<36}{'MEDIAN (us)':>14}{'MIN (us)':>14}")
+        for (name, result) in report["results"].items():
+            print(f"{name:<36}{result['median'] * 1e6:>14.2f}{result['min'] * 1e6:>14.2f}")
+    else:
+        print(f"{'BENCHMARK':<36}{'BASELINE (us)':>14}{'NOW (us)':>14}{'RATIO':>8}")
+        for (name, before, after, ratio, regressed) in rows:
+            flag = "  SLOWER" if regressed else ""
+            print(f"{name:<36}{before * 1e6:>14.2f}{after * 1e6:>14.2f}{ratio:>8.2f}{flag}")
+
+
+def handle_benchmark_args(args):
+    """Handle arguments if any
+    Arguments format is:
+    "output=F" to write results as JSON to file F
+    "baseline=F" to compare against JSON results saved in file F
+    "threshold=T" fraction slower than baseline that is flagged (defaults to 0.10)
+    "repeat=R" for R timed repetitions (defaults to 5)
+    "warmup=W" for W untimed repetitions (defaults to 1)
+    "only=N" to run only benchmarks whose name contains N
+    "quick" for smaller workloads
+
+    Parameters:
+    args: full command line contents
+
+    Return:
+    (output, baseline, threshold, repeat, warmup, only, quick): tuple of settings
+    """
+    output = None
+    baseline = None
+    threshold = DEFAULT_THRESHOLD
+    repeat = DEFAULT_REPEAT
+    warmup = DEFAULT_WARMUP
+    only = None
+    quick = False
+    for arg in args:
+        if arg.startswith("output="):
+            output = arg.split('=')[1]
+        if arg.startswith("baseline="):
+            baseline = arg.split('=')[1]
+        if arg.startswith("threshold="):
+            threshold = float(arg.split('=')[1])
+        if arg.startswith("repeat="):
+            repeat = max(int(arg.split('=')[1]), 1)
+        if arg.startswith("warmup="):
+            warmup = int(arg.split('=')[1])
+        if arg.startswith("only="):
+            only = arg.split('=')[1]
+        if arg == "quick":
+            quick = True
+    return (output, baseline, threshold, repeat, warmup, only, quick)
+
+
+def main():
+    (output, baseline, threshold, repeat, warmup, only, quick) = handle_benchmark_args(sys.argv[1:])
+    report = run_benchmarks(repeat, warmup, quick, only)
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(report, f, indent = 2)
+
+    if baseline is None:
+        print_report(report)
+        return
+
+    with open(baseline) as f:
+        rows = compare_to_baseline(report, json.load(f), threshold)
+    print_report(report, rows)
+    if any(row[4] for row in rows):
+        print("PERFORMANCE REGRESSION: benchmarks more than", int(threshold * 100), "percent slower than baseline")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
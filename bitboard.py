@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+
+""" Bitboard board backend.
+    Ships, shots and hits are kept as Python integers with one bit per grid spot,
+    bit number (y - 1) * max_x + (x - 1), so spot A-1 is bit 0.
+    10. Every ship placement is a precomputed mask so overlap is a single AND.
+    20. A shot is a hit if its bit is set in the ships mask.
+    30. Game is over when the hits mask equals the ships mask.
+    40. Grids of characters are only built when the board is displayed.
+    50. Sweep and random shots are picked from the mask of spots not yet shot.
+"""
+
+# Import statements
+from setup_battleship import *
+import functools
+import instrument
+import random
+
+# Set constants
+RANDOM_SPOT_TRIES = 4  # bb_random_unshot_spot draws spot numbers while at least 1 in this many spots is free
+
+
+def spot_bit(max_x, x, y):
+    """Return mask with only the bit for grid location (x, y) set
+
+       Parameters:
+       max_x: width of grid
+       x: horizontal location
+       y: vertical location
+
+       Return:
+       bit: integer mask
+    """
+    return 1 << ((y - 1) * max_x + (x - 1))
+
+
+def placement_mask(max_x, x, y, orientation, size):
+    """Build mask of every spot covered by a ship
+       (no range check; see does_ship_fit for the orientation values)
+
+       Parameters:
+       max_x: width of grid
+       x: horizontal location of ship end
+       y: vertical location of ship end
+       orientation: 1 upward, 2 downward, 3 leftward, 4 rightward
+       size: number of grid spots for ship size
+
+       Return:
+       mask: integer mask
+    """
+    mask = 0
+    n = 0
+    while n < size:
+        if orientation == 1:
+            mask = mask | spot_bit(max_x, x, y - n)
+        elif orientation == 2:
+            mask = mask | spot_bit(max_x, x, y + n)
+        elif orientation == 3:
+            mask = mask | spot_bit(max_x, x - n, y)
+        else:
+            mask = mask | spot_bit(max_x, x + n, y)
+        n = n + 1
+    return mask
+
+
+def create_bitboard(max_x, max_y, ships):
+    """Create empty bitboard for a fleet
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ships: list of tuples in form of (ship type, grid character, number of grid spots)
+
+       Return:
+       board: dictionary with
+           "max_x", "max_y": size of grid
+           "full": mask with every spot set
+           "ships": mask of spots with a ship
+           "shots": mask of spots shot at
+           "hits": mask of shots that hit a ship
+           "chars": dictionary of ship character to mask of its spots (for display)
+           "masks": dictionary of ship size to placements from the shared placement_index
+    """
+    board = {}
+    board["max_x"] = max_x
+    board["max_y"] = max_y
+    board["full"] = (1 << (max_x * max_y)) - 1
+    board["ships"] = 0
+    board["shots"] = 0
+    board["hits"] = 0
+    board["chars"] = {}
+    board["masks"] = {}
+    for (ship_type, ship_char, ship_size) in ships:
+        if ship_size not in board["masks"]:
+            board["masks"][ship_size] = placement_index(max_x, max_y, ship_size)
+    return board
+
+
+def bb_ship_overlap(board, mask):
+    """Does ship overlap with an existing ship on the board?
+
+       Parameters:
+       board: bitboard from create_bitboard
+       mask: placement mask of ship
+
+       Return:
+       ship_overlap: boolean; True if any spot already taken
+    """
+    return board["ships"] & mask != 0
+
+
+def bb_does_ship_fit(board, x, y, orientation, size):
+    """Does ship fit on board with this orientation at this location?
+
+       Parameters:
+       board: bitboard from create_bitboard
+       x: horizontal location of ship end
+       y: vertical location of ship end
+       orientation: 1 upward, 2 downward, 3 leftward, 4 rightward
+       size: number of grid spots for ship size
+
+       Return:
+       ship_fit: True if fits on board without overlap, otherwise False
+    """
+    max_x = board["max_x"]
+    max_y = board["max_y"]
+    ship_fit = False
+    if orientation == 1 and size <= y:
+        ship_fit = True
+    elif orientation == 2 and y + size <= max_y + 1:
+        ship_fit = True
+    elif orientation == 3 and size <= x:
+        ship_fit = True
+    elif orientation == 4 and size + x <= max_x + 1:
+        ship_fit = True
+
+    if ship_fit:
+        ship_fit = not bb_ship_overlap(board, placement_mask(max_x, x, y, orientation, size))
+    return ship_fit
+
+
+def bb_place_ships(board, ships, rng = random, layout = None):
+    """Place ships in order of largest to smallest, making the same draws as place_ships.
+       First draw random placements until each ship fits (see sample_ship_placements).
+       Only if sampling gives up, pick for every ship a random placement mask from those that do
+       not overlap ships already placed; if a ship has no placement left then take back the
+       previous ship and try another (backtracking).
+       Dense fleets and fleets the search gives up on are packed in lines (see pack_ships_in_lines).
+       Nothing is printed; callers report a timeout.
+
+       Parameters:
+       board: bitboard from create_bitboard
+       ships: list of tuples in form of (ship type, grid character, number of grid spots)
+       rng: random number generator from create_rng
+       layout: optional list; (ship character, spot numbers) of every ship placed is appended
+               in ship order (as place_ships does) so a ship registry can be built
+
+       Return:
+       (board, timeout): board with ships and True if ships could not be placed
+    """
+    timeout_counter = 1
+    timeout = False
+
+    max_x = board["max_x"]
+    max_y = board["max_y"]
+    if not fleet_can_fit(max_x, max_y, ships):
+        if instrument.stats is not None:
+            instrument.count("placement_timeouts")
+        return (board, True)
+
+    candidates = []
+    placed = []
+    rejected = 0        # placements that do not fit (instrument counters)
+    backtracks = 0
+    packed = 0
+    sampled = 0
+    empty = board["ships"] == 0
+    if empty and count_ship_cells(ships) > DENSE_FLEET_FILL * max_x * max_y:
+        placed = [p[4] for p in pack_ships_in_lines(max_x, max_y, ships, rng) or []]
+        packed = 1 if placed else 0
+    else:
+        (placements, sampled) = sample_ship_placements(max_x, max_y, ships, board["ships"], rng)
+        placed = [p[4] for p in placements or []]   # sampling gave up so search every placement below
+    for mask in placed:
+        board["ships"] = board["ships"] | mask
+    while len(placed) < len(ships) and not timeout:
+        depth = len(placed)
+        (type, char, size) = ships[depth]
+        if len(candidates) == depth:
+            occupied = board["ships"]
+            candidates.append([p[4] for p in board["masks"][size] if p[4] & occupied == 0])
+            rejected = rejected + len(board["masks"][size]) - len(candidates[depth])
+
+        if len(candidates[depth]) > 0:
+            timeout_counter = timeout_counter + 1
+            if timeout_counter > MAX_TIMEOUT:
+                timeout = True
+            options = candidates[depth]
+            i = rng.randrange(len(options))
+            mask = options[i]
+            options[i] = options[-1]
+            options.pop()
+            board["ships"] = board["ships"] | mask
+            placed.append(mask)
+        elif depth == 0:
+            timeout = True
+        else:
+            # No room for this ship so take back previous ship and try its next placement
+            backtracks = backtracks + 1
+            candidates.pop()
+            board["ships"] = board["ships"] & ~placed.pop()
+
+    if timeout and empty:
+        # Search gave up so take every ship back and try packing them in lines
+        for mask in placed:
+            board["ships"] = board["ships"] & ~mask
+        placed = [p[4] for p in pack_ships_in_lines(max_x, max_y, ships, rng) or []]
+        if placed:
+            timeout = False
+            packed = 1
+            for mask in placed:
+                board["ships"] = board["ships"] | mask
+
+    if instrument.stats is not None:
+        instrument.count("placements_sampled", sampled)
+        instrument.count("placements_tried", timeout_counter - 1)
+        instrument.count("placements_packed", packed)
+        instrument.count("placements_not_fitting", rejected)
+        instrument.count("placement_backtracks", backtracks)
+        if timeout:
+            instrument.count("placement_timeouts")
+
+    n = 0
+    while n < len(placed):
+        (type, char, size) = ships[n]
+        board["chars"][char] = board["chars"].get(char, 0) | placed[n]
+        if layout is not None and not timeout:
+            layout.append((char, mask_spots(placed[n])))
+        n = n + 1
+
+    return (board, timeout)
+
+
+def mask_spots(mask):
+    """Return spot numbers (y - 1) * max_x + (x - 1) of the bits set in a mask, lowest first"""
+    spots = []
+    while mask:
+        low = mask & -mask
+        spots.append(low.bit_length() - 1)
+        mask = mask ^ low
+    return tuple(spots)
+
+
+def bb_shoot(board, x, y):
+    """Record a shot on the board
+
+       Parameters:
+       board: bitboard from create_bitboard
+       x: horizontal location of shot
+       y: vertical location of shot
+
+       Return:
+       hit: boolean; True if shot hit a ship
+    """
+    return bb_shoot_spot(board, (y - 1) * board["max_x"] + (x - 1))
+
+
+def bb_shoot_spot(board, spot):
+    """Record a shot at spot number (y - 1) * max_x + (x - 1) (see bb_shoot)
+
+       Return:
+       hit: boolean; True if shot hit a ship
+    """
+    bit = 1 << spot
+    board["shots"] = board["shots"] | bit
+    hit = board["ships"] & bit != 0
+    if hit:
+        board["hits"] = board["hits"] | bit
+    return hit
+
+
+def bb_ship_char(board, x, y):
+    """Return character of ship at grid location or EMPTY_CHAR
+
+       Parameters:
+       board: bitboard with ships placed
+       x: horizontal location
+       y: vertical location
+
+       Return:
+       char: ship character
+    """
+    bit = spot_bit(board["max_x"], x, y)
+    for (char, mask) in board["chars"].items():
+        if mask & bit:
+            return char
+    return EMPTY_CHAR
+
+
+def bb_all_ships_sunk(board):
+    """Determine if all ships have been sunk
+
+       Parameters:
+       board: bitboard from create_bitboard
+
+       Return:
+       all_sunk: boolean
+    """
+    return board["hits"] == board["ships"]
+
+
+def bb_first_unshot_spot(board):
+    """Find lowest numbered spot that has not been shot (top left to bottom right)
+
+       Parameters:
+       board: bitboard from create_bitboard
+
+       Return:
+       spot: spot number, or None if every spot was shot
+    """
+    free = board["full"] & ~board["shots"]
+    if free == 0:
+        return None
+    return (free & -free).bit_length() - 1   # lowest set bit
+
+
+@functools.lru_cache(maxsize = PLACEMENT_CACHE_SIZE)
+def parity_mask(max_x, max_y, parity):
+    """Build mask of every spot where (x + y) % 2 == parity
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       parity: 0 for even spots, 1 for odd spots
+
+       Return:
+       mask: integer mask
+    """
+    mask = 0
+    for y in range(1, max_y + 1):
+        for x in range(1, max_x + 1):
+            if (x + y) % 2 == parity:
+                mask = mask | spot_bit(max_x, x, y)
+    return mask
+
+
+def nth_set_bit(mask, n):
+    """Return bit number of the n-th set bit of a mask, counting from 0 at the lowest
+       Halves the bits searched until one is left (mask must have more than n bits set).
+    """
+    low = 0
+    high = mask.bit_length()
+    while high - low > 1:
+        middle = (low + high) // 2
+        if (mask & ((1 << middle) - 1)).bit_count() > n:
+            high = middle
+        else:
+            low = middle
+    return low
+
+
+def bb_random_unshot_spot(board, rng = random, within = None):
+    """Pick a random spot that has not been shot, every such spot equally likely
+       Draws spot numbers until one is free; once few spots are free picks one by counting
+       through the free mask instead (see nth_set_bit).
+
+       Parameters:
+       board: bitboard from create_bitboard
+       rng: random number generator from create_rng
+       within: optional mask of spots to choose from (see parity_mask)
+
+       Return:
+       spot: spot number, or None if every spot was shot
+    """
+    free = board["full"] & ~board["shots"]
+    if within is not None:
+        free = free & within
+    if free == 0:
+        return None
+    cells = board["max_x"] * board["max_y"]
+    count = free.bit_count()
+    if count * RANDOM_SPOT_TRIES >= cells:   # expect at most RANDOM_SPOT_TRIES draws
+        while True:
+            spot = rng.randrange(cells)
+            if free >> spot & 1:
+                return spot
+    return nth_set_bit(free, rng.randrange(count))
+
+
+def bitboard_to_grid(board, show_ships = True):
+    """Build a grid of characters for display (same layout as create_initial_empty_grid)
+
+       Parameters:
+       board: bitboard from create_bitboard
+       show_ships: True for the ship grid, False for the shot grid
+
+       Return:
+       grid: list of rows
+    """
+    max_x = board["max_x"]
+    max_y = board["max_y"]
+    if show_ships:
+        (max_x, max_y, grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+    else:
+        (max_x, max_y, grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+
+    for (char, mask) in board["chars"].items():
+        if not show_ships:
+            mask = mask & board["hits"]
+        while mask:
+            c = (mask & -mask).bit_length() - 1
+            grid[c // max_x + 1][c % max_x + 1] = char
+            mask = mask & (mask - 1)
+
+    if not show_ships:
+        misses = board["shots"] & ~board["hits"]
+        while misses:
+            c = (misses & -misses).bit_length() - 1
+            grid[c // max_x + 1][c % max_x + 1] = MISS_CHAR
+            misses = misses & (misses - 1)
+    return grid
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+""" Probability density ("heat map") shot pattern.
+    10. List every placement of every ship size on the empty grid (shared between games).
+    20. Score every spot by how many placements still possible could cover it.
+    30. After a miss remove placements through that spot; after a hit give them more weight.
+    35. After a ship sinks remove every placement through its spots and count one fewer ship
+        of its size, so the scores only come from ships still afloat.
+    40. Shoot the untried spot with the highest score.
+
+    Only placements through the latest shot spot are changed after each shot so the
+    scores never need to be counted again from scratch.
+    The heap of spots only gets a new entry when a score goes up. An entry whose score has
+    gone down since is still an upper bound, so it is brought up to date when it reaches the top.
+"""
+
+# Import statements
+from setup_battleship import *
+import functools
+import heapq
+import instrument
+import random
+
+
+# Set constants
+DENSITY_HIT_WEIGHT = 20  # extra weight for every hit already inside a placement
+
+
+def spot_number(max_x, x, y):
+    """Convert grid location to spot number 0 (top left) through max_x * max_y - 1 (bottom right)
+
+       Parameters:
+       max_x: width of grid
+       x: horizontal location
+       y: vertical location
+
+       Return:
+       spot: spot number
+    """
+    return (y - 1) * max_x + (x - 1)
+
+
+@functools.lru_cache(maxsize = PLACEMENT_CACHE_SIZE)
+def density_geometry(max_x, max_y, sizes):
+    """List placements of a fleet on an empty grid and the placements through every spot
+       Built once per board size and fleet and shared by every game in the process.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       sizes: tuple of (ship size, number of ships of that size) pairs
+
+       Return:
+       (spots, multiple, through, score, by_size): tuples of spots covered by every placement,
+           number of ships of every placement size, placement numbers through every spot,
+           starting score of every spot and (ship size, first placement, end placement) ranges
+    """
+    spots = []
+    multiple = []
+    by_size = []
+    for (size, number) in sizes:
+        first = len(spots)
+        for (x, y, orientation, covered, mask) in placement_index(max_x, max_y, size):
+            spots.append(covered)
+            multiple.append(number)
+        by_size.append((size, first, len(spots)))
+
+    cells = max_x * max_y
+    through = [[] for c in range(cells)]
+    score = [0] * cells
+    placement = 0
+    while placement < len(spots):
+        for c in spots[placement]:
+            through[c].append(placement)
+            score[c] = score[c] + multiple[placement]
+        placement = placement + 1
+
+    return (tuple(spots), tuple(multiple), tuple(tuple(t) for t in through), tuple(score), tuple(by_size))
+
+
+def create_density_state(max_x, max_y, ships, rng = random, hit_weight = DENSITY_HIT_WEIGHT):
+    """Score every spot by the placements of the fleet on an empty grid
+       Placement geometry comes from density_geometry so only the changing
+       weights and scores are created for every game.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ships: list of tuples in form of (ship type, grid character, number of grid spots)
+       rng: random number generator from create_rng (breaks ties between equal scores)
+       hit_weight: extra weight for every hit already inside a placement
+
+       Return:
+       density_state: dictionary with
+           "spots": spot numbers covered by every placement
+           "weight": weight of every placement (0 once a miss rules it out)
+           "multiple": number of ships of the placement size
+           "afloat": dictionary of ship size to ships of that size not yet sunk
+           "by_size": (ship size, first placement, end placement) ranges
+           "hits": number of hits inside every placement
+           "through": placement numbers through every spot
+           "score": score of every spot
+           "tried": True for every spot already shot
+           "heap": heap of (-score, tie breaker, spot) entries; every untried spot has an entry
+                   at or above its score, some may be out of date
+           "rng": random number generator for tie breakers
+           "hit_weight": extra weight for every hit already inside a placement
+    """
+    sizes = {}
+    for (ship_type, ship_char, ship_size) in ships:
+        sizes[ship_size] = sizes.get(ship_size, 0) + 1
+    (spots, multiple, through, score, by_size) = density_geometry(max_x, max_y, tuple(sorted(sizes.items())))
+
+    cells = max_x * max_y
+    score = list(score)
+    heap = [(-score[c], rng.random(), c) for c in range(cells)]
+    heapq.heapify(heap)
+
+    density_state = {}
+    density_state["spots"] = spots
+    density_state["weight"] = list(multiple)
+    density_state["multiple"] = multiple
+    density_state["afloat"] = sizes
+    density_state["by_size"] = by_size
+    density_state["hits"] = [0] * len(spots)
+    density_state["through"] = through
+    density_state["score"] = score
+    density_state["tried"] = [False] * cells
+    density_state["heap"] = heap
+    density_state["rng"] = rng
+    density_state["hit_weight"] = hit_weight
+    return density_state
+
+
+def change_placement_weight(density_state, placement, weight):
+    """Set new weight for a placement and update score of every spot it covers
+       Spots whose score goes up get a new heap entry; lower scores are fixed in best_density_spot.
+
+       Parameters:
+       density_state: state from create_density_state
+       placement: placement number
+       weight: new weight
+
+       Return:
+       nothing
+    """
+    change = weight - density_state["weight"][placement]
+    if change == 0:
+        return
+    density_state["weight"][placement] = weight
+    score = density_state["score"]
+    tried = density_state["tried"]
+    heap = density_state["heap"]
+    rng = density_state["rng"]
+    for c in density_state["spots"][placement]:
+        score[c] = score[c] + change
+        if change > 0 and not tried[c]:
+            heapq.heappush(heap, (-score[c], rng.random(), c))
+
+
+def update_density(density_state, max_x, x, y, hit):
+    """Update placements through the spot just shot
+
+       Parameters:
+       density_state: state from create_density_state
+       max_x: width of grid
+       x: horizontal location of shot
+       y: vertical location of shot
+       hit: boolean; True if shot hit a ship
+
+       Return:
+       nothing
+    """
+    c = spot_number(max_x, x, y)
+    if density_state["tried"][c]:
+        return
+    density_state["tried"][c] = True
+
+    hits = density_state["hits"]
+    hit_weight = density_state["hit_weight"]
+    afloat = density_state["afloat"]
+    spots = density_state["spots"]
+    for placement in density_state["through"][c]:
+        if density_state["weight"][placement] == 0:
+            continue   # already ruled out by a miss or a sunk ship
+        if hit:
+            hits[placement] = hits[placement] + 1
+            weight = afloat[len(spots[placement])] * (1 + hit_weight * hits[placement])
+        else:
+            weight = 0
+        change_placement_weight(density_state, placement, weight)
+
+
+def sink_density_ship(density_state, ship_spots):
+    """Take a sunk ship out of the scores
+       Every placement through its spots is ruled out (no other ship can lie there) and
+       placements of its size are weighted for one fewer ship still afloat.
+
+       Parameters:
+       density_state: state from create_density_state
+       ship_spots: spot numbers of the sunk ship
+
+       Return:
+       nothing
+    """
+    weight = density_state["weight"]
+    for c in ship_spots:
+        for placement in density_state["through"][c]:
+            if weight[placement] != 0:
+                change_placement_weight(density_state, placement, 0)
+
+    size = len(ship_spots)
+    afloat = density_state["afloat"]
+    if afloat.get(size, 0) == 0:
+        return
+    afloat[size] = afloat[size] - 1
+    hits = density_state["hits"]
+    hit_weight = density_state["hit_weight"]
+    for (placement_size, first, end) in density_state["by_size"]:
+        if placement_size == size:
+            placement = first
+            while placement < end:
+                if weight[placement] != 0:
+                    change_placement_weight(density_state, placement, afloat[size] * (1 + hit_weight * hits[placement]))
+                placement = placement + 1
+
+
+def best_density_spot(density_state, max_x):
+    """Find the untried spot with the highest score
+       Heap entries whose spot was shot are thrown away and entries whose score went down
+       are put back with the current score, until the top entry is up to date.
+
+       Parameters:
+       density_state: state from create_density_state
+       max_x: width of grid
+
+       Return:
+       (x, y): spot to shoot or None if no untried spot is left
+    """
+    heap = density_state["heap"]
+    score = density_state["score"]
+    tried = density_state["tried"]
+    stale = 0
+    best = None
+    while len(heap) > 0 and best is None:
+        (negative_score, tie, c) = heap[0]
+        if tried[c]:
+            heapq.heappop(heap)
+            stale = stale + 1
+        elif -negative_score != score[c]:
+            heapq.heapreplace(heap, (-score[c], tie, c))
+            stale = stale + 1
+        else:
+            best = (c % max_x + 1, c // max_x + 1)
+    if instrument.stats is not None:
+        instrument.count("density_stale_entries", stale)
+    return best
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+
+""" Corpus of fleet layouts placed ahead of time, read back through a memory map.
+    File starts with a header:
+        magic "BSFL", format version byte, bytes per ship code (2 or 4),
+        max_x, max_y, ship groups, number of ships (2 bytes each),
+        then ship character and ship size (1 byte each) for every ship in setup_ships order,
+        padded with zeros to a multiple of 8 bytes.
+    Then one fixed size record per fleet with one code per ship: first spot * 2, plus 1 when the
+    ship runs downward (spot number is (y - 1) * max_x + (x - 1), so spots are first + n or
+    first + n * max_x). A record of all FLEET_NO_SHIP codes is a fleet that could not be placed.
+    10. Fleet n is placed by place_ships with stream create_rng(seed, n), the same fleet game n
+        gets from battleship.py (grid or bitboard), a tournament or the optimizer with that seed.
+        Shots come from their own stream create_rng(seed, n, pattern), so a corpus gives the
+        same results as placing the fleets during the run.
+    20. Work units of fleets are placed across a pool of workers and written in order.
+    30. Readers map the file and unpack fleet n straight from the mapped pages; nothing is read
+        or parsed until a fleet is used and every worker shares the operating system's copy.
+"""
+
+# Import statements
+from setup_battleship import *
+from bitboard import *
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+
+
+# Set constants
+FLEET_MAGIC = b"BSFL"
+FLEET_VERSION = 1
+FLEET_HEADER = struct.Struct("<4sBBHHHH")
+FLEET_NO_SHIP = {2: 0xFFFF, 4: 0xFFFFFFFF}   # code of every ship in a fleet that could not be placed
+DEFAULT_FLEET_CHUNK = 10000   # fleets per work unit sent to a worker
+
+
+def fleet_code_bytes(max_x, max_y):
+    """Return bytes per ship code: 2 when every code fits below FLEET_NO_SHIP[2], else 4"""
+    return 2 if max_x * max_y * 2 < FLEET_NO_SHIP[2] else 4
+
+
+def fleet_record(code_bytes, num_ships):
+    """Return struct for one fleet record"""
+    return struct.Struct("<" + ("H" if code_bytes == 2 else "I") * num_ships)
+
+
+def encode_layout(max_x, layout):
+    """Turn a layout from place_ships into ship codes
+
+       Parameters:
+       max_x: width of grid
+       layout: list of (ship character, spot numbers) in ship order
+
+       Return:
+       codes: list with one code per ship
+    """
+    codes = []
+    for (char, spots) in layout:
+        first = min(spots)
+        codes.append(first * 2 + (1 if len(spots) > 1 and spots[1] - spots[0] == max_x else 0))
+    return codes
+
+
+def place_fleet_chunk(work):
+    """Place one work unit of fleets in a worker process
+
+       Parameters:
+       work: tuple of (num_fleets, max_x, max_y, num_groups, seed, first_fleet)
+
+       Return:
+       (data, timeouts): bytes of fleet records in order and number of fleets that could not be placed
+    """
+    (num_fleets, max_x, max_y, num_groups, seed, first_fleet) = work
+    ships = setup_ships(num_groups)
+    record = fleet_record(fleet_code_bytes(max_x, max_y), len(ships))
+    no_fleet = record.pack(*[FLEET_NO_SHIP[record.size // len(ships)]] * len(ships))
+    data = bytearray()
+    timeouts = 0
+
+    fleet = first_fleet
+    while fleet < first_fleet + num_fleets:
+        (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+        layout = []
+        (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(seed, fleet), layout)
+        if timeout:
+            data += no_fleet
+            timeouts = timeouts + 1
+        else:
+            data += record.pack(*encode_layout(max_x, layout))
+        fleet = fleet + 1
+    return (bytes(data), timeouts)
+
+
+def write_fleet_corpus(filename, fleets, max_x, max_y, num_groups, seed, workers = None,
+                       chunk_size = DEFAULT_FLEET_CHUNK):
+    """Place fleets across a pool of worker processes and write them to a corpus file
+
+       Parameters:
+       filename: path of corpus file (replaced if it exists)
+       fleets: number of fleets
+       max_x: width of grid
+       max_y: height of grid
+       num_groups: number of ship groups passed to setup_ships
+       seed: seed; fleet n is placed with stream create_rng(seed, n)
+       workers: number of worker processes (defaults to one per core)
+       chunk_size: number of fleets per work unit
+
+       Return:
+       (timeouts, seconds): fleets that could not be placed and wall time
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    (max_x, max_y) = set_grid_size(max_x, max_y)
+    ships = setup_ships(num_groups)
+    code_bytes = fleet_code_bytes(max_x, max_y)
+
+    header = bytearray(FLEET_HEADER.pack(FLEET_MAGIC, FLEET_VERSION, code_bytes, max_x, max_y, num_groups, len(ships)))
+    for (ship_type, ship_char, ship_size) in ships:
+        header += bytes([ord(ship_char), ship_size])
+    header += bytes(-len(header) % 8)
+
+    work = []
+    first_fleet = 0
+    while first_fleet < fleets:
+        chunk = min(chunk_size, fleets - first_fleet)
+        work.append((chunk, max_x, max_y, num_groups, seed, first_fleet))
+        first_fleet = first_fleet + chunk
+
+    timeouts = 0
+    start = time.perf_counter()
+    with open(filename, "wb") as f:
+        f.write(header)
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            for (data, chunk_timeouts) in pool.map(place_fleet_chunk, work):
+                f.write(data)
+                timeouts = timeouts + chunk_timeouts
+    return (timeouts, time.perf_counter() - start)
+
+
+def open_fleet_corpus(filename):
+    """Map a corpus file for reading
+
+       Parameters:
+       filename: path of corpus file
+
+       Return:
+       corpus: dictionary with
+           "max_x", "max_y": size of grid
+           "num_groups": ship groups passed to setup_ships
+           "ships": list of (ship type, grid character, number of grid spots) as setup_ships gives
+           "count": number of fleets
+           "record": struct of one fleet record
+           "offset": byte offset of fleet 0
+           "no_ship": code of every ship in a fleet that could not be placed
+           "file", "map": open file and its memory map (see close_fleet_corpus)
+    """
+    f = open(filename, "rb")
+    try:
+        data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+    except ValueError:
+        f.close()
+        raise ValueError("not a battleship fleet corpus")   # empty file cannot be mapped
+    if len(data) < FLEET_HEADER.size or data[:len(FLEET_MAGIC)] != FLEET_MAGIC:
+        data.close()
+        f.close()
+        raise ValueError("not a battleship fleet corpus")
+    (magic, version, code_bytes, max_x, max_y, num_groups, num_ships) = FLEET_HEADER.unpack_from(data, 0)
+    if version != FLEET_VERSION:
+        data.close()
+        f.close()
+        raise ValueError(f"fleet corpus format version {version} is not supported")
+
+    ships = setup_ships(num_groups)
+    if num_ships != len(ships):
+        data.close()
+        f.close()
+        raise ValueError("fleet corpus ships do not match setup_ships")
+    n = 0
+    while n < num_ships:
+        (char, size) = data[FLEET_HEADER.size + 2 * n:FLEET_HEADER.size + 2 * n + 2]
+        if ships[n][1] != chr(char) or ships[n][2] != size:
+            data.close()
+            f.close()
+            raise ValueError("fleet corpus ships do not match setup_ships")
+        n = n + 1
+
+    corpus = {}
+    corpus["max_x"] = max_x
+    corpus["max_y"] = max_y
+    corpus["num_groups"] = num_groups
+    corpus["ships"] = ships
+    corpus["record"] = fleet_record(code_bytes, num_ships)
+    corpus["offset"] = FLEET_HEADER.size + 2 * num_ships + (-(FLEET_HEADER.size + 2 * num_ships) % 8)
+    corpus["count"] = (len(data) - corpus["offset"]) // corpus["record"].size   # ignore a partly written last record
+    corpus["no_ship"] = FLEET_NO_SHIP[code_bytes]
+    if corpus["count"] == 0:
+        data.close()
+        f.close()
+        raise ValueError("fleet corpus holds no fleets")
+    corpus["file"] = f
+    corpus["map"] = data
+    return corpus
+
+
+def close_fleet_corpus(corpus):
+    """Unmap and close a corpus"""
+    corpus["map"].close()
+    corpus["file"].close()
+
+
+def corpus_layout(corpus, n):
+    """Return layout of fleet n in the form place_ships fills in
+
+       Parameters:
+       corpus: corpus from open_fleet_corpus
+       n: fleet number; numbers past the last fleet wrap around to fleet 0
+
+       Return:
+       layout: list of (ship character, spot numbers) in ship order, or None if the fleet
+               could not be placed
+    """
+    record = corpus["record"]
+    codes = record.unpack_from(corpus["map"], corpus["offset"] + (n % corpus["count"]) * record.size)
+    if codes[0] == corpus["no_ship"]:
+        return None
+    max_x = corpus["max_x"]
+    layout = []
+    for ((ship_type, ship_char, ship_size), code) in zip(corpus["ships"], codes):
+        step = max_x if code & 1 else 1
+        first = code >> 1
+        layout.append((ship_char, tuple(first + k * step for k in range(ship_size))))
+    return layout
+
+
+def corpus_settings(filename, games = 0):
+    """Read grid size and ship groups of a corpus file for a run that plays its fleets
+
+       Parameters:
+       filename: path of corpus file
+       games: games the run plays; a note is printed if fleets will be played more than once
+
+       Return:
+       (max_x, max_y, num_groups): settings the run must use
+    """
+    corpus = open_fleet_corpus(filename)
+    settings = (corpus["max_x"], corpus["max_y"], corpus["num_groups"])
+    if games > corpus["count"]:
+        print("FLEETS", filename, "HOLDS", corpus["count"], "FLEETS; LATER GAMES PLAY THEM AGAIN")
+    close_fleet_corpus(corpus)
+    return settings
+
+
+def layout_ship_grid(max_x, max_y, layout):
+    """Build the ship grid place_ships would have built for a layout
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       layout: list of (ship character, spot numbers)
+
+       Return:
+       grid: list of rows with ship characters on their spots
+    """
+    (max_x, max_y, grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+    for (char, spots) in layout:
+        for c in spots:
+            grid[c // max_x + 1][c % max_x + 1] = char
+    return grid
+
+
+def load_fleet(corpus, n):
+    """Return fleet n of a corpus ready to play on the grid backend
+
+       Parameters:
+       corpus: corpus from open_fleet_corpus
+       n: fleet number (wraps around, see corpus_layout)
+
+       Return:
+       (ship_grid, layout, timeout): grid with ships, layout for create_ship_registry and
+                                     True if the fleet could not be placed (grid and layout None)
+    """
+    layout = corpus_layout(corpus, n)
+    if layout is None:
+        return (None, None, True)
+    return (layout_ship_grid(corpus["max_x"], corpus["max_y"], layout), layout, False)
+
+
+def layout_bitboard(max_x, max_y, ships, layout):
+    """Build the bitboard bb_place_ships would have built for a layout
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ships: list of tuples in form of (ship type, grid character, number of grid spots)
+       layout: list of (ship character, spot numbers)
+
+       Return:
+       board: bitboard with ships placed
+    """
+    board = create_bitboard(max_x, max_y, ships)
+    for (char, spots) in layout:
+        mask = sum(1 << c for c in spots)
+        board["ships"] = board["ships"] | mask
+        board["chars"][char] = board["chars"].get(char, 0) | mask
+    return board
+
+
+def handle_fleet_args(args):
+    """Handle arguments if any
+    Arguments format is:
+    "file=F" for corpus file F (defaults to fleets.bin)
+    "x=A" where A is width of grid (defaults to 10)
+    "y=B" where B is the height of the grid (defaults to 10)
+    "num=X" for X number of ship groups
+    "fleets=N" for N fleets to place (defaults to 1000000)
+    "workers=W" for W worker processes (defaults to one per core)
+    "chunk=C" for C fleets per work unit
+    "seed=S" for seed S; fleet n is the fleet game n gets in a run with seed S
+    "show=K" to print fleet K of an existing corpus instead of writing one
+
+    Parameters:
+    args: full command line contents
+
+    Return:
+    (filename, x, y, n, fleets, workers, chunk_size, seed, show): tuple of settings
+    """
+    filename = "fleets.bin"
+    x = 10
+    y = 10
+    n = 1
+    fleets = 1000000
+    workers = None
+    chunk_size = DEFAULT_FLEET_CHUNK
+    seed = None
+    show = None
+    for arg in args:
+        if arg.startswith("file="):
+            filename = arg.split('=', 1)[1]
+        if arg.startswith("x="):
+            x = int(arg.split('=')[1])
+        if arg.startswith("y="):
+            y = int(arg.split('=')[1])
+        if arg.startswith("num="):
+            n = min(int(arg.split('=')[1]), MAX_SHIP_GROUPS)
+        if arg.startswith("fleets="):
+            fleets = int(arg.split('=')[1])
+        if arg.startswith("workers="):
+            workers = int(arg.split('=')[1])
+        if arg.startswith("chunk="):
+            chunk_size = max(int(arg.split('=')[1]), 1)
+        if arg.startswith("seed="):
+            seed = int(arg.split('=')[1])
+        if arg.startswith("show="):
+            show = int(arg.split('=')[1])
+    return (filename, x, y, n, fleets, workers, chunk_size, seed, show)
+
+
+def main():
+    (filename, x, y, n, fleets, workers, chunk_size, seed, show) = handle_fleet_args(sys.argv[1:])
+    if show is not None:
+        corpus = open_fleet_corpus(filename)
+        print("GRID=", f"{corpus['max_x']}x{corpus['max_y']}", "    ", "SHIP GROUPS=", corpus["num_groups"], "    ",
+              "FLEETS=", corpus["count"], "    ", "BYTES PER FLEET=", corpus["record"].size)
+        layout = corpus_layout(corpus, show)
+        if layout is None:
+            print("FLEET", show, "COULD NOT BE PLACED")
+        else:
+            print_grid(corpus["max_x"], corpus["max_y"], layout_ship_grid(corpus["max_x"], corpus["max_y"], layout))
+        close_fleet_corpus(corpus)
+        return
+
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    (timeouts, seconds) = write_fleet_corpus(filename, fleets, x, y, n, seed, workers, chunk_size)
+    print("FLEETS=", fleets, "    ", "FILE=", filename, "    ", "SETUP TIMEOUTS=", timeouts, "    ",
+          "FLEETS/SEC=", round(fleets / seconds, 1) if seconds > 0 else 0, "    ", "SECONDS=", round(seconds, 2))
+    print("SEED=", seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+""" Streaming statistics of shots to win (section 200 of battleship.py).
+    10. Every game adds its shot count to a fixed size record; no per game list is kept.
+    20. Mean and variance come from exact integer totals of shots and squared shots.
+    30. Shot counts also go into a histogram of STAT_BUCKETS buckets spanning 0 through
+        every spot on the grid, so percentiles are exact on grids up to STAT_BUCKETS spots
+        and within one bucket width on larger grids.
+    40. Records of the same grid size merge by adding totals and buckets, so workers
+        can each keep their own and the parent merges them in any order.
+    50. A table keeps one record per (pattern, max_x, max_y).
+"""
+
+# Import statements
+import math
+
+
+# Set constants
+STAT_BUCKETS = 1024   # histogram buckets per record; memory per record is fixed
+STAT_PERCENTILES = (0.50, 0.90, 0.99)
+STAT_HISTOGRAM_ROWS = 10   # lines printed by print_histogram
+STAT_HISTOGRAM_WIDTH = 50   # characters in the longest histogram bar
+
+
+def create_game_stats(max_x, max_y):
+    """Create empty statistics record for games on one grid size
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+
+       Return:
+       stats: dictionary with
+           "cells": number of spots on grid (largest possible shot count)
+           "width": shot counts per histogram bucket
+           "games": number of games added
+           "shots", "shots_sq": totals of shot counts and of squared shot counts
+           "min", "max": fewest and most shots of any game
+           "max_game": game number of the game with most shots, or None
+           "seconds": total wall time of games
+           "timeouts": games whose ships could not be placed (not in any other total)
+           "buckets": list of STAT_BUCKETS game counts; bucket b holds shot counts
+                      b * width through b * width + width - 1
+    """
+    cells = max_x * max_y
+    stats = {}
+    stats["cells"] = cells
+    stats["width"] = max(1, math.ceil((cells + 1) / STAT_BUCKETS))
+    stats["games"] = 0
+    stats["shots"] = 0
+    stats["shots_sq"] = 0
+    stats["min"] = 0
+    stats["max"] = 0
+    stats["max_game"] = None
+    stats["seconds"] = 0.0
+    stats["timeouts"] = 0
+    stats["buckets"] = [0] * STAT_BUCKETS
+    return stats
+
+
+def add_game_stats(stats, count, seconds = 0.0, game = None):
+    """Add the outcome of one game
+
+       Parameters:
+       stats: record from create_game_stats
+       count: number of shots taken in game
+       seconds: wall time of game
+       game: optional game number, remembered if game took the most shots so far
+
+       Return:
+       stats: updated record
+    """
+    if stats["games"] == 0 or count < stats["min"]:
+        stats["min"] = count
+    if stats["games"] == 0 or count > stats["max"]:
+        stats["max"] = count
+        stats["max_game"] = game
+    stats["games"] = stats["games"] + 1
+    stats["shots"] = stats["shots"] + count
+    stats["shots_sq"] = stats["shots_sq"] + count * count
+    stats["seconds"] = stats["seconds"] + seconds
+    stats["buckets"][min(count // stats["width"], STAT_BUCKETS - 1)] += 1
+    return stats
+
+
+def merge_game_stats(total, stats):
+    """Merge one record into a running total of the same grid size
+
+       Parameters:
+       total: record to merge into
+       stats: record from another worker or work unit
+
+       Return:
+       total: updated record
+    """
+    if stats["cells"] != total["cells"]:
+        raise ValueError(f"cannot merge statistics of {stats['cells']} spot grid into {total['cells']} spot grid")
+    total["timeouts"] = total["timeouts"] + stats["timeouts"]
+    if stats["games"] == 0:
+        return total
+    if total["games"] == 0 or stats["min"] < total["min"]:
+        total["min"] = stats["min"]
+    if total["games"] == 0 or stats["max"] > total["max"]:
+        total["max"] = stats["max"]
+        total["max_game"] = stats["max_game"]
+    total["games"] = total["games"] + stats["games"]
+    total["shots"] = total["shots"] + stats["shots"]
+    total["shots_sq"] = total["shots_sq"] + stats["shots_sq"]
+    total["seconds"] = total["seconds"] + stats["seconds"]
+    buckets = total["buckets"]
+    for (b, games) in enumerate(stats["buckets"]):
+        if games:
+            buckets[b] = buckets[b] + games
+    return total
+
+
+def stats_mean(stats):
+    """Return mean shots per game (0 if no games)"""
+    if stats["games"] == 0:
+        return 0.0
+    return stats["shots"] / stats["games"]
+
+
+def stats_variance(stats):
+    """Return population variance of shots per game, worked out exactly from integer totals"""
+    games = stats["games"]
+    if games == 0:
+        return 0.0
+    return (games * stats["shots_sq"] - stats["shots"] * stats["shots"]) / (games * games)
+
+
+def stats_percentile(stats, fraction):
+    """Estimate a percentile of shots per game from the histogram
+
+       Parameters:
+       stats: record from create_game_stats
+       fraction: 0 through 1, for example 0.9 for the 90th percentile
+
+       Return:
+       shots: smallest shot count at or above fraction of games (nearest rank);
+              exact when bucket width is 1, otherwise interpolated inside the bucket
+    """
+    games = stats["games"]
+    if games == 0:
+        return 0
+    rank = max(1, math.ceil(fraction * games))
+    width = stats["width"]
+    before = 0
+    for (b, in_bucket) in enumerate(stats["buckets"]):
+        if before + in_bucket >= rank:
+            shots = b * width + (width - 1) * (rank - before) / in_bucket
+            return min(max(shots, stats["min"]), stats["max"])
+        before = before + in_bucket
+    return stats["max"]
+
+
+def summarize_game_stats(stats):
+    """Summarize a record
+
+       Return:
+       summary: dictionary with "games", "mean", "std_dev", "min", "max", "max_game",
+                "games_per_second", "timeouts" and "p50", "p90", "p99" (see STAT_PERCENTILES)
+    """
+    summary = {}
+    summary["games"] = stats["games"]
+    summary["mean"] = stats_mean(stats)
+    summary["std_dev"] = stats_variance(stats) ** 0.5
+    summary["min"] = stats["min"]
+    summary["max"] = stats["max"]
+    summary["max_game"] = stats["max_game"]
+    summary["games_per_second"] = stats["games"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    summary["timeouts"] = stats["timeouts"]
+    for fraction in STAT_PERCENTILES:
+        summary[f"p{round(fraction * 100)}"] = stats_percentile(stats, fraction)
+    return summary
+
+
+def table_stats(table, pattern, max_x, max_y):
+    """Return the record for a pattern and grid size, creating it on first use
+
+       Parameters:
+       table: dictionary of (pattern, max_x, max_y) to record (start with {})
+       pattern: shot pattern
+       max_x: width of grid
+       max_y: height of grid
+
+       Return:
+       stats: record in table
+    """
+    key = (pattern, max_x, max_y)
+    if key not in table:
+        table[key] = create_game_stats(max_x, max_y)
+    return table[key]
+
+
+def merge_stats_tables(total, table):
+    """Merge every record of one table into a running total table
+
+       Return:
+       total: updated table
+    """
+    for ((pattern, max_x, max_y), stats) in table.items():
+        merge_game_stats(table_stats(total, pattern, max_x, max_y), stats)
+    return total
+
+
+def print_stats_table(table):
+    """Print one line per pattern and grid size with mean, spread and percentiles
+
+       Parameters:
+       table: dictionary from table_stats
+
+       Return:
+       nothing
+    """
+    print(f"{'PATTERN':<26}{'GRID':>8}{'GAMES':>10}{'AVERAGE':>10}{'STD DEV':>10}{'MIN':>6}"
+          f"{'P50':>8}{'P90':>8}{'P99':>8}{'MAX':>6}{'GAMES/SEC':>12}")
+    for ((pattern, max_x, max_y), stats) in table.items():
+        grid = f"{max_x}x{max_y}"
+        summary = summarize_game_stats(stats)
+        if summary["games"] == 0:
+            print(f"{pattern:<26}{grid:>8}{0:>10}")
+            continue
+        print(f"{pattern:<26}{grid:>8}{summary['games']:>10}{summary['mean']:>10.2f}{summary['std_dev']:>10.2f}"
+              f"{summary['min']:>6}{summary['p50']:>8.1f}{summary['p90']:>8.1f}{summary['p99']:>8.1f}"
+              f"{summary['max']:>6}{summary['games_per_second']:>12.1f}")
+
+
+def print_histogram(stats, rows = STAT_HISTOGRAM_ROWS):
+    """Print histogram of shots per game between the fewest and most shots
+
+       Parameters:
+       stats: record from create_game_stats
+       rows: number of lines; buckets are grouped to fit
+
+       Return:
+       nothing
+    """
+    if stats["games"] == 0:
+        return
+    width = stats["width"]
+    first = stats["min"] // width
+    last = min(stats["max"] // width, STAT_BUCKETS - 1)
+    per_row = math.ceil((last - first + 1) / rows)
+    lines = []
+    b = first
+    while b <= last:
+        games = sum(stats["buckets"][b:min(b + per_row, last + 1)])
+        lines.append((b * width, min((b + per_row) * width - 1, stats["max"]), games))
+        b = b + per_row
+    most = max(games for (low, high, games) in lines)
+    for (low, high, games) in lines:
+        bar = "#" * math.ceil(STAT_HISTOGRAM_WIDTH * games / most) if games else ""
+        print(f"{low:>7} - {high:<7}{games:>10}  {bar}")
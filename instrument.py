@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+""" Counters, phase timers and profiling for finding where a slow run spends its time.
+    10. enable_stats creates the stats dictionary; until then stats is None.
+    20. Instrumented functions keep their counts in local variables and add them to stats
+        once per call, and only when stats is not None, so a run without stats pays for one
+        test per call and nothing per loop.
+    30. Phases (setup, shooting, end of game check, display) are timed around the calls that do them.
+    40. profile_run wraps a whole run in cProfile and tracemalloc and writes both reports.
+"""
+
+# Import statements
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+
+
+# Set constants
+PROFILE_PREFIX = "battleship_profile"   # report files are PREFIX.prof and PREFIX.txt
+PROFILE_LINES = 25   # functions and allocation sites listed in the text report
+
+
+stats = None   # dictionary from create_stats while enabled (test as instrument.stats)
+
+
+def create_stats():
+    """Create empty stats
+
+       Return:
+       stats: dictionary with
+           "counters": dictionary of counter name to count
+           "phases": dictionary of phase name to seconds
+    """
+    return {"counters": {}, "phases": {}}
+
+
+def enable_stats():
+    """Start collecting stats (any stats collected before are dropped)
+
+       Return:
+       stats: the new stats dictionary
+    """
+    global stats
+    stats = create_stats()
+    return stats
+
+
+def disable_stats():
+    """Stop collecting stats
+
+       Return:
+       stats: stats collected so far, or None if they were not enabled
+    """
+    global stats
+    collected = stats
+    stats = None
+    return collected
+
+
+def count(name, n = 1):
+    """Add n to a counter (call only when stats is not None)"""
+    counters = stats["counters"]
+    counters[name] = counters.get(name, 0) + n
+
+
+def add_phase(name, seconds):
+    """Add wall time to a phase (call only when stats is not None)"""
+    phases = stats["phases"]
+    phases[name] = phases.get(name, 0.0) + seconds
+
+
+def print_stats(collected):
+    """Print counters and phase times with per game and per shot rates where they apply
+
+       Parameters:
+       collected: stats from enable_stats or disable_stats
+
+       Return:
+       nothing
+    """
+    counters = collected["counters"]
+    games = counters.get("games", 0)
+    shots = counters.get("shots", 0)
+    total = sum(collected["phases"].values())
+
+    print(f"{'PHASE':<28}{'SECONDS':>12}{'PERCENT':>9}")
+    for (name, seconds) in sorted(collected["phases"].items(), key = lambda item: -item[1]):
+        percent = 100 * seconds / total if total > 0 else 0
+        print(f"{name:<28}{seconds:>12.6f}{percent:>9.1f}")
+    print("")
+
+    print(f"{'COUNTER':<28}{'COUNT':>12}{'PER GAME':>12}{'PER SHOT':>12}")
+    for (name, value) in sorted(counters.items()):
+        per_game = f"{value / games:.3f}" if games > 0 else "-"
+        per_shot = f"{value / shots:.4f}" if shots > 0 else "-"
+        print(f"{name:<28}{value:>12}{per_game:>12}{per_shot:>12}")
+
+
+def profile_run(function, arguments, prefix = PROFILE_PREFIX):
+    """Run a function under cProfile and tracemalloc and write both reports
+
+       Parameters:
+       function: function to run
+       arguments: tuple of arguments for function
+       prefix: file name prefix; writes prefix.prof (load with pstats or snakeviz)
+               and prefix.txt (top functions by cumulative time and top allocation sites)
+
+       Return:
+       result: value returned by function
+    """
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        result = function(*arguments)
+    finally:
+        profiler.disable()
+        seconds = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        (current, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    profiler.dump_stats(prefix + ".prof")
+    report = io.StringIO()
+    report.write(f"WALL SECONDS= {seconds:.6f}     PEAK TRACED MEMORY= {peak} BYTES     STILL ALLOCATED= {current} BYTES\n\n")
+    pstats.Stats(profiler, stream = report).sort_stats("cumulative").print_stats(PROFILE_LINES)
+    report.write("TOP ALLOCATION SITES\n")
+    for stat in snapshot.statistics("lineno")[:PROFILE_LINES]:
+        report.write(f"{stat}\n")
+    with open(prefix + ".txt", "w") as f:
+        f.write(report.getvalue())
+    print("PROFILE WRITTEN TO", prefix + ".prof", "AND", prefix + ".txt")
+    return result
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+""" Live terminal view that updates the shot grid with every shot (section 300 of battleship.py).
+    10. Clear the screen and draw the column headings and every row once.
+    20. After a shot remember only the spot that changed.
+    30. At most fps times a second move the cursor to every changed spot with ANSI codes
+        and write them, and a fresh statistics line, in one buffered write.
+    Shots between frames cost a dictionary update and a clock read, so watching a fast game barely slows it.
+"""
+
+# Import statements
+from setup_battleship import *
+import sys
+import time
+
+
+# Set constants
+LIVE_FPS = 30   # frames drawn per second at most
+ESC = "\x1b["
+
+
+def create_live_view(max_x, max_y, fps = LIVE_FPS, out = None, stats = None):
+    """Create a live view for a grid
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       fps: frames drawn per second at most (0 draws every shot)
+       out: text stream to draw on (defaults to sys.stdout)
+       stats: optional function returning (label, value) pairs for the statistics line;
+              only called when a frame is drawn so shots between frames pay nothing for it
+
+       Return:
+       view: dictionary with
+           "max_x", "max_y": size of grid
+           "width": characters per column (longest column heading plus a space)
+           "pending": dictionary of (x, y) to character changed since last frame
+           "stats": function returning (label, value) pairs for the statistics line
+           "start": perf_counter time when the view was created
+           "interval": seconds between frames
+           "next_frame": perf_counter time when the next frame may be drawn
+           "frames": number of frames drawn
+           "grid": grid drawn by live_draw_grid, used to redraw it when most spots changed
+           "out": text stream
+    """
+    view = {}
+    view["max_x"] = max_x
+    view["max_y"] = max_y
+    view["width"] = len(column_label(max_x)) + 1
+    view["pending"] = {}
+    view["stats"] = stats
+    view["start"] = time.perf_counter()
+    view["interval"] = 1 / fps if fps > 0 else 0
+    view["next_frame"] = 0
+    view["frames"] = 0
+    view["grid"] = None
+    view["out"] = sys.stdout if out is None else out
+    return view
+
+
+def live_cell(view, x, y):
+    """Return ANSI code moving the cursor to grid location (x, y); rows and columns count from 1"""
+    return f"{ESC}{y + 1};{3 + (x - 1) * view['width'] + view['width']}H"
+
+
+def live_grid_text(view):
+    """Return text of the whole grid, starting from the top left corner of the screen"""
+    grid = view["grid"]
+    width = view["width"]
+    lines = [f"{ESC}H"]
+    lines.append("   " + "".join(heading.rjust(width) for heading in grid[0][1:view["max_x"] + 1]) + "\n")
+    gap = " " * (width - 1)   # every spot holds one character
+    y = 1
+    while y <= view["max_y"]:
+        row = grid[y]
+        lines.append(f"{row[0]:<3}" + gap + gap.join(row[1:view["max_x"] + 1]) + "\n")
+        y = y + 1
+    return "".join(lines)
+
+
+def live_draw_grid(view, grid):
+    """Clear the screen and draw the whole grid once
+
+       Parameters:
+       view: view from create_live_view
+       grid: grid to draw (same layout as create_initial_empty_grid);
+             later frames read changed spots from live_update, not from the grid,
+             unless most spots changed and the grid is drawn again
+
+       Return:
+       nothing
+    """
+    view["grid"] = grid
+    view["out"].write(f"{ESC}2J" + live_grid_text(view))   # clear screen first
+    view["out"].flush()
+    view["pending"].clear()
+
+
+def live_update(view, x, y, char):
+    """Record one changed spot and draw a frame if enough time has passed
+
+       Parameters:
+       view: view from create_live_view
+       x: horizontal location that changed
+       y: vertical location that changed
+       char: new character at that location
+
+       Return:
+       nothing
+    """
+    view["pending"][(x, y)] = char
+    if time.perf_counter() >= view["next_frame"]:
+        view["next_frame"] = time.perf_counter() + view["interval"]
+        live_flush(view)
+
+
+def live_flush(view):
+    """Write every pending change and the statistics line in one write"""
+    parts = []
+    if view["grid"] is not None and len(view["pending"]) * 4 > view["max_x"] * view["max_y"]:
+        parts.append(live_grid_text(view))   # cheaper to draw every row again than to move to every spot
+    else:
+        for ((x, y), char) in view["pending"].items():
+            parts.append(live_cell(view, x, y))
+            parts.append(char)
+    view["pending"].clear()
+    stats = []
+    if view["stats"] is not None:
+        for (label, value) in view["stats"]():
+            stats.append(f"{label}= {value}     ")
+    seconds = time.perf_counter() - view["start"]
+    parts.append(f"{ESC}{view['max_y'] + 3};1H{ESC}K{''.join(stats)}SECONDS= {seconds:.3f}")
+    view["out"].write("".join(parts))
+    view["out"].flush()
+    view["frames"] = view["frames"] + 1
+
+
+def live_close(view):
+    """Draw the last frame and leave the cursor below the view"""
+    live_flush(view)
+    view["out"].write(f"{ESC}{view['max_y'] + 4};1H")
+    view["out"].flush()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+
+""" Optional NumPy engine that plays a batch of games in lockstep (needs numpy; see LOCKSTEP_PATTERNS).
+    10. Hold the batch as 3-D arrays (games x rows x columns) of ship numbers and shots.
+    20. Place every ship of the fleet in every game at once: draw a placement from the shared
+        placement_index per game and keep the draws that do not overlap; games still
+        unplaced after LOCKSTEP_PLACE_TRIES rounds fall back to place_ships.
+    30. Shuffle the shot order of every game at once (the pattern decides which spots come first).
+    40. Every step takes the next shot in all games still playing; finished games are retired
+        by dropping them from the array of active games.
+    Shots follow the same rules as the Python patterns but come from NumPy random streams,
+    so results match the other backends in distribution, not shot for shot.
+"""
+
+# Import statements
+from setup_battleship import *
+from gamestats import *
+import instrument
+import random
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:   # engine is optional; LOCKSTEP_AVAILABLE tells callers
+    np = None
+
+
+# Set constants
+LOCKSTEP_AVAILABLE = np is not None
+LOCKSTEP_PATTERNS = ["top_left_to_bottom_right", "random", "random_odd", "random_even"]
+LOCKSTEP_BATCH = 4096   # games held in arrays at once; memory grows with batch x grid spots
+LOCKSTEP_PLACE_TRIES = 64   # rounds of random draws per ship before place_ships takes over
+
+
+def create_lockstep_batch(games, max_x, max_y, ships, np_rng, seed = 0, first_game = 0):
+    """Create a batch of games and place the fleet in every game
+
+       Parameters:
+       games: number of games in batch
+       max_x: width of grid
+       max_y: height of grid
+       ships: list of tuples in form of (ship type, grid character, number of grid spots)
+       np_rng: NumPy random generator
+       seed: seed for place_ships when a game falls back to it (stream create_rng(seed, "lockstep", g))
+       first_game: game number of the first game in batch
+
+       Return:
+       batch: dictionary with
+           "games", "max_x", "max_y": size of batch and grid
+           "ships": games x max_y x max_x array; 0 for empty, n + 1 for ship number n in ships
+           "shots": games x max_y x max_x array of booleans; True where shot
+           "chars": grid character of every ship number (index 0 is EMPTY_CHAR)
+           "timeout": array of booleans; True for games whose ships could not be placed
+           "count": array of shots taken in every game
+           "first_game": game number of the first game in batch
+    """
+    cells = max_x * max_y
+    board = np.zeros((games, cells), dtype = np.int16)
+    failed = np.zeros(games, dtype = bool)
+    timeout = np.zeros(games, dtype = bool)
+    if not fleet_can_fit(max_x, max_y, ships):
+        failed[:] = True
+        timeout[:] = True
+
+    n = 0
+    while n < len(ships) and not failed.all():
+        (ship_type, ship_char, size) = ships[n]
+        covered = np.array([p[3] for p in placement_index(max_x, max_y, size)], dtype = np.intp)
+        pending = np.flatnonzero(~failed)
+        tries = 0
+        while pending.size > 0 and tries < LOCKSTEP_PLACE_TRIES:
+            spots = covered[np_rng.integers(len(covered), size = pending.size)]
+            free = ~(board[pending[:, None], spots] != 0).any(axis = 1)
+            board[pending[free][:, None], spots[free]] = n + 1
+            pending = pending[~free]
+            tries = tries + 1
+        failed[pending] = True
+        n = n + 1
+
+    for g in np.flatnonzero(failed & ~timeout):
+        # Crowded grid; let place_ships backtrack for this game
+        layout = []
+        (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+        (ship_grid, timeout[g]) = place_ships(max_x, max_y, empty_grid, ships, create_rng(seed, "lockstep", first_game + g), layout)
+        board[g] = 0
+        if not timeout[g]:
+            for (n, (char, spots)) in enumerate(layout):
+                board[g, list(spots)] = n + 1
+
+    batch = {}
+    batch["games"] = games
+    batch["max_x"] = max_x
+    batch["max_y"] = max_y
+    batch["ships"] = board.reshape(games, max_y, max_x)
+    batch["shots"] = np.zeros((games, max_y, max_x), dtype = bool)
+    batch["chars"] = [EMPTY_CHAR] + [char for (ship_type, char, size) in ships]
+    batch["timeout"] = timeout
+    batch["count"] = np.zeros(games, dtype = np.int32)
+    batch["first_game"] = first_game
+    return batch
+
+
+def lockstep_shot_order(batch, shot_pattern, np_rng):
+    """List the spots every game will shoot, in order
+
+       Parameters:
+       batch: batch from create_lockstep_batch
+       shot_pattern: one of LOCKSTEP_PATTERNS
+       np_rng: NumPy random generator
+
+       Return:
+       order: games x spots array of spot numbers (y - 1) * max_x + (x - 1), or a single
+              row shared by every game for "top_left_to_bottom_right"
+    """
+    max_x = batch["max_x"]
+    cells = max_x * batch["max_y"]
+    if shot_pattern == "top_left_to_bottom_right":
+        return np.arange(cells)[None, :]
+    keys = np_rng.random((batch["games"], cells))
+    if shot_pattern in ("random_odd", "random_even"):
+        spot = np.arange(cells)
+        odd = (spot % max_x + spot // max_x) % 2 == 1   # x + y is odd
+        first = odd if shot_pattern == "random_odd" else ~odd
+        keys = keys + ~first   # other parity only after every spot of this parity
+    elif shot_pattern != "random":
+        raise ValueError(f"pattern {shot_pattern} not available in lockstep engine; use one of {LOCKSTEP_PATTERNS}")
+    return np.argsort(keys, axis = 1)
+
+
+def play_lockstep_batch(batch, shot_pattern, np_rng):
+    """Play every game in a batch to the end, one shot per game per step
+
+       Parameters:
+       batch: batch from create_lockstep_batch
+       shot_pattern: one of LOCKSTEP_PATTERNS
+       np_rng: NumPy random generator
+
+       Return:
+       count: array of shots taken in every game (0 for games that timed out)
+    """
+    order = lockstep_shot_order(batch, shot_pattern, np_rng)
+    games = batch["games"]
+    ships = batch["ships"].reshape(games, -1)
+    shots = batch["shots"].reshape(games, -1)
+    count = batch["count"]
+    remaining = np.count_nonzero(ships, axis = 1).astype(np.int32)
+    active = np.flatnonzero(~batch["timeout"])
+    shared = order.shape[0] == 1
+
+    step = 0
+    while active.size > 0:
+        spot = order[0, step] if shared else order[active, step]
+        shots[active, spot] = True
+        remaining[active] -= ships[active, spot] != 0
+        step = step + 1
+        done = remaining[active] == 0
+        count[active[done]] = step
+        active = active[~done]
+    return count
+
+
+def lockstep_grid(batch, game, show_ships = True):
+    """Build a grid of characters for one game of a batch (same layout as create_initial_empty_grid)
+
+       Parameters:
+       batch: batch from create_lockstep_batch
+       game: index of game in batch
+       show_ships: True for the ship grid, False for the shot grid
+
+       Return:
+       grid: list of rows
+    """
+    max_x = batch["max_x"]
+    max_y = batch["max_y"]
+    (max_x, max_y, grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR if show_ships else NO_SHOT_CHAR)
+    ships = batch["ships"][game]
+    shots = batch["shots"][game]
+    for (y, x) in zip(*np.nonzero(ships if show_ships else shots)):
+        char = batch["chars"][ships[y, x]]
+        if not show_ships and char == EMPTY_CHAR:
+            char = MISS_CHAR
+        grid[y + 1][x + 1] = char
+    return grid
+
+
+def lockstep_game_stats(batch, seconds):
+    """Build a statistics record (see gamestats.py) for a finished batch without a loop per game
+
+       Parameters:
+       batch: batch played by play_lockstep_batch
+       seconds: wall time of batch, shared evenly between its games
+
+       Return:
+       stats: record from create_game_stats
+    """
+    stats = create_game_stats(batch["max_x"], batch["max_y"])
+    played = ~batch["timeout"]
+    count = batch["count"][played].astype(np.int64)
+    stats["timeouts"] = int(batch["timeout"].sum())
+    if count.size == 0:
+        return stats
+    longest = int(np.argmax(count))
+    stats["games"] = int(count.size)
+    stats["shots"] = int(count.sum())
+    stats["shots_sq"] = int((count * count).sum())
+    stats["min"] = int(count.min())
+    stats["max"] = int(count[longest])
+    stats["max_game"] = batch["first_game"] + int(np.flatnonzero(played)[longest])
+    stats["seconds"] = seconds
+    buckets = np.bincount(np.minimum(count // stats["width"], STAT_BUCKETS - 1), minlength = STAT_BUCKETS)
+    stats["buckets"] = [int(games) for games in buckets]
+    return stats
+
+
+def run_lockstep_games(n, max_x, max_y, num_groups, shot_pattern, seed = None, first_game = 0, batch_size = LOCKSTEP_BATCH):
+    """Play n games in batches of batch_size with the lockstep engine (batch mode)
+
+       Parameters:
+       n: number of games to play
+       max_x: width of grid
+       max_y: height of grid
+       num_groups: number of ship groups passed to setup_ships
+       shot_pattern: one of LOCKSTEP_PATTERNS
+       seed: optional seed; the batch starting at game g draws from a NumPy stream seeded
+             from create_rng(seed, "lockstep", g), so runs repeat for the same seed and batch size
+       first_game: number of the first game
+       batch_size: games per batch
+
+       Return:
+       stats: statistics record from create_game_stats with every game added
+    """
+    if np is None:
+        raise ImportError("lockstep engine needs numpy (pip install numpy)")
+    if shot_pattern not in LOCKSTEP_PATTERNS:
+        raise ValueError(f"pattern {shot_pattern} not available in lockstep engine; use one of {LOCKSTEP_PATTERNS}")
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    (max_x, max_y) = set_grid_size(max_x, max_y)
+    ships = setup_ships(num_groups)
+    stats = create_game_stats(max_x, max_y)
+
+    game = first_game
+    while game < first_game + n:
+        games = min(batch_size, first_game + n - game)
+        start = time.perf_counter()
+        np_rng = np.random.default_rng(create_rng(seed, "lockstep", game).getrandbits(64))
+        batch = create_lockstep_batch(games, max_x, max_y, ships, np_rng, seed, game)
+        placed = time.perf_counter()
+        play_lockstep_batch(batch, shot_pattern, np_rng)
+        end = time.perf_counter()
+        merge_game_stats(stats, lockstep_game_stats(batch, end - start))
+        if instrument.stats is not None:
+            instrument.add_phase("setup", placed - start)
+            instrument.add_phase("shooting", end - placed)
+            instrument.count("games", games)
+            instrument.count("shots", int(batch["count"].sum()))
+        game = game + games
+
+    return stats
+
+
+def handle_lockstep_args(args):
+    """Handle arguments if any
+    Arguments format is:
+    "x=A", "y=B", "num=X", "pattern=P", "games=G", "seed=S" as battleship.py
+    "batch=B" for B games held in arrays at once (defaults to LOCKSTEP_BATCH)
+
+    Parameters:
+    args: full command line contents
+
+    Return:
+    (x, y, n, games, pattern, seed, batch_size): tuple of settings
+    """
+    x = 10
+    y = 10
+    n = 1
+    games = 10000
+    pattern = "random"
+    seed = None
+    batch_size = LOCKSTEP_BATCH
+    for arg in args:
+        if arg.startswith("x="):
+            x = int(arg.split('=')[1])
+        if arg.startswith("y="):
+            y = int(arg.split('=')[1])
+        if arg.startswith("num="):
+            n = min(int(arg.split('=')[1]), MAX_SHIP_GROUPS)
+        if arg.startswith("games="):
+            games = int(arg.split('=')[1])
+        if arg.startswith("pattern="):
+            pattern = arg.split('=')[1]
+        if arg.startswith("seed="):
+            seed = int(arg.split('=')[1])
+        if arg.startswith("batch="):
+            batch_size = max(int(arg.split('=')[1]), 1)
+    return (x, y, n, games, pattern, seed, batch_size)
+
+
+def main():
+    (x, y, n, games, pattern, seed, batch_size) = handle_lockstep_args(sys.argv[1:])
+    if np is None:
+        print("LOCKSTEP ENGINE NEEDS NUMPY; INSTALL IT WITH 'pip install numpy'")
+        return
+    if pattern not in LOCKSTEP_PATTERNS:
+        print("PATTERN", pattern, "NOT AVAILABLE IN LOCKSTEP ENGINE; USE ONE OF", LOCKSTEP_PATTERNS)
+        return
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    (x, y) = set_grid_size(x, y)
+    stats = run_lockstep_games(games, x, y, n, pattern, seed, 0, batch_size)
+    print_stats_table({(pattern, x, y): stats})
+    print("SEED=", seed, "    ", "BATCH=", batch_size, "    ", "SETUP TIMEOUTS=", stats["timeouts"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+
+""" Optimizer mode: tune the settings of one shot pattern over many games using every CPU core.
+    10. Build the candidate settings from a search space, either every combination of the
+        listed values or random samples of it (see parse_space).
+    20. Play games in rounds. Every candidate plays the same fleets with the same shot streams
+        (see play_candidates), so differences come from the settings and not from luck.
+    30. Split each round into work units, play them across a pool of workers and merge the
+        per-unit statistics (see gamestats.py) into one record per candidate.
+    40. Workers also total the game by game difference in shots between every two candidates.
+        Because both played the same games, the interval of that difference is much narrower
+        than the intervals of the two means, so losing candidates are found in fewer games.
+        After every round drop a candidate when the low end of the interval of its difference
+        to the best candidate is above 0. That interval is wider than the reported one because
+        it is checked after every round (see pruning_z). Also drop a candidate that took the
+        same shots as a kept candidate in every game: its settings had no effect (see same_games).
+    50. Stop when one candidate is left or every survivor has played the most games, then
+        print every candidate with its confidence interval and the best settings.
+"""
+
+# Import statements
+from battleship import *
+from tournament import split_into_chunks
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import math
+import os
+import random
+import sys
+import time
+
+
+# Set constants
+OPTIMIZE_Z = 1.96   # confidence interval half width in standard errors (1.96 is 95%)
+DEFAULT_ROUND_GAMES = 1000   # games every surviving candidate plays per round
+DEFAULT_MAX_GAMES = 10000   # games a candidate plays at most
+DEFAULT_OPTIMIZE_CHUNK = 100   # games per work unit sent to a worker
+
+
+def parse_value(text):
+    """Return a setting value as int, float or string, the same way parse_params does"""
+    return parse_params("value:" + text)["value"]
+
+
+def parse_space(text):
+    """Turn "name:1,2,3;name2:0.5..1.0" into a search space
+       Each dimension is a list of values, or a range "low..high" that holds every whole number
+       from low through high, or any number between them when low or high is not a whole number.
+
+       Parameters:
+       text: search space string
+
+       Return:
+       space: list of (name, values, low, high); values is a list, or None for a range
+              of decimals, which only random sampling can draw from
+    """
+    space = []
+    for item in text.split(';'):
+        if item == "":
+            continue
+        (name, spec) = item.split(':', 1)
+        if ".." in spec:
+            (low, high) = spec.split('..', 1)
+            (low, high) = (parse_value(low), parse_value(high))
+            if isinstance(low, int) and isinstance(high, int):
+                space.append((name, list(range(low, high + 1)), low, high))
+            else:
+                space.append((name, None, float(low), float(high)))
+        else:
+            space.append((name, [parse_value(value) for value in spec.split(',')], None, None))
+    return space
+
+
+def grid_candidates(space):
+    """Return every combination of values in a search space
+
+       Parameters:
+       space: list from parse_space; every dimension must have a list of values
+
+       Return:
+       candidates: list of settings dictionaries
+    """
+    candidates = [{}]
+    for (name, values, low, high) in space:
+        if values is None:
+            raise ValueError(f"'{name}' is a range of decimals; use samples= to draw from it")
+        candidates = [dict(candidate, **{name: value}) for candidate in candidates for value in values]
+    return candidates
+
+
+def sample_candidates(space, samples, rng):
+    """Draw distinct random settings from a search space
+
+       Parameters:
+       space: list from parse_space
+       samples: number of candidates wanted
+       rng: random number generator
+
+       Return:
+       candidates: list of at most samples settings dictionaries (fewer if the space is smaller)
+    """
+    candidates = []
+    seen = set()
+    tries = 0
+    while len(candidates) < samples and tries < samples * 20:
+        candidate = {}
+        for (name, values, low, high) in space:
+            if values is None:
+                candidate[name] = round(rng.uniform(low, high), 3)
+            else:
+                candidate[name] = rng.choice(values)
+        key = tuple(sorted(candidate.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(candidate)
+        tries = tries + 1
+    return candidates
+
+
+def play_candidates(work):
+    """Play one work unit of games for some candidates in a worker process
+       Fleet of game g is placed with stream create_rng(seed, g) and every candidate shoots
+       with stream create_rng(seed, g, pattern), the same streams the tournament uses,
+       so every candidate meets the same fleets and results do not depend on how games
+       are split between work units and workers. With a fleet corpus game g plays fleet g
+       of the corpus instead (see fleets.py).
+
+       Parameters:
+       work: tuple of (num_games, max_x, max_y, num_groups, pattern, candidates, seed, first_game, fleets);
+             candidates is a list of (candidate number, settings) and fleets a corpus file name or None
+
+       Return:
+       (records, pairs, timeouts, seconds): dictionary of candidate number to statistics record,
+           dictionary of (candidate i, candidate j) with i < j to [games, total, squared total]
+           of shots of i minus shots of j in the same game, number of fleets that could not
+           be placed and wall time
+    """
+    (num_games, max_x, max_y, num_groups, pattern, candidates, seed, first_game, fleets) = work
+    start = time.perf_counter()
+    corpus = open_fleet_corpus(fleets) if fleets is not None else None
+
+    (max_x, max_y) = set_grid_size(max_x, max_y)
+    ships = setup_ships(num_groups)
+    records = {}
+    for (number, params) in candidates:
+        records[number] = create_game_stats(max_x, max_y)
+    pairs = {}
+    timeouts = 0
+
+    game = first_game
+    while game < first_game + num_games:
+        if corpus is None:
+            (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+            layout = []
+            (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(seed, game), layout)
+        else:
+            (ship_grid, layout, timeout) = load_fleet(corpus, game)
+        if timeout:
+            timeouts = timeouts + 1
+        else:
+            counts = []
+            for (number, params) in candidates:
+                game_start = time.perf_counter()
+                count = play_headless_game(max_x, max_y, ship_grid, pattern, ships, None, game,
+                                           create_rng(seed, game, pattern), layout, params)
+                add_game_stats(records[number], count, time.perf_counter() - game_start, game)
+                counts.append((number, count))
+            for (i, count_i) in counts:
+                for (j, count_j) in counts:
+                    if i < j:
+                        pair = pairs.setdefault((i, j), [0, 0, 0])
+                        pair[0] = pair[0] + 1
+                        pair[1] = pair[1] + count_i - count_j
+                        pair[2] = pair[2] + (count_i - count_j) ** 2
+        game = game + 1
+
+    if corpus is not None:
+        close_fleet_corpus(corpus)
+    return (records, pairs, timeouts, time.perf_counter() - start)
+
+
+def interval(games, total, total_sq, z = OPTIMIZE_Z):
+    """Return (low, high) of the confidence interval of a mean from its totals
+
+       Parameters:
+       games: number of values
+       total: sum of values
+       total_sq: sum of squared values
+       z: interval half width in standard errors
+
+       Return:
+       (low, high): interval; unbounded with fewer than 2 values
+    """
+    if games < 2:
+        return (-math.inf, math.inf)
+    mean = total / games
+    variance = max(total_sq - total * total / games, 0) / (games - 1)   # sample variance
+    half = z * (variance / games) ** 0.5
+    return (mean - half, mean + half)
+
+
+def confidence_interval(stats, z = OPTIMIZE_Z):
+    """Return (low, high) of the confidence interval of mean shots per game of a statistics record"""
+    return interval(stats["games"], stats["shots"], stats["shots_sq"], z)
+
+
+def difference_interval(pairs, i, j, z = OPTIMIZE_Z):
+    """Return (low, high) of the confidence interval of mean shots of candidate i minus candidate j"""
+    if i < j:
+        return interval(*pairs.get((i, j), (0, 0, 0)), z)
+    (low, high) = interval(*pairs.get((j, i), (0, 0, 0)), z)
+    return (-high, -low)
+
+
+def same_games(pairs, i, j):
+    """Return True if candidates i and j took the same number of shots in every game both played
+       (zero paired difference; their settings made no difference to the games)
+    """
+    (games, total, total_sq) = pairs.get((min(i, j), max(i, j)), (0, 0, 0))
+    return games > 0 and total_sq == 0
+
+
+def pruning_z(candidates, max_games, round_games, z = OPTIMIZE_Z):
+    """Return the interval half width used to drop candidates (Bonferroni correction)
+       Every round compares each candidate with the best, so a run looks at the data up to
+       (candidates - 1) * rounds times. Testing every look at z would drop a candidate that
+       is not worse far more often than z promises; splitting the error rate of z evenly
+       between the looks keeps the chance of any wrong drop at most that of one look at z.
+
+       Parameters:
+       candidates: number of candidates
+       max_games: most games any candidate plays
+       round_games: games every surviving candidate plays per round
+       z: half width of the reported confidence intervals in standard errors
+
+       Return:
+       z: half width in standard errors, at least z
+    """
+    looks = max(1, (candidates - 1) * math.ceil(max_games / round_games))
+    alpha = 2 * (1 - NormalDist().cdf(z))
+    return NormalDist().inv_cdf(1 - alpha / (2 * looks))
+
+
+def prune_candidates(results, pairs, alive, round_number, z = OPTIMIZE_Z):
+    """Drop candidates that are clearly worse than the candidate with the lowest mean,
+       or that played the same games as a candidate kept (see same_games)
+
+       Parameters:
+       results: list of dictionaries with "stats", "pruned" and "same_as" (from run_optimizer)
+       pairs: dictionary of paired difference totals (see play_candidates)
+       alive: list of candidate numbers still playing
+       round_number: round just finished, recorded in "pruned"
+       z: interval half width in standard errors
+
+       Return:
+       alive: candidate numbers still playing
+    """
+    best = min(alive, key = lambda number: stats_mean(results[number]["stats"]))
+    kept = []
+    for number in alive:
+        (low, high) = difference_interval(pairs, number, best, z)
+        same = next((other for other in kept if same_games(pairs, number, other)), None)
+        if number != best and (low > 0 or same is not None):
+            results[number]["pruned"] = round_number
+            results[number]["same_as"] = same
+        else:
+            kept.append(number)
+    return kept
+
+
+def run_optimizer(pattern, candidates, max_x, max_y, num_groups, max_games = DEFAULT_MAX_GAMES,
+                  round_games = DEFAULT_ROUND_GAMES, workers = None, chunk_size = DEFAULT_OPTIMIZE_CHUNK,
+                  seed = None, z = OPTIMIZE_Z, quiet = False, fleets = None):
+    """Play rounds of games for every surviving candidate across a pool of worker processes
+
+       Parameters:
+       pattern: shot pattern to tune
+       candidates: list of settings dictionaries
+       max_x: width of grid
+       max_y: height of grid
+       num_groups: number of ship groups passed to setup_ships
+       max_games: most games any candidate plays
+       round_games: games every surviving candidate plays per round
+       workers: number of worker processes (defaults to one per core)
+       chunk_size: number of games per work unit
+       seed: optional seed; every game has its own streams (see play_candidates)
+       z: confidence interval half width in standard errors; candidates are dropped with
+          the wider pruning_z of it
+       quiet: True to skip the progress line printed after every round
+       fleets: optional fleet corpus file name; its grid size and ship groups must match
+
+       Return:
+       (results, pairs, timeouts, seconds): list with one dictionary per candidate holding "params",
+           "stats" (statistics record), "pruned" (round it was dropped in, or None) and
+           "same_as" (candidate it played the same games as, or None),
+           paired difference totals (see play_candidates), total placement timeouts and
+           overall wall time
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    (max_x, max_y) = set_grid_size(max_x, max_y)
+    results = [{"params": params, "stats": create_game_stats(max_x, max_y), "pruned": None, "same_as": None}
+               for params in candidates]
+    alive = list(range(len(candidates)))
+    pairs = {}
+    timeouts = 0
+    first_game = 0
+    round_number = 0
+    prune_z = pruning_z(len(candidates), max_games, round_games, z)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        while round_number == 0 or (len(alive) > 1 and first_game < max_games):
+            round_number = round_number + 1
+            playing = [(number, results[number]["params"]) for number in alive]
+            work = []
+            for chunk in split_into_chunks(min(round_games, max_games - first_game), chunk_size):
+                work.append((chunk, max_x, max_y, num_groups, pattern, playing, seed, first_game, fleets))
+                first_game = first_game + chunk
+            for (records, chunk_pairs, chunk_timeouts, seconds) in pool.map(play_candidates, work):
+                for (number, stats) in records.items():
+                    merge_game_stats(results[number]["stats"], stats)
+                for (key, (games, total, total_sq)) in chunk_pairs.items():
+                    pair = pairs.setdefault(key, [0, 0, 0])
+                    pair[0] = pair[0] + games
+                    pair[1] = pair[1] + total
+                    pair[2] = pair[2] + total_sq
+                timeouts = timeouts + chunk_timeouts
+            alive = prune_candidates(results, pairs, alive, round_number, prune_z)
+            if not quiet:
+                print("ROUND=", round_number, "    ", "GAMES=", first_game, "    ", "CANDIDATES LEFT=", len(alive),
+                      "    ", "SECONDS=", round(time.perf_counter() - start, 2))
+
+    return (results, pairs, timeouts, time.perf_counter() - start)
+
+
+def print_optimizer_summary(pattern, results, pairs, timeouts, seconds, z = OPTIMIZE_Z):
+    """Print one line per candidate, best first, then the best settings
+
+       Parameters:
+       pattern: shot pattern tuned
+       results: list from run_optimizer
+       pairs: paired difference totals from run_optimizer
+       timeouts: number of fleets that could not be placed
+       seconds: overall wall time
+       z: confidence interval half width in standard errors
+
+       Return:
+       nothing
+    """
+    ranked = sorted(range(len(results)), key = lambda number: (results[number]["pruned"] is not None,
+                                                               stats_mean(results[number]["stats"])))
+    best = ranked[0]
+    width = max([len(params_text(result["params"])) for result in results] + [len("PARAMS")]) + 2
+    print(f"{'PARAMS':<{width}}{'GAMES':>8}{'AVERAGE':>10}{'CI LOW':>10}{'CI HIGH':>10}{'STD DEV':>10}{'P90':>8}"
+          f"{'VS BEST':>18}  STATUS")
+    for number in ranked:
+        result = results[number]
+        summary = summarize_game_stats(result["stats"])
+        (low, high) = confidence_interval(result["stats"], z)
+        (diff_low, diff_high) = difference_interval(pairs, number, best, z)
+        if number == best:
+            versus = ""
+        elif same_games(pairs, number, best):
+            versus = "no effect"
+        else:
+            versus = f"{diff_low:+.2f} to {diff_high:+.2f}"
+        if result["pruned"] is None:
+            status = "KEPT"
+        elif result["same_as"] is not None:
+            status = f"PRUNED IN ROUND {result['pruned']}, SAME GAMES AS {params_text(results[result['same_as']]['params'])}"
+        else:
+            status = f"PRUNED IN ROUND {result['pruned']}"
+        print(f"{params_text(result['params']):<{width}}{summary['games']:>8}{summary['mean']:>10.2f}{low:>10.2f}"
+              f"{high:>10.2f}{summary['std_dev']:>10.2f}{summary['p90']:>8.1f}{versus:>18}  {status}")
+    print("")
+
+    (low, high) = confidence_interval(results[best]["stats"], z)
+    print("BEST=", pattern, "params=" + params_text(results[best]["params"]), "    ",
+          "AVERAGE COUNT=", round(stats_mean(results[best]["stats"]), 2), f"({low:.2f} - {high:.2f})")
+    print("CANDIDATES=", len(results), "    ", "SETUP TIMEOUTS=", timeouts, "    ", "SECONDS=", round(seconds, 2))
+
+
+def handle_optimize_args(args):
+    """Handle arguments if any
+    Arguments format is:
+    "pattern=P" for the shot pattern to tune (defaults to random_smart)
+    "space=N:1,2,3;M:0..4" for the search space; a name with a list of values or a range
+        (defaults to every setting of the pattern at its default, see SHOT_PARAMS)
+    "samples=S" to try S random candidates from the space instead of every combination
+    "x=A" where A is width of grid (defaults to 10)
+    "y=B" where B is the height of the grid (defaults to 10)
+    "num=X" for X number of ship groups
+    "games=G" for G games a candidate plays at most (defaults to 10000)
+    "round=R" for R games every surviving candidate plays between prunings (defaults to 1000)
+    "workers=W" for W worker processes (defaults to one per core)
+    "chunk=C" for C games per work unit
+    "seed=S" for seed S so the run can be repeated
+    "quiet" to skip the line printed after every round
+    "fleets=F" to play the fleets of corpus file F (see fleets.py); grid size and ship groups come from F
+
+    Parameters:
+    args: full command line contents
+
+    Return:
+    (pattern, space, samples, x, y, n, games, round_games, workers, chunk_size, seed, quiet, fleets): tuple of settings
+    """
+    pattern = "random_smart"
+    space = None
+    samples = None
+    x = 10
+    y = 10
+    n = 1
+    games = DEFAULT_MAX_GAMES
+    round_games = DEFAULT_ROUND_GAMES
+    workers = None
+    chunk_size = DEFAULT_OPTIMIZE_CHUNK
+    seed = None
+    quiet = False
+    fleets = None
+    for arg in args:
+        if arg.startswith("pattern="):
+            pattern = arg.split('=')[1]
+        if arg.startswith("space="):
+            space = arg.split('=', 1)[1]
+        if arg.startswith("samples="):
+            samples = max(int(arg.split('=')[1]), 1)
+        if arg.startswith("x="):
+            x = int(arg.split('=')[1])
+        if arg.startswith("y="):
+            y = int(arg.split('=')[1])
+        if arg.startswith("num="):
+            n = min(int(arg.split('=')[1]), MAX_SHIP_GROUPS)
+        if arg.startswith("games="):
+            games = int(arg.split('=')[1])
+        if arg.startswith("round="):
+            round_games = max(int(arg.split('=')[1]), 2)
+        if arg.startswith("workers="):
+            workers = int(arg.split('=')[1])
+        if arg.startswith("chunk="):
+            chunk_size = max(int(arg.split('=')[1]), 1)
+        if arg.startswith("seed="):
+            seed = int(arg.split('=')[1])
+        if arg == "quiet":
+            quiet = True
+        if arg.startswith("fleets="):
+            fleets = arg.split('=', 1)[1]
+    return (pattern, space, samples, x, y, n, games, round_games, workers, chunk_size, seed, quiet, fleets)
+
+
+def main():
+    (pattern, space, samples, x, y, n, games, round_games, workers, chunk_size, seed, quiet, fleets) = handle_optimize_args(sys.argv[1:])
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if space is None:
+        space = ";".join(f"{name}:{value}" for (name, value) in SHOT_PARAMS.get(pattern, {}).items())
+
+    if ":" not in pattern and pattern not in SHOT_STRATEGIES:
+        print("OPTIMIZE ERROR: unknown pattern", pattern)
+        return
+    try:
+        get_strategy(pattern)
+        dimensions = parse_space(space)
+        if samples is None:
+            candidates = grid_candidates(dimensions)
+        else:
+            candidates = sample_candidates(dimensions, samples, create_rng(seed, 0, "optimize"))
+    except (ImportError, AttributeError, TypeError, ValueError) as error:
+        print("OPTIMIZE ERROR:", error)
+        return
+    unknown = unknown_params(pattern, [name for (name, values, low, high) in dimensions])
+    if unknown:
+        print("OPTIMIZE ERROR:", pattern, "has no setting", ", ".join(unknown), "- settings are",
+              ", ".join(SHOT_PARAMS.get(pattern, {})) or "none")
+        return
+    if fleets is not None:
+        try:
+            (x, y, n) = corpus_settings(fleets, games)
+        except (OSError, ValueError) as error:
+            print("FLEETS", fleets, "COULD NOT BE READ:", error)
+            return
+
+    (results, pairs, timeouts, seconds) = run_optimizer(pattern, candidates, x, y, n, games, round_games, workers,
+                                                 chunk_size, seed, OPTIMIZE_Z, quiet, fleets)
+    print_optimizer_summary(pattern, results, pairs, timeouts, seconds)
+    print("SEED=", seed, "    ", "PRUNE Z=", round(pruning_z(len(candidates), games, round_games), 2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+
+""" Replay recorded games without choosing shots or printing.
+    10. Turn the ship grid from place_ships into ship masks (one bit per spot, as bitboard.py).
+    20. Turn the recorded shot history into spot numbers and check it in one pass.
+    30. Apply shots in bulk with OR and AND; save the board every REPLAY_CHECKPOINT shots.
+    40. Seek to any shot number from the nearest saved board and render it with print_grid.
+    50. Verify a recorded game: no repeated shots, no shots after the last ship sank, count agrees.
+    60. Games come from a saved game (see savegame.py) or from a shot log (see shotlog.py) with
+        the fleet rebuilt from its seed or fleet corpus; logged hits are checked against the fleet.
+    Replay skips choosing shots, so it is a few times faster than play without printing for
+    cheap patterns such as random (about 2 to 5 times) and far faster for costly ones such as
+    density; main prints both times for the game it shows.
+"""
+
+# Import statements
+from battleship import *
+from savegame import load_game
+import random
+import struct
+import sys
+import time
+
+
+# Set constants
+REPLAY_CHECKPOINT = 64   # shots between saved boards; seek applies at most this many shots
+
+
+def create_replay(max_x, max_y, ship_grid, shot_history):
+    """Prepare a recorded game for replay
+       One pass over the shots with a byte per spot finds repeated shots and the shot
+       that sank the last ship; board masks are only built when seek_replay needs them.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ship_grid: grid with placed ships (from place_ships)
+       shot_history: list of (x, y) shots in order
+
+       Return:
+       replay: dictionary with
+           "board": bitboard (see bitboard.py) with ships; shots and hits follow seek_replay
+           "spots": spot number (y - 1) * max_x + (x - 1) of every shot in order
+           "checkpoints": shots mask after every REPLAY_CHECKPOINT shots, filled in by seek_replay
+           "repeats": shot numbers that repeat an earlier shot
+           "sunk_at": shot number that sank the last ship, or None
+           "unhit": number of ship spots never hit by any recorded shot
+           "position": number of shots applied to board
+    """
+    board = create_bitboard(max_x, max_y, [])
+    chars = board["chars"]
+    ship_spots = bytearray(max_x * max_y)
+    y = 1
+    while y <= max_y:
+        row = ship_grid[y]
+        if row.count(EMPTY_CHAR) < max_x:   # skip rows without ships
+            for x in range(1, max_x + 1):
+                if row[x] != EMPTY_CHAR:
+                    c = (y - 1) * max_x + (x - 1)
+                    ship_spots[c] = 1
+                    chars[row[x]] = chars.get(row[x], 0) | (1 << c)
+        y = y + 1
+    for mask in chars.values():
+        board["ships"] = board["ships"] | mask
+
+    spots = [(y - 1) * max_x + (x - 1) for (x, y) in shot_history]
+    shot_spots = bytearray(max_x * max_y)
+    total = ship_spots.count(1)
+    hits = 0
+    repeats = []
+    sunk_at = None
+    n = 0
+    for c in spots:
+        n = n + 1
+        if shot_spots[c]:
+            repeats.append(n)
+        else:
+            shot_spots[c] = 1
+            if ship_spots[c]:
+                hits = hits + 1
+                if hits == total:
+                    sunk_at = n
+
+    replay = {}
+    replay["board"] = board
+    replay["spots"] = spots
+    replay["checkpoints"] = {0: 0}
+    replay["repeats"] = repeats
+    replay["sunk_at"] = sunk_at
+    replay["unhit"] = total - hits
+    replay["position"] = 0
+    return replay
+
+
+def seek_replay(replay, shot):
+    """Set board to the moment just after shot number shot (0 is before the first shot)
+       Starts from the current position or the nearest saved checkpoint before shot,
+       whichever is closer, so at most REPLAY_CHECKPOINT shots are applied once the
+       checkpoints on the way have been saved.
+
+       Parameters:
+       replay: replay from create_replay
+       shot: shot number; clamped to 0 through number of recorded shots
+
+       Return:
+       board: bitboard at that moment
+    """
+    spots = replay["spots"]
+    board = replay["board"]
+    checkpoints = replay["checkpoints"]
+    shot = max(0, min(shot, len(spots)))
+
+    k = shot // REPLAY_CHECKPOINT
+    while k not in checkpoints:
+        k = k - 1
+    n = k * REPLAY_CHECKPOINT
+    shots = checkpoints[k]
+    if n < replay["position"] <= shot:
+        n = replay["position"]   # already closer than any checkpoint
+        shots = board["shots"]
+
+    while n < shot:
+        shots = shots | (1 << spots[n])
+        n = n + 1
+        if n % REPLAY_CHECKPOINT == 0:
+            checkpoints[n // REPLAY_CHECKPOINT] = shots
+
+    board["shots"] = shots
+    board["hits"] = shots & board["ships"]
+    replay["position"] = shot
+    return board
+
+
+def replay_status(replay):
+    """Summarize the board at the current replay position
+
+       Return:
+       (shot, hits, remaining): shots applied, ship spots hit and ship spots not yet hit
+    """
+    board = replay["board"]
+    hits = bin(board["hits"]).count("1")
+    return (replay["position"], hits, bin(board["ships"]).count("1") - hits)
+
+
+def replay_shot(replay, shot):
+    """Describe one recorded shot
+
+       Parameters:
+       replay: replay from create_replay
+       shot: shot number 1 through number of recorded shots
+
+       Return:
+       (x, y, char): location of shot and ship character hit, or MISS_CHAR for a miss
+    """
+    board = replay["board"]
+    c = replay["spots"][shot - 1]
+    (x, y) = (c % board["max_x"] + 1, c // board["max_x"] + 1)
+    char = bb_ship_char(board, x, y)
+    if char == EMPTY_CHAR:
+        char = MISS_CHAR
+    return (x, y, char)
+
+
+def verify_replay(replay, count = None, complete = True):
+    """Check a recorded game from start to end
+
+       Parameters:
+       replay: replay from create_replay
+       count: optional shot count reported when the game was played
+       complete: True if the recorded game should end with every ship sunk
+                 (False for a game saved part way through)
+
+       Return:
+       problems: list of strings; empty if the recorded game is consistent
+    """
+    problems = []
+    shots = len(replay["spots"])
+    sunk_at = replay["sunk_at"]
+    for n in replay["repeats"]:
+        problems.append(f"shot {n} repeats an earlier shot")
+    if sunk_at is not None and sunk_at < shots:
+        problems.append(f"{shots - sunk_at} shots taken after all ships sunk at shot {sunk_at}")
+    if sunk_at is None and complete:
+        problems.append(f"{replay['unhit']} ship spots never hit")
+    if count is not None and count != shots:
+        problems.append(f"count {count} does not match {shots} recorded shots")
+    return problems
+
+
+def replay_grid(replay, shot = None):
+    """Build the shot grid at a shot number for display with print_grid
+
+       Parameters:
+       replay: replay from create_replay
+       shot: shot number to seek to first, or None for the current position
+
+       Return:
+       grid: shot grid (same layout as create_initial_empty_grid)
+    """
+    if shot is not None:
+        seek_replay(replay, shot)
+    return bitboard_to_grid(replay["board"], False)
+
+
+def read_logged_game(filename, game_id, max_x):
+    """Collect the shots of one game from a shot log
+
+       Parameters:
+       filename: path of shot log (see shotlog.py)
+       game_id: game number the shots were logged with
+       max_x: width of grid
+
+       Return:
+       (shot_history, logged): list of (x, y) shots in order and the ship character
+                               logged for every shot ("" for a miss)
+    """
+    shot_history = []
+    logged = []
+    for (game, spot, hit, char) in read_shot_log(filename):
+        if game == game_id:
+            shot_history.append((spot % max_x + 1, spot // max_x + 1))
+            logged.append(char)
+    return (shot_history, logged)
+
+
+def check_logged_results(ship_grid, shot_history, logged):
+    """Compare the result logged for every shot with the fleet being replayed
+
+       Parameters:
+       ship_grid: grid with placed ships
+       shot_history: list of (x, y) shots in order (from read_logged_game)
+       logged: ship character logged for every shot, "" for a miss
+
+       Return:
+       problems: list of strings; empty if every logged result matches the fleet
+    """
+    problems = []
+    n = 0
+    while n < len(shot_history):
+        (x, y) = shot_history[n]
+        char = "" if ship_grid[y][x] == EMPTY_CHAR else ship_grid[y][x]
+        if char != logged[n]:
+            problems.append(f"shot {n + 1} at {column_label(x)}{y} logged {logged[n] or 'a miss'} but fleet has {char or 'no ship'}")
+        n = n + 1
+    return problems
+
+
+def handle_replay_args(args):
+    """Handle arguments if any
+    Arguments format is:
+    "load=F" to replay the game saved in file F (see savegame.py)
+    "log=F" to replay a game from shot log F (see shotlog.py); the fleet is placed again with
+        "seed=S" (as battleship.py) or read from fleet corpus "fleets=C" (see fleets.py)
+    "game=K" for game K of the shot log (defaults to 0)
+    "shot=S" to show the board just after shot S (defaults to last shot)
+    "x=A", "y=B", "num=X", "pattern=P" to play and record a new game first (as battleship.py)
+
+    Parameters:
+    args: full command line contents
+
+    Return:
+    (load, log, game, seed, fleets, shot, x, y, n, pattern): tuple of settings
+    """
+    load = None
+    log = None
+    game = 0
+    seed = None
+    fleets = None
+    shot = None
+    x = 10
+    y = 10
+    n = 1
+    pattern = "random"
+    for arg in args:
+        if arg.startswith("load="):
+            load = arg.split('=')[1]
+        if arg.startswith("log="):
+            log = arg.split('=', 1)[1]
+        if arg.startswith("game="):
+            game = int(arg.split('=')[1])
+        if arg.startswith("seed="):
+            seed = int(arg.split('=')[1])
+        if arg.startswith("fleets="):
+            fleets = arg.split('=', 1)[1]
+        if arg.startswith("shot="):
+            shot = int(arg.split('=')[1])
+        if arg.startswith("x="):
+            x = int(arg.split('=')[1])
+        if arg.startswith("y="):
+            y = int(arg.split('=')[1])
+        if arg.startswith("num="):
+            n = min(int(arg.split('=')[1]), MAX_SHIP_GROUPS)
+        if arg.startswith("pattern="):
+            pattern = arg.split('=')[1]
+    return (load, log, game, seed, fleets, shot, x, y, n, pattern)
+
+
+def main():
+    (load, log, game, seed, fleets, shot, x, y, n, pattern) = handle_replay_args(sys.argv[1:])
+    problems = []
+    complete = True
+    play_seconds = None
+
+    if load is not None:
+        try:
+            (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, pattern, layout, seed, game, params) = load_game(load)
+        except (OSError, ValueError, struct.error) as error:
+            print("SAVED GAME", load, "COULD NOT BE READ:", error)
+            return
+        complete = False
+    elif log is not None:
+        if fleets is not None:
+            try:
+                corpus = open_fleet_corpus(fleets)
+            except (OSError, ValueError) as error:
+                print("FLEETS", fleets, "COULD NOT BE READ:", error)
+                return
+            (max_x, max_y) = (corpus["max_x"], corpus["max_y"])
+            (ship_grid, layout, timeout) = load_fleet(corpus, game)
+            close_fleet_corpus(corpus)
+        elif seed is not None:
+            (max_x, max_y) = set_grid_size(x, y)
+            (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+            (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, setup_ships(n), create_rng(seed, game))
+        else:
+            print("REPLAY OF A SHOT LOG NEEDS seed= OR fleets= TO REBUILD THE FLEET")
+            return
+        if timeout:
+            print('SETUP TIMEOUT')
+            return
+        try:
+            (shot_history, logged) = read_logged_game(log, game, max_x)
+        except (OSError, ValueError) as error:
+            print("LOG", log, "COULD NOT BE READ:", error)
+            return
+        if len(shot_history) == 0:
+            print("LOG", log, "HAS NO SHOTS FOR GAME", game)
+            return
+        problems = check_logged_results(ship_grid, shot_history, logged)
+        count = None
+    else:
+        (max_x, max_y) = set_grid_size(x, y)
+        ships = setup_ships(n)
+        (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+        layout = []
+        (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, random, layout)
+        if timeout:
+            print('SETUP TIMEOUT')
+            return
+        (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+        shot_state = create_shot_state(max_x, max_y, ships)
+        shot_state["registry"] = create_ship_registry(max_x, ships, layout)
+        shot_history = []
+        count = 0
+        last_hit_xy = (0, 0)
+        last_shot_xy = (0, 0)
+        remaining = count_ship_cells(ships)
+        start = time.perf_counter()
+        while remaining > 0:
+            (count, last_hit_xy, last_shot_xy, shot_history, remaining) = play_game(max_x, max_y, ship_grid, shot_grid, pattern, count, last_hit_xy, last_shot_xy, shot_history, remaining, shot_state, True)
+        play_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()   # time the same work as play: every shot applied, nothing drawn
+    replay = create_replay(max_x, max_y, ship_grid, shot_history)
+    problems = problems + verify_replay(replay, count, complete)
+    seek_replay(replay, len(shot_history) if shot is None else shot)
+    replay_seconds = time.perf_counter() - start
+    grid = replay_grid(replay)
+
+    print_grid(max_x, max_y, grid)
+    (position, hits, remaining) = replay_status(replay)
+    if position > 0:
+        (x, y, char) = replay_shot(replay, position)
+        print("SHOT", position, "of", len(shot_history), "     ", "AT", column_label(x) + str(y), char, "     ", "HITS=", hits, "     ", "REMAINING=", remaining)
+    else:
+        print("SHOT 0 of", len(shot_history), "     ", "REMAINING=", remaining)
+
+    for problem in problems:
+        print("REPLAY PROBLEM:", problem)
+    if play_seconds is not None and replay_seconds > 0:
+        print(pattern, "     ", "PLAY SECONDS=", round(play_seconds, 6), "     ", "REPLAY SECONDS=", round(replay_seconds, 6),
+              "     ", "SPEEDUP=", round(play_seconds / replay_seconds, 1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+""" Save and resume games in progress using a compact versioned binary format.
+    10. Header: magic "BSAV", format version, grid size, shot count, game number,
+        then seed, shot pattern and strategy settings (see parse_params) as text.
+    20. Fleet from setup_ships: type, character and size of every ship.
+    30. Ship layout: four bytes per ship (first spot * 2, plus 1 when the ship runs downward, as fleets.py).
+    40. Shot grid: two bits per spot (0 = no shot, 1 = miss, 2 = hit).
+    50. Shot history: two bytes per shot (spot number (y - 1) * max_x + (x - 1)).
+    Ships are placed with stream create_rng(seed, game) and shots are chosen with stream
+    create_rng(seed, game, pattern), the streams a tournament uses. A resumed game replays
+    its shot history with the same stream, settings and ship registry, so the state of the
+    shot pattern and its random draws are exactly where they were when the game was saved.
+"""
+
+# Import statements
+from battleship import *
+import random
+import struct
+import sys
+
+
+# Set constants
+SAVE_MAGIC = b"BSAV"
+SAVE_VERSION = 4
+SAVE_HEADER = struct.Struct("<4sBHHII")   # magic, version, max_x, max_y, count, game
+SHOT_NONE = 0
+SHOT_MISS = 1
+SHOT_HIT = 2
+
+
+def pack_string(text):
+    """Encode text as one length byte followed by UTF-8 bytes"""
+    data = text.encode("utf-8")[:255]
+    return bytes([len(data)]) + data
+
+
+def unpack_string(data, offset):
+    """Decode text written by pack_string
+
+       Return:
+       (text, offset): text and offset just past it
+    """
+    length = data[offset]
+    return (data[offset + 1:offset + 1 + length].decode("utf-8"), offset + 1 + length)
+
+
+def encode_game(max_x, max_y, ships, layout, shot_grid, shot_history, count, shot_pattern, seed, game, params):
+    """Encode a game in progress as bytes
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ships: fleet from setup_ships
+       layout: (ship character, spot numbers) of every ship, as filled in by place_ships
+       shot_grid: grid tracking shots and results
+       shot_history: list of (x, y) shots in order
+       count: number of shots taken
+       shot_pattern: how shots are determined
+       seed: seed the game was played with (integer or text)
+       game: game number; ships came from stream create_rng(seed, game)
+       params: strategy settings (see SHOT_PARAMS), or None for none
+
+       Return:
+       data: bytes
+    """
+    params = params or {}
+    parts = [SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, max_x, max_y, count, game),
+             pack_string(str(seed)), pack_string(shot_pattern), pack_string(params_text(params))]
+
+    parts.append(struct.pack("<H", len(ships)))
+    for (ship_type, ship_char, ship_size) in ships:
+        parts.append(pack_string(ship_type) + ship_char.encode("ascii") + bytes([ship_size]))
+    codes = encode_layout(max_x, layout)
+    parts.append(struct.pack(f"<{len(codes)}I", *codes))
+
+    shot_bytes = bytearray((max_x * max_y + 3) // 4)
+    c = 0
+    y = 1
+    while y <= max_y:
+        x = 1
+        while x <= max_x:
+            if shot_grid[y][x] == MISS_CHAR:
+                shot_bytes[c // 4] = shot_bytes[c // 4] | (SHOT_MISS << (2 * (c % 4)))
+            elif shot_grid[y][x] != NO_SHOT_CHAR:
+                shot_bytes[c // 4] = shot_bytes[c // 4] | (SHOT_HIT << (2 * (c % 4)))
+            c = c + 1
+            x = x + 1
+        y = y + 1
+    parts.append(bytes(shot_bytes))
+
+    parts.append(struct.pack("<I", len(shot_history)))
+    parts.append(struct.pack(f"<{len(shot_history)}H", *[(y - 1) * max_x + (x - 1) for (x, y) in shot_history]))
+    return b"".join(parts)
+
+
+def decode_game(data):
+    """Decode bytes written by encode_game
+
+       Parameters:
+       data: bytes
+
+       Return:
+       (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, shot_pattern, layout, seed, game, params);
+           seed comes back as text, which create_rng turns into the same streams
+    """
+    if len(data) < SAVE_HEADER.size or data[:len(SAVE_MAGIC)] != SAVE_MAGIC:
+        raise ValueError("not a saved battleship game")
+    (magic, version, max_x, max_y, count, game) = SAVE_HEADER.unpack_from(data, 0)
+    if version != SAVE_VERSION:
+        raise ValueError(f"saved game format version {version} is not supported")
+    offset = SAVE_HEADER.size
+    (seed, offset) = unpack_string(data, offset)
+    (shot_pattern, offset) = unpack_string(data, offset)
+    (text, offset) = unpack_string(data, offset)
+    params = parse_params(text)
+
+    (num_ships,) = struct.unpack_from("<H", data, offset)
+    offset = offset + 2
+    ships = []
+    while len(ships) < num_ships:
+        (ship_type, offset) = unpack_string(data, offset)
+        ships.append((ship_type, chr(data[offset]), data[offset + 1]))
+        offset = offset + 2
+    codes = struct.unpack_from(f"<{num_ships}I", data, offset)
+    offset = offset + 4 * num_ships
+    layout = []
+    for ((ship_type, ship_char, ship_size), code) in zip(ships, codes):
+        step = max_x if code & 1 else 1
+        layout.append((ship_char, tuple((code >> 1) + k * step for k in range(ship_size))))
+    ship_grid = layout_ship_grid(max_x, max_y, layout)
+
+    cells = max_x * max_y
+    shot_bytes = data[offset:offset + (cells + 3) // 4]
+    offset = offset + (cells + 3) // 4
+    (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+    c = 0
+    while c < cells:
+        (x, y) = (c % max_x + 1, c // max_x + 1)
+        shot = (shot_bytes[c // 4] >> (2 * (c % 4))) & 3
+        if shot == SHOT_MISS:
+            shot_grid[y][x] = MISS_CHAR
+        elif shot == SHOT_HIT:
+            shot_grid[y][x] = ship_grid[y][x]
+        c = c + 1
+
+    (num_shots,) = struct.unpack_from("<I", data, offset)
+    offset = offset + 4
+    spots = struct.unpack_from(f"<{num_shots}H", data, offset)
+    shot_history = [(c % max_x + 1, c // max_x + 1) for c in spots]
+
+    return (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, shot_pattern, layout, seed, game, params)
+
+
+def save_game(filename, max_x, max_y, ships, layout, shot_grid, shot_history, count, shot_pattern, seed, game, params):
+    """Write a game in progress to a file (see encode_game for parameters)
+
+       Return:
+       size: number of bytes written
+    """
+    data = encode_game(max_x, max_y, ships, layout, shot_grid, shot_history, count, shot_pattern, seed, game, params)
+    with open(filename, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def load_game(filename):
+    """Read a game written by save_game (see decode_game for return value)"""
+    with open(filename, "rb") as f:
+        return decode_game(f.read())
+
+
+def rebuild_shot_state(max_x, max_y, ships, ship_grid, layout, shot_history, shot_pattern, seed, game, params):
+    """Rebuild state used by the shot patterns by playing the shot history again
+       The shots are chosen again from stream create_rng(seed, game, shot_pattern) with the same
+       settings and a ship registry from the layout, so the strategy sees every shot and sunk ship
+       as it did and the stream is left where the saved game left it.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ships: fleet from setup_ships
+       ship_grid: grid with placed ships
+       layout: (ship character, spot numbers) of every ship
+       shot_history: list of (x, y) shots in order
+       shot_pattern: how shots are determined
+       seed: seed the game was played with
+       game: game number
+       params: strategy settings
+
+       Return:
+       (shot_state, shot_grid, count, last_hit_xy, last_shot_xy, remaining): state ready for the next shot;
+           raises ValueError if the shots chosen again are not the shot history
+    """
+    shot_state = create_shot_state(max_x, max_y, ships, create_rng(seed, game, shot_pattern), params)
+    shot_state["game_id"] = game
+    shot_state["registry"] = create_ship_registry(max_x, ships, layout)
+    (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+    replayed = []
+    count = 0
+    last_hit_xy = (0, 0)
+    last_shot_xy = (0, 0)
+    remaining = count_ship_cells(ships)
+    while len(replayed) < len(shot_history) and remaining > 0:
+        (count, last_hit_xy, last_shot_xy, replayed, remaining) = play_game(max_x, max_y, ship_grid, shot_grid, shot_pattern, count, last_hit_xy, last_shot_xy, replayed, remaining, shot_state, True)
+        if replayed[-1] != shot_history[len(replayed) - 1]:
+            raise ValueError(f"shot {len(replayed)} of saved game does not replay with its seed and settings")
+    if len(replayed) < len(shot_history):
+        raise ValueError("saved game has shots after the last ship sank")
+    return (shot_state, shot_grid, count, last_hit_xy, last_shot_xy, remaining)
+
+
+def resume_game(max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, shot_pattern, layout, seed, game, params,
+                max_shots = None):
+    """Continue a loaded game without printing
+
+       Parameters:
+       see decode_game; max_shots optionally stops after that many more shots
+
+       Return:
+       (count, remaining): shots taken so far and ship spots not yet hit;
+           raises ValueError if the saved shots do not replay (see rebuild_shot_state)
+    """
+    (shot_state, replay_grid, replay_count, last_hit_xy, last_shot_xy, remaining) = rebuild_shot_state(
+        max_x, max_y, ships, ship_grid, layout, shot_history, shot_pattern, seed, game, params)
+    if replay_count != count or replay_grid != shot_grid:
+        raise ValueError("saved shot grid or count does not match its shot history")
+    stop = None if max_shots is None else count + max_shots
+    while remaining > 0 and (stop is None or count < stop):
+        (count, last_hit_xy, last_shot_xy, shot_history, remaining) = play_game(max_x, max_y, ship_grid, shot_grid, shot_pattern, count, last_hit_xy, last_shot_xy, shot_history, remaining, shot_state, True)
+    return (count, remaining)
+
+
+def handle_save_args(args):
+    """Handle arguments if any
+    Arguments format is:
+    "load=F" to resume the game saved in file F
+    "save=F" to save the game to file F when it stops
+    "shots=S" to stop after S more shots
+    "x=A", "y=B", "num=X", "pattern=P", "seed=S", "game=K", "params=..." to start a new game (as battleship.py)
+
+    Parameters:
+    args: full command line contents
+
+    Return:
+    (load, save, max_shots, x, y, n, pattern, seed, game, params): tuple of settings
+    """
+    load = None
+    save = None
+    max_shots = None
+    x = 10
+    y = 10
+    n = 1
+    pattern = "random"
+    seed = None
+    game = 0
+    params = {}
+    for arg in args:
+        if arg.startswith("load="):
+            load = arg.split('=')[1]
+        if arg.startswith("save="):
+            save = arg.split('=')[1]
+        if arg.startswith("shots="):
+            max_shots = int(arg.split('=')[1])
+        if arg.startswith("x="):
+            x = int(arg.split('=')[1])
+        if arg.startswith("y="):
+            y = int(arg.split('=')[1])
+        if arg.startswith("num="):
+            n = min(int(arg.split('=')[1]), MAX_SHIP_GROUPS)
+        if arg.startswith("pattern="):
+            pattern = arg.split('=')[1]
+        if arg.startswith("seed="):
+            seed = int(arg.split('=')[1])
+        if arg.startswith("game="):
+            game = int(arg.split('=')[1])
+        if arg.startswith("params="):
+            params = parse_params(arg.split('=', 1)[1])
+    return (load, save, max_shots, x, y, n, pattern, seed, game, params)
+
+
+def main():
+    (load, save, max_shots, x, y, n, pattern, seed, game, params) = handle_save_args(sys.argv[1:])
+
+    if load is not None:
+        try:
+            (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, pattern, layout, seed, game, params) = load_game(load)
+        except (OSError, ValueError, struct.error) as err:
+            print("LOAD ERROR:", err)
+            return
+    else:
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        (max_x, max_y) = set_grid_size(x, y)
+        ships = setup_ships(n)
+        (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+        layout = []
+        (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(seed, game), layout)
+        if timeout:
+            print('SETUP TIMEOUT')
+            return
+        (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+        shot_history = []
+        count = 0
+    print("SEED=", seed, "    ", "GAME=", game)
+
+    try:
+        (count, remaining) = resume_game(max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, pattern, layout, seed, game, params, max_shots)
+    except ValueError as err:
+        print("LOAD ERROR:", err)
+        return
+    print_grid(max_x, max_y, shot_grid)
+    print(pattern, "     ", "GAME OVER" if remaining == 0 else "PAUSED", "     ", "COUNT=", count, "of", max_x * max_y)
+
+    if save is not None:
+        size = save_game(save, max_x, max_y, ships, layout, shot_grid, shot_history, count, pattern, seed, game, params)
+        print("SAVED", save, size, "BYTES")
+
+if __name__ == "__main__":
+    main()
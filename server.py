@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+
+""" Game server hosting many games at once for human or bot players ("manual" shots).
+    Requests and replies are one JSON object per line over TCP.
+    10. {"op": "new", "x": 10, "y": 10, "num": 1, "seed": S}: place a fleet and return the game number;
+        fleets are placed in a worker thread so a dense fleet does not hold up other games.
+    20. {"op": "shot", "game": G, "x": X, "y": Y}: reply "miss", "hit", "sunk" or "repeat";
+        "sunk" also gives the [x, y] spots of the ship so players can stop shooting around it.
+    30. {"op": "board", "game": G}: reply rows of the shot grid.
+    40. {"op": "end", "game": G}: forget the game.
+    Every reply has "ok"; a failed request gets "ok": false and "error" instead.
+    Games are dropped when the connection that started them closes.
+
+    Bot clients (see play_bot_games) choose shots with the same shot patterns as battleship.py
+    so a server can be load tested, or stand in for players, without a human.
+"""
+
+# Import statements
+from battleship import *
+import asyncio
+import functools
+import json
+import random
+import sys
+import time
+
+
+# Set constants
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8642
+
+
+def create_server_state(seed = None):
+    """Create state shared by every connection to the server
+
+       Parameters:
+       seed: optional seed; game g places its fleet with stream create_rng(seed, g)
+
+       Return:
+       server: dictionary with
+           "games": dictionary of game number to game from new_game
+           "next_game": number given to the next game
+           "seed": seed for fleet placement
+           "moves": number of requests answered
+    """
+    server = {}
+    server["games"] = {}
+    server["next_game"] = 0
+    server["seed"] = random.randrange(2 ** 32) if seed is None else seed
+    server["moves"] = 0
+    return server
+
+
+def next_game_stream(server, seed = None):
+    """Give a new game its number and the stream its fleet is placed with
+
+       Parameters:
+       server: state from create_server_state
+       seed: optional seed for this game instead of the server seed
+
+       Return:
+       (game_id, rng): game number and random number generator from create_rng
+    """
+    game_id = server["next_game"]
+    server["next_game"] = game_id + 1
+    if seed is None:
+        return (game_id, create_rng(server["seed"], game_id))
+    return (game_id, create_rng(seed, 0))
+
+
+def place_fleet(x, y, num, rng):
+    """Place a fleet for a new game; touches no server state so it can run in a worker thread
+
+       Parameters:
+       x: width of grid
+       y: height of grid
+       num: number of ship groups passed to setup_ships
+       rng: random number generator from next_game_stream
+
+       Return:
+       (max_x, max_y, ships, ship_grid, layout, timeout): placed fleet; timeout is True
+           if the ships could not be placed
+    """
+    (max_x, max_y) = set_grid_size(x, y)
+    ships = setup_ships(min(num, MAX_SHIP_GROUPS))
+    (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+    layout = []
+    (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, rng, layout)
+    return (max_x, max_y, ships, ship_grid, layout, timeout)
+
+
+def add_game(server, game_id, max_x, max_y, ships, ship_grid, layout, timeout):
+    """Start hosting a game whose fleet was placed by place_fleet
+
+       Return:
+       game: dictionary with grid size, fleet, ship grid, shot grid, shot count,
+             ship spots not yet hit and the ship registry (see create_ship_registry),
+             or None if the ships could not be placed
+    """
+    if timeout:
+        return None
+    (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+
+    game = {}
+    game["id"] = game_id
+    game["max_x"] = max_x
+    game["max_y"] = max_y
+    game["ships"] = ships
+    game["ship_grid"] = ship_grid
+    game["shot_grid"] = shot_grid
+    game["count"] = 0
+    game["remaining"] = count_ship_cells(ships)
+    game["registry"] = create_ship_registry(max_x, ships, layout)
+    server["games"][game_id] = game
+    return game
+
+
+def new_game(server, x, y, num, seed = None):
+    """Place a fleet for a new game (see new_game_in_worker for the server's own use)
+
+       Parameters:
+       server: state from create_server_state
+       x: width of grid
+       y: height of grid
+       num: number of ship groups passed to setup_ships
+       seed: optional seed for this game instead of the server seed
+
+       Return:
+       game: see add_game
+    """
+    (game_id, rng) = next_game_stream(server, seed)
+    return add_game(server, game_id, *place_fleet(x, y, num, rng))
+
+
+async def new_game_in_worker(server, x, y, num, seed = None):
+    """Place a fleet for a new game in a worker thread so other connections are answered meanwhile
+       Dense fleets can take the placement search a long time (see place_ships).
+       Fleets that cannot fit are rejected on the event loop without starting the search.
+
+       Parameters:
+       see new_game
+
+       Return:
+       game: see add_game
+    """
+    (game_id, rng) = next_game_stream(server, seed)
+    (max_x, max_y) = set_grid_size(x, y)
+    if not fleet_can_fit(max_x, max_y, setup_ships(min(num, MAX_SHIP_GROUPS))):
+        return None
+    placed = await asyncio.get_running_loop().run_in_executor(None, place_fleet, x, y, num, rng)
+    return add_game(server, game_id, *placed)
+
+
+def take_shot(game, x, y):
+    """Shoot at a game and report the result
+
+       Parameters:
+       game: game from new_game
+       x: horizontal location of shot
+       y: vertical location of shot
+
+       Return:
+       reply: dictionary with "result" ("miss", "hit", "sunk" or "repeat" for a spot
+              already shot), "ship" character for a hit, "type" and [x, y] "spots" of
+              ship for "sunk", "count", "remaining" and "game_over"
+    """
+    shot_grid = game["shot_grid"]
+    reply = {}
+    if shot_grid[y][x] != NO_SHOT_CHAR:
+        reply["result"] = "repeat"
+    else:
+        game["count"] = game["count"] + 1
+        char = game["ship_grid"][y][x]
+        if char == EMPTY_CHAR:
+            shot_grid[y][x] = MISS_CHAR
+            reply["result"] = "miss"
+        else:
+            shot_grid[y][x] = char
+            game["remaining"] = game["remaining"] - 1
+            (event, ship) = register_shot(game["registry"], x, y)
+            reply["result"] = "hit" if event == "hit" else "sunk"
+            reply["ship"] = char
+            if event != "hit":
+                (ship_id, ship_type, ship_char, spots) = game["registry"]["ships"][ship]
+                reply["type"] = ship_type
+                reply["spots"] = [[c % game["max_x"] + 1, c // game["max_x"] + 1] for c in spots]
+    reply["count"] = game["count"]
+    reply["remaining"] = game["remaining"]
+    reply["game_over"] = game["remaining"] == 0
+    return reply
+
+
+async def handle_request(server, request, owned):
+    """Answer one request
+
+       Parameters:
+       server: state from create_server_state
+       request: decoded JSON object
+       owned: set of game numbers started by this connection
+
+       Return:
+       reply: dictionary to send back
+    """
+    op = request.get("op")
+    if op == "new":
+        try:
+            x = int(request.get("x", 10))
+            y = int(request.get("y", 10))
+            num = int(request.get("num", 1))
+        except (TypeError, ValueError):
+            return {"ok": False, "error": "x, y and num must be numbers"}
+        if x < 1 or y < 1 or num < 0:
+            return {"ok": False, "error": "x and y must be at least 1 and num at least 0"}
+        game = await new_game_in_worker(server, x, y, num, request.get("seed"))
+        if game is None:
+            return {"ok": False, "error": "ships do not fit on grid"}
+        owned.add(game["id"])
+        return {"ok": True, "game": game["id"], "x": game["max_x"], "y": game["max_y"],
+                "ships": game["ships"], "remaining": game["remaining"]}
+
+    game_id = request.get("game")
+    game = server["games"].get(game_id) if isinstance(game_id, int) else None
+    if game is None or game["id"] not in owned:
+        return {"ok": False, "error": "no such game on this connection"}
+
+    if op == "shot":
+        x = request.get("x")
+        y = request.get("y")
+        if not isinstance(x, int) or not isinstance(y, int) or not (1 <= x <= game["max_x"] and 1 <= y <= game["max_y"]):
+            return {"ok": False, "error": "shot is off the grid"}
+        reply = take_shot(game, x, y)
+        reply["ok"] = True
+        return reply
+    elif op == "board":
+        rows = ["".join(row[1:]) for row in game["shot_grid"][1:]]
+        return {"ok": True, "rows": rows, "count": game["count"], "remaining": game["remaining"]}
+    elif op == "end":
+        owned.discard(game["id"])
+        del server["games"][game["id"]]
+        return {"ok": True}
+    return {"ok": False, "error": f"unknown op {op}"}
+
+
+async def handle_connection(server, reader, writer):
+    """Answer requests from one connection until it closes, then drop its games"""
+    owned = set()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+            except ValueError:
+                request = None
+            if isinstance(request, dict):
+                reply = await handle_request(server, request, owned)
+            else:
+                reply = {"ok": False, "error": "request must be one JSON object per line"}
+            server["moves"] = server["moves"] + 1
+            writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+            await writer.drain()
+    except (ConnectionError, ValueError):
+        pass   # connection lost or line longer than the stream limit
+    finally:
+        for game_id in owned:
+            server["games"].pop(game_id, None)
+        writer.close()
+
+
+async def start_server(host = SERVER_HOST, port = SERVER_PORT, seed = None):
+    """Start listening; port 0 picks a free port
+
+       Return:
+       (server, listener): state from create_server_state and asyncio server
+    """
+    server = create_server_state(seed)
+    listener = await asyncio.start_server(functools.partial(handle_connection, server), host, port)
+    return (server, listener)
+
+
+async def send_request(reader, writer, request):
+    """Send one request and wait for its reply"""
+    writer.write(json.dumps(request).encode("utf-8") + b"\n")
+    return json.loads(await reader.readline())
+
+
+async def play_bot_game(reader, writer, shot_pattern, x, y, num, rng):
+    """Play one game on the server choosing shots with a battleship.py shot pattern
+
+       Parameters:
+       reader, writer: open connection to the server
+       shot_pattern: how shots are determined (see play_game)
+       x: width of grid
+       y: height of grid
+       num: number of ship groups
+       rng: random number generator from create_rng for choosing shots
+
+       Return:
+       (count, latencies): shots taken and seconds waited for every reply,
+           or None if the server could not start the game
+    """
+    reply = await send_request(reader, writer, {"op": "new", "x": x, "y": y, "num": num})
+    if not reply["ok"]:
+        return None
+    game_id = reply["game"]
+    (max_x, max_y) = (reply["x"], reply["y"])
+    ships = [tuple(ship) for ship in reply["ships"]]
+    (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+    shot_state = create_shot_state(max_x, max_y, ships, rng)
+    shot_state["registry"] = create_ship_registry(max_x, ships, [])   # ships are added as they sink
+    registry = shot_state["registry"]
+
+    count = 0
+    latencies = []
+    strategy = start_strategy(shot_state, shot_pattern)
+    game_over = reply["remaining"] == 0
+    while not game_over:
+        count = count + 1
+        (x, y) = strategy["next_shot"](shot_state)
+        start = time.perf_counter()
+        reply = await send_request(reader, writer, {"op": "shot", "game": game_id, "x": x, "y": y})
+        latencies.append(time.perf_counter() - start)
+        if reply["result"] == "repeat":
+            hit = shot_grid[y][x] != MISS_CHAR   # grid already shows what is there
+        else:
+            hit = reply["result"] in ("hit", "sunk")
+            shot_grid[y][x] = reply["ship"] if hit else MISS_CHAR
+        event = None
+        if reply["result"] == "hit":
+            event = ("hit", None)
+        elif reply["result"] == "sunk":
+            ship = len(registry["ships"])
+            registry["ships"].append((ship, reply["type"], reply["ship"], tuple((sx - 1) + (sy - 1) * max_x for (sx, sy) in reply["spots"])))
+            event = ("all sunk" if reply["game_over"] else "sunk", ship)
+        shot_state["event"] = event
+        mark_shot_taken(shot_state, max_x, x, y, hit, event)
+        game_over = reply["game_over"]
+
+    await send_request(reader, writer, {"op": "end", "game": game_id})
+    return (count, latencies)
+
+
+async def play_bot_games(host, port, bots, games, shot_pattern, x, y, num, seed = None):
+    """Play games on the server from many bot connections at once
+
+       Parameters:
+       host, port: address of server
+       bots: number of connections playing at the same time
+       games: total number of games, shared between the bots
+       shot_pattern: how bots choose shots (see play_game)
+       x, y, num: grid size and number of ship groups of every game
+       seed: optional seed; bot b chooses shots with stream create_rng(seed, b)
+
+       Return:
+       results: list of (count, latencies) tuples, one per game; None for a game
+           the server could not start
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    async def bot(b, bot_games):
+        (reader, writer) = await asyncio.open_connection(host, port)
+        rng = create_rng(seed, b)
+        results = []
+        while len(results) < bot_games:
+            results.append(await play_bot_game(reader, writer, shot_pattern, x, y, num, rng))
+        writer.close()
+        return results
+
+    tasks = []
+    b = 0
+    while b < bots:
+        tasks.append(bot(b, games // bots + (1 if b < games % bots else 0)))
+        b = b + 1
+    results = []
+    for bot_results in await asyncio.gather(*tasks):
+        results.extend(bot_results)
+    return results
+
+
+async def run_load_test(bots, games, shot_pattern, x, y, num, seed):
+    """Start a server on a free port and play bot games against it in the same process
+
+       Return:
+       (results, seconds): results from play_bot_games and wall time
+    """
+    (server, listener) = await start_server(SERVER_HOST, 0, seed)
+    port = listener.sockets[0].getsockname()[1]
+    start = time.perf_counter()
+    results = await play_bot_games(SERVER_HOST, port, bots, games, shot_pattern, x, y, num, seed)
+    seconds = time.perf_counter() - start
+    listener.close()
+    await listener.wait_closed()
+    return (results, seconds)
+
+
+async def serve_forever(host, port, seed):
+    """Run the server until interrupted"""
+    (server, listener) = await start_server(host, port, seed)
+    print("SERVING ON", host, port, "     ", "SEED=", server["seed"])
+    async with listener:
+        await listener.serve_forever()
+
+
+def handle_server_args(args):
+    """Handle arguments if any
+    Arguments format is:
+    "host=H" and "port=P" for address to serve on or connect to
+    "seed=S" for seed S so fleets and bot shots can be repeated
+    "bots=B" to play bot games instead of serving: B connections at once
+    "games=G" for G bot games in total (defaults to bots)
+    "local" to start a server in the same process for the bots (load test)
+    "x=A", "y=B", "num=X", "pattern=P" for bot games (as battleship.py)
+
+    Parameters:
+    args: full command line contents
+
+    Return:
+    (host, port, seed, bots, games, local, x, y, n, pattern): tuple of settings
+    """
+    host = SERVER_HOST
+    port = SERVER_PORT
+    seed = None
+    bots = 0
+    games = None
+    local = False
+    x = 10
+    y = 10
+    n = 1
+    pattern = "random_smart"
+    for arg in args:
+        if arg.startswith("host="):
+            host = arg.split('=')[1]
+        if arg.startswith("port="):
+            port = int(arg.split('=')[1])
+        if arg.startswith("seed="):
+            seed = int(arg.split('=')[1])
+        if arg.startswith("bots="):
+            bots = int(arg.split('=')[1])
+        if arg.startswith("games="):
+            games = int(arg.split('=')[1])
+        if arg == "local":
+            local = True
+        if arg.startswith("x="):
+            x = int(arg.split('=')[1])
+        if arg.startswith("y="):
+            y = int(arg.split('=')[1])
+        if arg.startswith("num="):
+            n = int(arg.split('=')[1])
+        if arg.startswith("pattern="):
+            pattern = arg.split('=')[1]
+    if games is None:
+        games = bots
+    return (host, port, seed, bots, games, local, x, y, n, pattern)
+
+
+def main():
+    (host, port, seed, bots, games, local, x, y, n, pattern) = handle_server_args(sys.argv[1:])
+    if bots <= 0:
+        try:
+            asyncio.run(serve_forever(host, port, seed))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    start = time.perf_counter()
+    if local:
+        (results, seconds) = asyncio.run(run_load_test(bots, games, pattern, x, y, n, seed))
+    else:
+        results = asyncio.run(play_bot_games(host, port, bots, games, pattern, x, y, n, seed))
+        seconds = time.perf_counter() - start
+
+    failed = results.count(None)
+    results = [result for result in results if result is not None]
+    latencies = sorted(latency for (count, game_latencies) in results for latency in game_latencies)
+    moves = len(latencies)
+    if moves == 0:
+        print("NO GAMES PLAYED", "    ", "FAILED=", failed)
+        return
+    print(pattern, "     ", "GAMES=", len(results), "    ", "FAILED=", failed, "    ", "BOTS=", bots, "    ",
+          "AVERAGE COUNT=", round(sum(r[0] for r in results) / len(results), 2), "    ",
+          "MOVES/SEC=", round(moves / seconds, 1))
+    print("LATENCY MS     ", "MEDIAN=", round(latencies[moves // 2] * 1000, 3), "    ",
+          "P99=", round(latencies[min(moves - 1, moves * 99 // 100)] * 1000, 3), "    ",
+          "MAX=", round(latencies[-1] * 1000, 3))
+
+if __name__ == "__main__":
+    main()
@@ -12,12 +12,9 @@
 """
 
 # Import statements
+import functools
+import instrument
 import random
-from datetime import datetime
-
-
-# Initialize random number generator for ship location and orientation
-random.seed(datetime.now())
 
 
 # Set default values
@@ -35,7 +32,27 @@ NO_SHOT_CHAR = " "
 MISS_CHAR = "X"  
 MAX_SHIP_GROUPS = 100  # maximum number of ship groups that can be selected.  Relate to grid size \
                      #  since one ship group uses 17 grids ?
-MAX_TIMEOUT = 100000  # Try to configure ships 100k times; else timeout ship placement and quit session
+PLACEMENT_CACHE_SIZE = 64  # board size and ship size combinations kept in placement index; least recently used dropped first
+MAX_TIMEOUT = 5000  # Try 5k ship placements (including backtracking); else timeout ship placement and quit session
+DENSE_FLEET_FILL = 0.95  # fleets covering more of an empty grid than this are packed in lines (see pack_ships_in_lines)
+SAMPLE_TRIES = 1000  # random placements drawn for one ship before sampling gives up (see sample_ship_placements)
+
+
+def column_label(column):
+    """ Return heading for a column counting from 1
+        Columns past Z use more letters like a spreadsheet: Z, AA, AB ... AZ, BA ... ZZ, AAA
+
+    Parameters:
+    column: column number, 1 is "A"
+
+    Return:
+    label: string of column heading letters
+    """
+    label = ""
+    while column > 0:
+        (column, letter) = divmod(column - 1, 26)
+        label = MAX_HEADING[letter] + label
+    return label
 
 
 def create_column_headings(width = default_x):
@@ -58,7 +75,7 @@ def create_column_headings(width = default_x):
     
     j = 0
     while j < width:
-        heading.append(MAX_HEADING[j])
+        heading.append(column_label(j + 1))
         j = j + 1
     return heading
 
@@ -181,7 +198,44 @@ def setup_ships(num = 1):
     return ships
 
 
-def generate_random_position(max_x, max_y):
+def count_ship_cells(ships):
+    """ Count grid spots covered by all ships
+        Used as the number of unhit ship spots at the start of a game
+        so game over can be detected without scanning the grid.
+
+        Parameters:
+        ships: list of tuples in form of (ship type, grid character, number of grid spots)
+
+        Return:
+        cells: total number of grid spots taken by ships
+    """
+    cells = 0
+    for (ship_type, ship_char, ship_size) in ships:
+        cells = cells + ship_size
+    return cells
+
+
+def create_rng(seed = None, *stream):
+    """Create a random number generator for one game, worker or other stream of draws
+       Every function that draws random numbers takes one of these as rng
+       (the random module itself is used when none is passed).
+       The seed and stream numbers are hashed together (SHA-512, as random.seed does
+       for text) so streams such as (seed, game 0) and (seed, game 1) are independent
+       and the same seed and stream always give the same draws, in any process.
+
+       Parameters:
+       seed: integer or text; None seeds from the operating system
+       stream: any number of integers naming the stream (for example worker, game)
+
+       Return:
+       rng: random.Random instance
+    """
+    if seed is None:
+        return random.Random()
+    return random.Random(":".join(str(part) for part in (seed,) + stream))
+
+
+def generate_random_position(max_x, max_y, rng = random):
     """ Return random number
         Top row ([0]) is reserved for column headings so range does not start with 1
         First column ([0]) is reserved for row numbers
@@ -189,6 +243,7 @@ def generate_random_position(max_x, max_y):
         Parameters:
         max_x: width of grid
         max_y: height of grid
+        rng: random number generator from create_rng
         num: random number
         x: modulo remainder of random number divided by width of grid + 1;
            so num=10 becomes x=1 aka "A" and y= 1
@@ -199,18 +254,18 @@ def generate_random_position(max_x, max_y):
         (x, y): tuple with random x, y co-ordinates
     """
 
-    num = random.randint(max_x, max_x * (max_y + 1) - 1)
+    num = rng.randint(max_x, max_x * (max_y + 1) - 1)
     x = num % max_x  + 1
     y = num // max_x
     return (x, y)
 
 
-def generate_random_orientation():
+def generate_random_orientation(rng = random):
     """return value of 1 through 4 inclusive
        where 1 = upward, 2 = downward, 3 = leftward, 4 = rightward
 
        Parameters:
-       nothing passed in
+       rng: random number generator from create_rng
 
        Return: 
        orientation: integer between 1 and 4 inclusive where
@@ -219,7 +274,7 @@ def generate_random_orientation():
             3 = leftward
             4 = rightward
     """
-    orientation = random.randint(1,4)
+    orientation = rng.randint(1,4)
     return orientation
 
 
@@ -302,6 +357,8 @@ def does_ship_fit(max_x, max_y, grid, x, y, orientation, size, EMPTY_CHAR):
     elif orientation == 4 and size + x <= max_x + 1 and not ship_overlap(max_x, max_y, grid, x, y, orientation, size, EMPTY_CHAR):
         ship_fit = True
 
+    if not ship_fit and instrument.stats is not None:
+        instrument.count("does_ship_fit_rejections")
     return ship_fit
 
 
@@ -359,55 +416,487 @@ def print_grid(max_x, max_y, grid):
         print(row)
 
 
-def place_ships(max_x, max_y, grid, ships):
+def fleet_can_fit(max_x, max_y, ships, grid = None):
+    """Quick check whether a fleet could possibly be placed on the grid
+       Rejects impossible x/y/num combinations before any placement is tried.
+       Ships of size s or more can only lie in straight runs of at least s empty spots,
+       so for every ship size the spots in such runs must cover every spot of those ships.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ships: list of tuples in form of (ship type, grid character, number of grid spots)
+       grid: optional list of rows that already holds ships; the run check is skipped without one
+             since on an empty grid it adds nothing to the size checks
+
+       Return:
+       fits: boolean; False if fleet certainly cannot be placed
+    """
+    fits = True
+    if count_ship_cells(ships) > max_x * max_y:
+        fits = False   # not enough grid spots for every ship spot
+
+    for (ship_type, ship_char, ship_size) in ships:
+        if ship_size > max_x and ship_size > max_y:
+            fits = False   # ship longer than grid in both directions
+
+    if fits and grid is not None:
+        for size in sorted(set(ship_size for (ship_type, ship_char, ship_size) in ships)):
+            needed = sum(ship_size for (ship_type, ship_char, ship_size) in ships if ship_size >= size)
+            if usable_free_cells(max_x, max_y, grid, size) < needed:
+                fits = False   # runs long enough for these ships hold too few empty spots
+                break
+
+    return fits
+
+
+def free_run_lengths(max_x, max_y, grid):
+    """Count empty grid spots in a straight line starting at every spot
+       A ship of size s fits rightward from (x, y) if right[y][x] >= s
+       and downward if down[y][x] >= s.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       grid: list of rows
+
+       Return:
+       (right, down): lists of rows with run lengths going right and going down
+    """
+    right = [[0] * (max_x + 2) for y in range(max_y + 2)]
+    down = [[0] * (max_x + 2) for y in range(max_y + 2)]
+
+    y = max_y
+    while y >= 1:
+        x = max_x
+        while x >= 1:
+            if grid[y][x] == EMPTY_CHAR:
+                right[y][x] = right[y][x + 1] + 1
+                down[y][x] = down[y + 1][x] + 1
+            x = x - 1
+        y = y - 1
+    return (right, down)
+
+
+@functools.lru_cache(maxsize = PLACEMENT_CACHE_SIZE)
+def placement_index(max_x, max_y, size):
+    """List every placement of a ship of this size on an empty grid
+       Built once per board size and ship size and shared by every game in the process.
+       Only downward (2) and rightward (4) orientations are listed since an upward or
+       leftward placement covers the same spots as a downward or rightward one.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       size: number of grid spots for ship size
+
+       Return:
+       placements: tuple of (x, y, orientation, spots, mask) tuples where spots is tuple of
+                   spot numbers (y - 1) * max_x + (x - 1) covered and mask has a bit set for each
+    """
+    placements = []
+    y = 1
+    while y <= max_y:
+        x = 1
+        while x <= max_x:
+            first = (y - 1) * max_x + (x - 1)
+            if y + size <= max_y + 1:
+                spots = tuple(first + n * max_x for n in range(size))
+                placements.append((x, y, 2, spots, sum(1 << c for c in spots)))
+            if x + size <= max_x + 1 and size > 1:
+                spots = tuple(first + n for n in range(size))
+                placements.append((x, y, 4, spots, sum(1 << c for c in spots)))
+            x = x + 1
+        y = y + 1
+    return tuple(placements)
+
+
+def grid_occupied_mask(max_x, max_y, grid):
+    """Build mask with a bit set for every grid spot that is not empty
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       grid: list of rows
+
+       Return:
+       occupied: integer mask, bit number (y - 1) * max_x + (x - 1)
+    """
+    occupied = 0
+    y = 1
+    while y <= max_y:
+        x = 1
+        while x <= max_x:
+            if grid[y][x] != EMPTY_CHAR:
+                occupied = occupied | (1 << ((y - 1) * max_x + (x - 1)))
+            x = x + 1
+        y = y + 1
+    return occupied
+
+
+def valid_placements(max_x, max_y, occupied, size):
+    """List every placement of a ship that fits on the grid without overlap
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       occupied: mask of grid spots already taken (see grid_occupied_mask)
+       size: number of grid spots for ship size
+
+       Return:
+       placements: list of (x, y, orientation, spots, mask) tuples from placement_index
+    """
+    return [p for p in placement_index(max_x, max_y, size) if p[4] & occupied == 0]
+
+
+def usable_free_cells(max_x, max_y, grid, size):
+    """Count empty grid spots that are inside at least one straight run of
+       empty spots long enough for a ship of this size
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       grid: list of rows
+       size: number of grid spots for smallest remaining ship
+
+       Return:
+       usable: number of empty spots a ship of this size could still cover
+    """
+    (right, down) = free_run_lengths(max_x, max_y, grid)
+    covered = [[False] * (max_x + 1) for y in range(max_y + 1)]
+    usable = 0
+    y = 1
+    while y <= max_y:
+        x = 1
+        while x <= max_x:
+            # Mark whole run when standing on first spot of a long enough run
+            if right[y][x] >= size and right[y][x - 1] == 0:
+                n = 0
+                while n < right[y][x]:
+                    if not covered[y][x + n]:
+                        covered[y][x + n] = True
+                        usable = usable + 1
+                    n = n + 1
+            if down[y][x] >= size and down[y - 1][x] == 0:
+                n = 0
+                while n < down[y][x]:
+                    if not covered[y + n][x]:
+                        covered[y + n][x] = True
+                        usable = usable + 1
+                    n = n + 1
+            x = x + 1
+        y = y + 1
+    return usable
+
+
+def take_random_placement(placements, rng = random):
+    """Remove and return a random placement so it is not tried again
+
+       Parameters:
+       placements: list of (x, y, orientation) tuples
+       rng: random number generator from create_rng
+
+       Return:
+       placement: (x, y, orientation) tuple
+    """
+    i = rng.randrange(len(placements))
+    placement = placements[i]
+    placements[i] = placements[-1]
+    placements.pop()
+    return placement
+
+
+def sample_ship_placements(max_x, max_y, ships, occupied = 0, rng = random):
+    """Place ships in order by drawing random placements until one does not overlap (rejection sampling)
+       Fast for the fleets most games use, which leave most of the grid empty.
+       Gives up as soon as one ship has been drawn SAMPLE_TRIES times without fitting.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ships: list of tuples in form of (ship type, grid character, number of grid spots)
+       occupied: mask of grid spots already taken (see grid_occupied_mask)
+       rng: random number generator from create_rng
+
+       Return:
+       (placements, tries): list of (x, y, orientation, spots, mask) tuples from placement_index
+                            in ships order, or None if sampling gave up, and placements drawn
+    """
+    placements = []
+    tries = 0
+    for (ship_type, ship_char, ship_size) in ships:
+        index = placement_index(max_x, max_y, ship_size)
+        n = 0
+        while True:
+            if n == SAMPLE_TRIES:
+                return (None, tries + n)
+            placement = index[rng.randrange(len(index))]
+            n = n + 1
+            if placement[4] & occupied == 0:
+                break
+        tries = tries + n
+        placements.append(placement)
+        occupied = occupied | placement[4]
+    return (placements, tries)
+
+
+def pack_ships_in_lines(max_x, max_y, ships, rng = random):
+    """Place a fleet on an empty grid by packing every ship into rows, or else into columns
+       Ships are taken largest first and put in the first line, in random line order, with room left.
+       Then the ships of every line are shuffled and the line's empty spots spread between them at random.
+       This finds placements for fleets too dense for the search in place_ships to finish,
+       but the placements are not drawn evenly from every possible placement.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ships: list of tuples in form of (ship type, grid character, number of grid spots)
+       rng: random number generator from create_rng
+
+       Return:
+       placements: list of (x, y, orientation, spots, mask) tuples in ships order,
+                   or None if the ships do not fit in lines of either direction
+    """
+    directions = [True, False]   # True packs rows, False packs columns
+    rng.shuffle(directions)
+    for rows in directions:
+        (length, lines) = (max_x, max_y) if rows else (max_y, max_x)
+        order = list(range(lines))
+        rng.shuffle(order)
+        room = [length] * lines
+        members = [[] for line in range(lines)]
+        packed = True
+        for n in sorted(range(len(ships)), key = lambda n: -ships[n][2]):
+            size = ships[n][2]
+            line = next((line for line in order if room[line] >= size), None)
+            if line is None:
+                packed = False
+                break
+            room[line] = room[line] - size
+            members[line].append(n)
+        if not packed:
+            continue
+
+        placements = [None] * len(ships)
+        for line in range(lines):
+            rng.shuffle(members[line])
+            gaps = sorted(rng.randint(0, room[line]) for n in members[line])   # empty spots before each ship
+            start = 0
+            for (n, gap) in zip(members[line], gaps):
+                size = ships[n][2]
+                if rows:
+                    (x, y) = (gap + start + 1, line + 1)
+                else:
+                    (x, y) = (line + 1, gap + start + 1)
+                first = (y - 1) * max_x + (x - 1)
+                if rows and size > 1:
+                    spots = tuple(first + k for k in range(size))
+                    orientation = 4
+                else:
+                    spots = tuple(first + k * max_x for k in range(size))
+                    orientation = 2
+                placements[n] = (x, y, orientation, spots, sum(1 << c for c in spots))
+                start = start + size
+        return placements
+    return None
+
+
+def place_ships(max_x, max_y, grid, ships, rng = random, layout = None):
     """Place ships in order of largest to smallest - seems easiest.
-       Generate random number which determines location
-       Generate random number which determines orientation
+       First draw random placements until each ship fits (see sample_ship_placements).
+       Only if sampling gives up, list for every ship all placements that still fit and
+       pick one at random; if a ship has no placement left then take back the previous
+       ship and try another placement for it (backtracking).
+       Fleets filling more than DENSE_FLEET_FILL of an empty grid, and fleets the search
+       gives up on, are packed in lines instead (see pack_ships_in_lines).
+       Nothing is printed; callers report a timeout.
 
     Parameters:
         max_x: width of grid
         max_y: height of grid
         grid: list of rows
         ships: tuple of (ship type, ship character, ship size)
-        ship: counter for ships
-        fit: boolean
-        (x, y): tuple of random position
-        orientation: 
-            Where = 1 is upwards aka "north" from random point (x,y)
-            Where = 2 is downwards aka "south" from random point
-            Where = 3 is leftward aka "west" from random point
-            Where = 4 is rightward aka "east" from random point.
+        rng: random number generator from create_rng
+        layout: optional list; (ship character, spot numbers) of every ship placed is appended
+            so ships sharing a character can be told apart (spot number is (y - 1) * max_x + (x - 1))
+        candidates: list of remaining placements to try for every ship already reached
+        placed: list of placements used for ships already on grid
+        occupied: mask of grid spots taken by ships
+        (x, y, orientation, spots, mask): placement from placement_index where orientation
+            Where = 2 is downwards aka "south" from point (x,y)
+            Where = 4 is rightward aka "east" from point (x,y)
 
     Return:
-        grid
+        (grid, timeout): grid with ships and True if ships could not be placed
     """
 
     timeout_counter = 1
     timeout = False
 
-    for ship in ships:
-        (type, char, size) = ship
-        fit = False
-        while not fit and not timeout: 
+    occupied = grid_occupied_mask(max_x, max_y, grid)
+    if not fleet_can_fit(max_x, max_y, ships, grid if occupied else None):
+        timeout = True
+        if instrument.stats is not None:
+            instrument.count("placement_timeouts")
+        return (grid, timeout)
+
+    candidates = []
+    placed = []
+    free = max_x * max_y - bin(occupied).count("1")
+    rejected = 0        # placements that do not fit (instrument counters)
+    forward_rejects = 0
+    backtracks = 0
+    packed = 0
+    sampled = 0
+    empty = occupied == 0
+    if empty and count_ship_cells(ships) > DENSE_FLEET_FILL * max_x * max_y:
+        placed = pack_ships_in_lines(max_x, max_y, ships, rng) or []
+        packed = 1 if placed else 0
+    else:
+        (placed, sampled) = sample_ship_placements(max_x, max_y, ships, occupied, rng)
+        placed = placed or []   # sampling gave up so search every placement below
+    n = 0
+    while n < len(placed):
+        (x, y, orientation, spots, mask) = placed[n]
+        populate_grid(max_x, max_y, grid, x, y, orientation, ships[n][2], ships[n][1])
+        occupied = occupied | mask
+        free = free - ships[n][2]
+        n = n + 1
+    while len(placed) < len(ships) and not timeout:
+        depth = len(placed)
+        (type, char, size) = ships[depth]
+        if len(candidates) == depth:
+            candidates.append(valid_placements(max_x, max_y, occupied, size))
+            rejected = rejected + len(placement_index(max_x, max_y, size)) - len(candidates[depth])
+
+        if len(candidates[depth]) > 0:
             timeout_counter = timeout_counter + 1
             if timeout_counter > MAX_TIMEOUT:
                 timeout = True
-                print('SETUP TIMEOUT')
-
-            (x, y) = generate_random_position(max_x, max_y)
-
-            # generate random orientation for ship (up, down, left, right)
-            orientation = generate_random_orientation()
-   
-            # Does this position and orientation fit on grid without overlapping another ship
-            # If not, then generate new position and orientation and try again
-            
-            fit = does_ship_fit(max_x, max_y, grid, x, y, orientation, size, EMPTY_CHAR)
-
-        populate_grid(max_x, max_y, grid, x, y, orientation, size, char)
+            placement = take_random_placement(candidates[depth], rng)
+            (x, y, orientation, spots, mask) = placement
+            populate_grid(max_x, max_y, grid, x, y, orientation, size, char)
+            placed.append(placement)
+            occupied = occupied | mask
+            free = free - size
+
+            # Forward check: take placement back at once if remaining ships cannot cover enough spots
+            # Only worth the grid scan once remaining ships need more than half the empty spots
+            ships_left = ships[depth + 1:]
+            cells_left = count_ship_cells(ships_left)
+            if len(ships_left) > 0 and cells_left * 2 > free:
+                smallest = min(ship_size for (ship_type, ship_char, ship_size) in ships_left)
+                if usable_free_cells(max_x, max_y, grid, smallest) < cells_left:
+                    forward_rejects = forward_rejects + 1
+                    placed.pop()
+                    populate_grid(max_x, max_y, grid, x, y, orientation, size, EMPTY_CHAR)
+                    occupied = occupied & ~mask
+                    free = free + size
+        elif depth == 0:
+            timeout = True   # every placement of first ship failed
+        else:
+            # No room for this ship so take back previous ship and try its next placement
+            backtracks = backtracks + 1
+            candidates.pop()
+            (x, y, orientation, spots, mask) = placed.pop()
+            (type, char, size) = ships[depth - 1]
+            populate_grid(max_x, max_y, grid, x, y, orientation, size, EMPTY_CHAR)
+            occupied = occupied & ~mask
+            free = free + size
+
+    if timeout and empty:
+        # Search gave up so take every ship back and try packing them in lines
+        n = 0
+        while n < len(placed):
+            (x, y, orientation, spots, mask) = placed[n]
+            populate_grid(max_x, max_y, grid, x, y, orientation, ships[n][2], EMPTY_CHAR)
+            n = n + 1
+        placed = pack_ships_in_lines(max_x, max_y, ships, rng) or []
+        if placed:
+            timeout = False
+            packed = 1
+            n = 0
+            while n < len(placed):
+                (x, y, orientation, spots, mask) = placed[n]
+                populate_grid(max_x, max_y, grid, x, y, orientation, ships[n][2], ships[n][1])
+                n = n + 1
+
+    if instrument.stats is not None:
+        instrument.count("placements_sampled", sampled)
+        instrument.count("placements_tried", timeout_counter - 1)
+        instrument.count("placements_packed", packed)
+        instrument.count("placements_not_fitting", rejected)
+        instrument.count("placement_forward_rejects", forward_rejects)
+        instrument.count("placement_backtracks", backtracks)
+        if timeout:
+            instrument.count("placement_timeouts")
+
+    if layout is not None and not timeout:
+        n = 0
+        while n < len(placed):
+            layout.append((ships[n][1], placed[n][3]))
+            n = n + 1
 
     # All ships placed so print grid now
     # print_grid(max_x, max_y, grid)
     return (grid, timeout)
 
 
+def create_ship_registry(max_x, ships, layout):
+    """Build the registry of placed ships so a hit can be traced to the ship it hit
+       Several ships can share a grid character (num > 1) so ships are told apart by ship id.
+
+    Parameters:
+        max_x: width of grid
+        ships: tuple of (ship type, ship character, ship size) passed to place_ships
+        layout: list filled in by place_ships; (ship character, spot numbers) of every ship in order
+
+    Return:
+        registry: dictionary with
+            "max_x": width of grid
+            "ships": list of (ship id, ship type, ship character, spot numbers); ship id is position in list
+            "ship_of": dictionary of spot number (y - 1) * max_x + (x - 1) to ship id
+            "unhit": list of ship spots not yet hit for every ship id
+            "afloat": number of ships not yet sunk
+    """
+    registry = {}
+    registry["max_x"] = max_x
+    registry["ships"] = []
+    registry["ship_of"] = {}
+    registry["unhit"] = []
+    n = 0
+    while n < len(layout):
+        (char, spots) = layout[n]
+        registry["ships"].append((n, ships[n][0], char, spots))
+        for c in spots:
+            registry["ship_of"][c] = n
+        registry["unhit"].append(len(spots))
+        n = n + 1
+    registry["afloat"] = len(layout)
+    return registry
+
+
+def register_shot(registry, x, y):
+    """Record the first shot at a grid location and report what it did
+       Call once per grid location; a repeated shot would count its hit twice.
+
+    Parameters:
+        registry: registry from create_ship_registry
+        x: horizontal location of shot
+        y: vertical location of shot
+
+    Return:
+        (event, ship): event is "miss", "hit", "sunk" or "all sunk" (the last ship sank)
+            and ship is the ship id hit, or None for a miss
+    """
+    ship = registry["ship_of"].get((y - 1) * registry["max_x"] + (x - 1))
+    if ship is None:
+        return ("miss", None)
+    unhit = registry["unhit"][ship] - 1
+    registry["unhit"][ship] = unhit
+    if unhit > 0:
+        return ("hit", ship)
+    registry["afloat"] = registry["afloat"] - 1
+    if registry["afloat"] == 0:
+        return ("all sunk", ship)
+    return ("sunk", ship)
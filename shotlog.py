@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+""" Append-only binary log of every shot, written as games are played.
+    File starts with magic "BSLG" and a format version byte, then one 8 byte record per shot:
+        game id (4 bytes), spot number (2 bytes), hit (1 byte), ship character (1 byte, 0 for a miss)
+    Spot number is (y - 1) * max_x + (x - 1).
+    Records are buffered on write and read back lazily so memory stays flat for any number of games.
+"""
+
+# Import statements
+import struct
+
+
+# Set constants
+SHOT_LOG_MAGIC = b"BSLG"
+SHOT_LOG_VERSION = 1
+SHOT_LOG_RECORD = struct.Struct("<IHBB")
+SHOT_LOG_BUFFER = 1 << 16   # bytes buffered before each write to disk
+
+
+def open_shot_log(filename):
+    """Open a shot log for appending; a new file gets the header first
+
+       Parameters:
+       filename: path of log file
+
+       Return:
+       shot_log: open binary file
+    """
+    shot_log = open(filename, "ab", buffering = SHOT_LOG_BUFFER)
+    if shot_log.tell() == 0:
+        shot_log.write(SHOT_LOG_MAGIC + bytes([SHOT_LOG_VERSION]))
+    return shot_log
+
+
+def log_shot(shot_log, game_id, max_x, x, y, hit, char):
+    """Append one shot record
+
+       Parameters:
+       shot_log: file from open_shot_log
+       game_id: number of the game this shot belongs to
+       max_x: width of grid
+       x: horizontal location of shot
+       y: vertical location of shot
+       hit: boolean; True if shot hit a ship
+       char: ship character hit (ignored for a miss)
+
+       Return:
+       nothing
+    """
+    shot_log.write(SHOT_LOG_RECORD.pack(game_id, (y - 1) * max_x + (x - 1), 1 if hit else 0, ord(char) if hit else 0))
+
+
+def close_shot_log(shot_log):
+    """Write any buffered records and close the log"""
+    shot_log.close()
+
+
+def read_shot_log(filename, records_per_read = 4096):
+    """Read shot records back one at a time without loading the whole file
+
+       Parameters:
+       filename: path of log file
+       records_per_read: number of records read from disk at once
+
+       Return:
+       generator of (game_id, spot, hit, char) tuples; char is "" for a miss
+    """
+    with open(filename, "rb") as f:
+        header = f.read(len(SHOT_LOG_MAGIC) + 1)
+        if header[:len(SHOT_LOG_MAGIC)] != SHOT_LOG_MAGIC:
+            raise ValueError("not a battleship shot log")
+        if header[-1] != SHOT_LOG_VERSION:
+            raise ValueError(f"shot log format version {header[-1]} is not supported")
+
+        while True:
+            data = f.read(SHOT_LOG_RECORD.size * records_per_read)
+            if len(data) == 0:
+                break
+            usable = len(data) - len(data) % SHOT_LOG_RECORD.size   # ignore a partly written last record
+            for (game_id, spot, hit, char) in SHOT_LOG_RECORD.iter_unpack(data[:usable]):
+                yield (game_id, spot, hit == 1, chr(char) if hit else "")
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+
+""" Sparse board engine for grids far larger than 26x26 (for example 10,000 x 10,000).
+    Only ship spots and shot spots are stored so memory grows with ships plus shots
+    taken, never with width x height.
+    10. Place ships by random position and orientation, checking only the ship spots.
+    20. Choose shots without listing untried spots (random draws, sweep cursor, target queue).
+    30. Render a window of the board with multi-letter column headings.
+"""
+
+# Import statements
+from setup_battleship import *
+from battleship import adjacent_hit
+from gamestats import *
+from collections import deque
+import instrument
+import random
+import sys
+import time
+
+
+# Set constants
+SPARSE_PATTERNS = ["top_left_to_bottom_right", "random", "random_odd", "random_even", "random_smart"]
+SPARSE_WINDOW = 20   # rows and columns shown by sparse_window
+SPARSE_TRY_FACTOR = 20   # placement tries allowed per expected try (see sparse_placement_limit)
+SPARSE_MAX_TRIES = 1000000   # placement tries allowed at most, however crowded the fleet
+
+
+def parity_size(max_x, max_y, parity):
+    """Count grid spots where (x + y) % 2 == parity
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       parity: 0 for even, 1 for odd
+
+       Return:
+       spots: number of grid spots in that parity class
+    """
+    even = (max_x * max_y + (max_x % 2) * (max_y % 2)) // 2
+    if parity == 0:
+        return even
+    return max_x * max_y - even
+
+
+def create_sparse_board(max_x, max_y, rng = random):
+    """Create empty sparse board
+
+       Parameters:
+       max_x: width of grid (no upper limit)
+       max_y: height of grid (no upper limit)
+       rng: random number generator from create_rng used for ship placement and shots
+
+       Return:
+       board: dictionary with
+           "max_x", "max_y": size of grid
+           "ships": dictionary of (x, y) to ship character
+           "shots": dictionary of (x, y) to ship character for a hit or MISS_CHAR
+           "parity_shots": number of shots on even and on odd spots
+           "remaining": ship spots not yet hit
+           "rng": random number generator for this game
+    """
+    board = {}
+    board["max_x"] = max_x
+    board["max_y"] = max_y
+    board["ships"] = {}
+    board["shots"] = {}
+    board["parity_shots"] = [0, 0]
+    board["remaining"] = 0
+    board["rng"] = rng
+    return board
+
+
+def sparse_ship_spots(x, y, orientation, size):
+    """List spots covered by a ship (see does_ship_fit for orientation values)
+
+       Return:
+       spots: list of (x, y)
+    """
+    if orientation == 1:
+        return [(x, y - n) for n in range(size)]
+    if orientation == 2:
+        return [(x, y + n) for n in range(size)]
+    if orientation == 3:
+        return [(x - n, y) for n in range(size)]
+    return [(x + n, y) for n in range(size)]
+
+
+def sparse_placement_limit(max_x, max_y, ships):
+    """Work out how many random tries sparse_place_ships may take before giving up
+       A try for a ship of size s lands on the grid with chance q (depends on s and the grid
+       shape) and misses ships already placed with chance at least (1 - fill) ** s, where fill
+       is the share of the grid the whole fleet covers. The limit is SPARSE_TRY_FACTOR times the
+       expected tries for every ship, so it grows with crowded fleets and stays small on huge grids.
+
+       Parameters:
+       max_x: width of grid
+       max_y: height of grid
+       ships: list of tuples in form of (ship type, grid character, number of grid spots)
+
+       Return:
+       limit: number of tries, at most SPARSE_MAX_TRIES
+    """
+    cells = max_x * max_y
+    free = 1 - count_ship_cells(ships) / cells
+    expected = 0.0
+    for (ship_type, ship_char, ship_size) in ships:
+        on_grid = (max(max_x - ship_size + 1, 0) * max_y + max_x * max(max_y - ship_size + 1, 0)) / (2 * cells)
+        chance = on_grid * free ** ship_size
+        if chance <= 0:
+            return SPARSE_MAX_TRIES
+        expected = expected + 1 / chance
+    return min(SPARSE_MAX_TRIES, max(len(ships), round(SPARSE_TRY_FACTOR * expected)))
+
+
+def sparse_place_ships(board, ships):
+    """Place ships at random positions and orientations, retrying when a ship
+       runs off the grid or overlaps another ship. Only the ship spots are checked
+       so each try costs the size of the ship whatever the size of the grid.
+       Gives up after sparse_placement_limit tries; nothing is printed, callers report a timeout.
+
+       Parameters:
+       board: sparse board from create_sparse_board
+       ships: list of tuples in form of (ship type, grid character, number of grid spots)
+
+       Return:
+       (board, timeout): board with ships and True if ships could not be placed
+    """
+    max_x = board["max_x"]
+    max_y = board["max_y"]
+    timeout_counter = 1
+    timeout = not fleet_can_fit(max_x, max_y, ships)
+    limit = sparse_placement_limit(max_x, max_y, ships) if not timeout else 0
+    rng = board["rng"]
+    rejected = 0   # tries off the grid or overlapping (instrument counter)
+
+    for (type, char, size) in ships:
+        fit = False
+        while not fit and not timeout:
+            timeout_counter = timeout_counter + 1
+            if timeout_counter > limit:
+                timeout = True
+            x = rng.randint(1, max_x)
+            y = rng.randint(1, max_y)
+            spots = sparse_ship_spots(x, y, generate_random_orientation(rng), size)
+            fit = True
+            for (sx, sy) in spots:
+                if sx < 1 or sx > max_x or sy < 1 or sy > max_y or (sx, sy) in board["ships"]:
+                    fit = False
+                    break
+            if not fit:
+                rejected = rejected + 1
+        if timeout:
+            break
+        for spot in spots:
+            board["ships"][spot] = char
+        board["remaining"] = board["remaining"] + size
+
+    if instrument.stats is not None:
+        instrument.count("placements_tried", timeout_counter - 1)
+        instrument.count("placements_not_fitting", rejected)
+        if timeout:
+            instrument.count("placement_timeouts")
+    return (board, timeout)
+
+
+def sparse_shoot(board, x, y):
+    """Record a shot on the sparse board
+
+       Parameters:
+       board: sparse board from create_sparse_board
+       x: horizontal location of shot
+       y: vertical location of shot
+
+       Return:
+       hit: boolean; True if shot hit a ship
+    """
+    if (x, y) in board["shots"]:
+        return board["shots"][(x, y)] != MISS_CHAR
+
+    char = board["ships"].get((x, y))
+    board["parity_shots"][(x + y) % 2] = board["parity_shots"][(x + y) % 2] + 1
+    if char is None:
+        board["shots"][(x, y)] = MISS_CHAR
+        return False
+    board["shots"][(x, y)] = char
+    board["remaining"] = board["remaining"] - 1
+    return True
+
+
+def sparse_random_spot(board, parity = None):
+    """Draw random untried spots until one is found, optionally of one parity class
+       Falls back to the other parity class once this one has been shot completely.
+       Draws are rarely rejected while shots cover a small part of the grid.
+
+       Parameters:
+       board: sparse board from create_sparse_board
+       parity: None for any spot, 0 for x + y even, 1 for x + y odd
+
+       Return:
+       (x, y): untried spot or None if every spot has been shot
+    """
+    max_x = board["max_x"]
+    max_y = board["max_y"]
+    if len(board["shots"]) >= max_x * max_y:
+        return None
+    if parity is not None and board["parity_shots"][parity] >= parity_size(max_x, max_y, parity):
+        parity = 1 - parity
+
+    rng = board["rng"]
+    draws = 1
+    while True:
+        x = rng.randint(1, max_x)
+        y = rng.randint(1, max_y)
+        if (x, y) not in board["shots"] and (parity is None or (x + y) % 2 == parity):
+            if instrument.stats is not None:
+                instrument.count("random_draws_rejected", draws - 1)
+            return (x, y)
+        draws = draws + 1
+
+
+def sparse_sweep_spot(board, cursor):
+    """Find next untried spot from the sweep cursor (top left to bottom right)
+
+       Parameters:
+       board: sparse board from create_sparse_board
+       cursor: spot number (y - 1) * max_x + (x - 1) to start from
+
+       Return:
+       (x, y, cursor): untried spot and its spot number
+    """
+    max_x = board["max_x"]
+    while True:
+        (x, y) = (cursor % max_x + 1, cursor // max_x + 1)
+        if (x, y) not in board["shots"]:
+            return (x, y, cursor)
+        cursor = cursor + 1
+
+
+def sparse_queue_targets(board, target, x, y):
+    """After a hit queue the spots past each end of the line of hits through it
+       and every neighbour (same idea as try_to_sink_ship)
+
+       Parameters:
+       board: sparse board from create_sparse_board
+       target: dictionary with "line", "frontier" queues and "hits" set
+       x: horizontal location of hit
+       y: vertical location of hit
+
+       Return:
+       nothing
+    """
+    max_x = board["max_x"]
+    max_y = board["max_y"]
+    (a_hit, orient) = adjacent_hit(x, y, target["hits"])
+    target["hits"].add((x, y))
+
+    directions = []
+    if orient == "horizontal" or orient == "both":
+        directions.append((1, 0))
+    if orient == "vertical" or orient == "both":
+        directions.append((0, 1))
+    for (dx, dy) in directions:
+        for step in (1, -1):
+            (end_x, end_y) = (x + step * dx, y + step * dy)
+            while (end_x, end_y) in target["hits"]:
+                (end_x, end_y) = (end_x + step * dx, end_y + step * dy)
+            if 1 <= end_x <= max_x and 1 <= end_y <= max_y:
+                target["line"].appendleft((end_x, end_y))
+
+    for (next_x, next_y) in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+        if 1 <= next_x <= max_x and 1 <= next_y <= max_y:
+            target["frontier"].append((next_x, next_y))
+
+
+def sparse_target_spot(board, target):
+    """Pop queued target spots until an untried one is found
+
+       Return:
+       (x, y): spot or None if nothing is queued
+    """
+    for queue in (target["line"], target["frontier"]):
+        while len(queue) > 0:
+            xy = queue.popleft()
+            if xy not in board["shots"]:
+                return xy
+    return None
+
+
+def play_sparse_game(board, shot_pattern, max_shots = None):
+    """Play one game on a sparse board without printing
+
+       Parameters:
+       board: sparse board with ships placed
+       shot_pattern: "top_left_to_bottom_right", "random", "random_odd", "random_even"
+                     or "random_smart"; anything else shoots randomly
+       max_shots: optional shot budget; game stops early when it is used up
+                  (board["remaining"] then shows ship spots left)
+
+       Return:
+       count: number of shots taken
+    """
+    count = 0
+    cursor = 0
+    target = {"line": deque(), "frontier": deque(), "hits": set()}
+
+    while board["remaining"] > 0 and (max_shots is None or count < max_shots):
+        count = count + 1
+        if shot_pattern == "top_left_to_bottom_right":
+            (x, y, cursor) = sparse_sweep_spot(board, cursor)
+        elif shot_pattern == "random_odd":
+            (x, y) = sparse_random_spot(board, 1)
+        elif shot_pattern == "random_even":
+            (x, y) = sparse_random_spot(board, 0)
+        elif shot_pattern == "random_smart":
+            xy = sparse_target_spot(board, target)
+            if xy is None:
+                target["hits"].clear()
+                xy = sparse_random_spot(board, 0)
+            (x, y) = xy
+        else:
+            (x, y) = sparse_random_spot(board)
+
+        hit = sparse_shoot(board, x, y)
+        if hit and shot_pattern == "random_smart":
+            sparse_queue_targets(board, target, x, y)
+
+    return count
+
+
+def run_sparse_games(n, max_x, max_y, num_groups, shot_pattern, seed = None, max_shots = None):
+    """Play n complete games on sparse boards without printing anything
+
+       Parameters:
+       n: number of games to play
+       max_x: width of grid (no upper limit)
+       max_y: height of grid (no upper limit)
+       num_groups: number of ship groups passed to setup_ships
+       shot_pattern: how shots are determined (see play_sparse_game)
+       seed: optional seed so runs can be repeated; game g uses stream create_rng(seed, g)
+       max_shots: optional shot budget per game (see play_sparse_game)
+
+       Return:
+       (stats, unfinished): statistics record from create_game_stats with every game added
+                            (a game whose ships could not be placed only counts in
+                            stats["timeouts"]) and number of games stopped by max_shots
+                            with ship spots left
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    ships = setup_ships(num_groups)
+    stats = create_game_stats(max_x, max_y)
+    unfinished = 0
+
+    game = 0
+    while game < n:
+        start = time.perf_counter()
+        (board, timeout) = sparse_place_ships(create_sparse_board(max_x, max_y, create_rng(seed, game)), ships)
+        if timeout:
+            stats["timeouts"] = stats["timeouts"] + 1
+        else:
+            count = play_sparse_game(board, shot_pattern, max_shots)
+            add_game_stats(stats, count, time.perf_counter() - start, game)
+            if board["remaining"] > 0:
+                unfinished = unfinished + 1
+        game = game + 1
+
+    return (stats, unfinished)
+
+
+def sparse_window(board, left = 1, top = 1, width = SPARSE_WINDOW, height = SPARSE_WINDOW, show_ships = True):
+    """Build rows of characters for part of a sparse board (same layout as create_initial_empty_grid)
+
+       Parameters:
+       board: sparse board
+       left: first column shown
+       top: first row shown
+       width: number of columns shown
+       height: number of rows shown
+       show_ships: True for ship grid, False for shot grid
+
+       Return:
+       rows: list of rows, first row is column headings
+    """
+    width = min(width, board["max_x"] - left + 1)
+    height = min(height, board["max_y"] - top + 1)
+    label_width = len(str(top + height - 1))
+    rows = [["_" * max(label_width, 2)] + [column_label(x) for x in range(left, left + width)]]
+
+    for y in range(top, top + height):
+        row = [f"{y:0{max(label_width, 2)}d}"]
+        for x in range(left, left + width):
+            if show_ships:
+                row.append(board["ships"].get((x, y), EMPTY_CHAR))
+            else:
+                row.append(board["shots"].get((x, y), NO_SHOT_CHAR))
+        rows.append(row)
+    return rows
+
+
+def handle_sparse_args(args):
+    """Handle arguments if any
+    Arguments format is:
+    "x=A" where A is width of grid (defaults to 1000)
+    "y=B" where B is the height of the grid (defaults to 1000)
+    "num=X" for X number of ship groups
+    "games=G" for G number of games (defaults to 1)
+    "pattern=P" for shot pattern (defaults to random_smart)
+    "shots=S" to stop every game after S shots
+    "seed=S" for seed S so games can be repeated
+
+    Parameters:
+    args: full command line contents
+
+    Return:
+    (x, y, n, games, pattern, max_shots, seed): tuple of settings
+    """
+    x = 1000
+    y = 1000
+    n = 1
+    games = 1
+    pattern = "random_smart"
+    max_shots = None
+    seed = None
+    for arg in args:
+        if arg.startswith("x="):
+            x = int(arg.split('=')[1])
+        if arg.startswith("y="):
+            y = int(arg.split('=')[1])
+        if arg.startswith("num="):
+            n = int(arg.split('=')[1])
+        if arg.startswith("games="):
+            games = int(arg.split('=')[1])
+        if arg.startswith("pattern="):
+            pattern = arg.split('=')[1]
+        if arg.startswith("shots="):
+            max_shots = int(arg.split('=')[1])
+        if arg.startswith("seed="):
+            seed = int(arg.split('=')[1])
+    return (x, y, n, games, pattern, max_shots, seed)
+
+
+def main():
+    (x, y, n, games, pattern, max_shots, seed) = handle_sparse_args(sys.argv[1:])
+    if pattern not in SPARSE_PATTERNS:
+        print("PATTERN", pattern, "NOT AVAILABLE ON SPARSE BOARDS; USE ONE OF", SPARSE_PATTERNS)
+        return
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    (stats, unfinished) = run_sparse_games(games, x, y, n, pattern, seed, max_shots)
+    summary = summarize_game_stats(stats)
+    print(pattern, "     ", "GRID=", x, "x", y, "    ", "GAMES=", summary["games"], "    ", "SHIP GROUPS=", n, "    ",
+          "AVERAGE COUNT=", round(summary["mean"], 2), "    ",
+          "UNFINISHED=", unfinished, "    ",
+          "SECONDS/GAME=", round(stats["seconds"] / max(summary["games"], 1), 4), "    ", "SEED=", seed)
+    print("P50=", round(summary["p50"]), "    ", "P90=", round(summary["p90"]), "    ", "P99=", round(summary["p99"]), "    ",
+          "MAX=", summary["max"], "    ", "SETUP TIMEOUTS=", summary["timeouts"])
+
+if __name__ == "__main__":
+    main()
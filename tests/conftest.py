@@ -0,0 +1,6 @@
+""" Shared test setup: the modules are scripts at the top of the repository, so put it on the path. """
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
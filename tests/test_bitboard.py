@@ -0,0 +1,38 @@
+""" Bitboard shots come from the mask of spots not yet shot and follow the same patterns as the grid. """
+
+import pytest
+from battleship import *
+
+
+def test_nth_set_bit_counts_from_lowest_bit():
+    mask = 0b1011000100101
+    bits = [c for c in range(mask.bit_length()) if mask >> c & 1]
+    assert [nth_set_bit(mask, n) for n in range(len(bits))] == bits
+
+
+@pytest.mark.parametrize("pattern, first", [("random", None), ("random_odd", 1), ("random_even", 0),
+                                            ("top_left_to_bottom_right", None)])
+def test_every_spot_is_shot_once(pattern, first):
+    ships = setup_ships(1)
+    board = create_bitboard(7, 6, ships)
+    rng = create_rng(3, 0, pattern)
+    next_bit = get_strategy(pattern)["next_bit"]
+    order = []
+    while len(order) < 7 * 6:
+        spot = next_bit(board, rng)
+        bb_shoot_spot(board, spot)
+        order.append(spot)
+    assert next_bit(board, rng) is None
+    assert sorted(order) == list(range(7 * 6))
+    if pattern == "top_left_to_bottom_right":
+        assert order == list(range(7 * 6))
+    if first is not None:   # one parity is shot before the other
+        parity = [(c % 7 + 1 + c // 7 + 1) % 2 for c in order]
+        assert parity == sorted(parity, key = lambda p: p != first)
+
+
+@pytest.mark.parametrize("pattern", ["random", "random_odd"])
+def test_random_bitboard_games_last_as_long_as_grid_games(pattern):
+    grid = run_games(300, 10, 10, 1, pattern, seed = 8)
+    board = run_games(300, 10, 10, 1, pattern, seed = 8, backend = "bitboard")
+    assert abs(grid["shots"] - board["shots"]) / 300 < 2
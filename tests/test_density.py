@@ -0,0 +1,39 @@
+""" Density scores count the placements still possible and the best spot is the highest score. """
+
+from battleship import *
+
+
+def placements_avoiding(max_x, max_y, size, taken):
+    """Spot numbers of every placement of a ship size that covers none of the spots taken"""
+    found = []
+    for (x, y, orientation, spots, mask) in placement_index(max_x, max_y, size):
+        if not set(spots) & taken:
+            found.append(spots)
+    return found
+
+
+def test_scores_drop_to_zero_around_sunk_ship():
+    ships = [("cruiser", "C", 3), ("destroyer", "D", 2)]
+    density_state = create_density_state(10, 10, ships, create_rng(1))
+    sunk = {spot_number(10, 4, 5), spot_number(10, 5, 5)}
+    for c in sorted(sunk):
+        update_density(density_state, 10, c % 10 + 1, c // 10 + 1, True)
+    sink_density_ship(density_state, sorted(sunk))
+
+    # Only the cruiser is afloat, and it cannot lie across the sunk destroyer
+    expected = [0] * 100
+    for spots in placements_avoiding(10, 10, 3, sunk):
+        for c in spots:
+            expected[c] = expected[c] + 1
+    assert density_state["score"] == expected
+    assert all(density_state["score"][c] == 0 for c in sunk)
+
+
+def test_best_spot_has_highest_score_after_misses():
+    density_state = create_density_state(10, 10, setup_ships(1), create_rng(2))
+    rng = create_rng(3)
+    for n in range(30):
+        (x, y) = best_density_spot(density_state, 10)
+        untried = [c for c in range(100) if not density_state["tried"][c]]
+        assert density_state["score"][spot_number(10, x, y)] == max(density_state["score"][c] for c in untried)
+        update_density(density_state, 10, x, y, rng.random() < 0.2)
@@ -0,0 +1,53 @@
+""" Fleet corpus files hold the fleets a seeded run would place and play the same games. """
+
+import pytest
+from battleship import *
+
+
+def test_corpus_round_trip(tmp_path):
+    filename = tmp_path / "fleets.bin"
+    (timeouts, seconds) = write_fleet_corpus(filename, 25, 12, 9, 2, 4, 1, 10)
+    assert timeouts == 0
+    corpus = open_fleet_corpus(filename)
+    assert (corpus["max_x"], corpus["max_y"], corpus["num_groups"], corpus["count"]) == (12, 9, 2, 25)
+
+    ships = setup_ships(2)
+    for n in range(25):
+        (max_x, max_y, empty_grid) = create_initial_empty_grid(12, 9, EMPTY_CHAR)
+        layout = []
+        (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(4, n), layout)
+        (corpus_grid, corpus_fleet, corpus_timeout) = load_fleet(corpus, n)
+        assert corpus_grid == ship_grid
+        assert [(char, sorted(spots)) for (char, spots) in corpus_fleet] == [(char, sorted(spots)) for (char, spots) in layout]
+        board = layout_bitboard(max_x, max_y, ships, corpus_fleet)
+        assert bitboard_to_grid(board) == ship_grid
+    assert corpus_layout(corpus, 25) == corpus_layout(corpus, 0)   # numbers wrap around
+    close_fleet_corpus(corpus)
+
+
+def test_fleet_that_could_not_be_placed(tmp_path):
+    filename = tmp_path / "fleets.bin"
+    (timeouts, seconds) = write_fleet_corpus(filename, 3, 5, 5, 25, 1, 1)
+    assert timeouts == 3
+    corpus = open_fleet_corpus(filename)
+    assert load_fleet(corpus, 1) == (None, None, True)
+    close_fleet_corpus(corpus)
+
+
+@pytest.mark.parametrize("backend", ["grid", "bitboard"])
+def test_corpus_run_matches_placing_fleets(tmp_path, backend):
+    filename = tmp_path / "fleets.bin"
+    write_fleet_corpus(filename, 40, 10, 10, 1, 8, 1)
+    for pattern in ("random_smart", "density"):
+        placed = run_games(40, 10, 10, 1, pattern, seed = 8, backend = backend)
+        from_corpus = run_games(40, 10, 10, 1, pattern, seed = 8, backend = backend, fleets = filename)
+        assert from_corpus["shots"] == placed["shots"]
+        assert from_corpus["buckets"] == placed["buckets"]
+
+
+def test_other_files_are_rejected(tmp_path):
+    for data in (b"", b"BSAV" + bytes(20)):
+        filename = tmp_path / "other.bin"
+        filename.write_bytes(data)
+        with pytest.raises(ValueError):
+            open_fleet_corpus(filename)
@@ -0,0 +1,50 @@
+""" Statistics records of parts of a run merge into the record of the whole run. """
+
+import pytest
+import random
+from gamestats import *
+
+
+def record(max_x, max_y, counts, first_game = 0):
+    """Return a record with every count added as games first_game, first_game + 1, ..."""
+    stats = create_game_stats(max_x, max_y)
+    for (n, count) in enumerate(counts):
+        add_game_stats(stats, count, 0.001, first_game + n)
+    return stats
+
+
+@pytest.mark.parametrize("max_x, max_y", [(10, 10), (100, 100)])
+def test_merged_halves_equal_one_run(max_x, max_y):
+    rng = random.Random(5)
+    counts = [rng.randint(17, max_x * max_y) for n in range(501)]
+    combined = record(max_x, max_y, counts)
+    first = record(max_x, max_y, counts[:250])
+    second = record(max_x, max_y, counts[250:], 250)
+    second["timeouts"] = 2
+    combined["timeouts"] = 2
+
+    merged = merge_game_stats(merge_game_stats(create_game_stats(max_x, max_y), first), second)
+    assert merged["seconds"] == pytest.approx(combined["seconds"])
+    merged["seconds"] = combined["seconds"]
+    assert merged == combined
+    assert summarize_game_stats(merged) == summarize_game_stats(combined)
+
+    reverse = merge_game_stats(merge_game_stats(create_game_stats(max_x, max_y), second), first)
+    reverse["max_game"] = combined["max_game"]   # games tied for most shots keep the one merged first
+    reverse["seconds"] = combined["seconds"]
+    assert reverse == combined
+
+
+def test_percentiles_are_exact_on_small_grids():
+    counts = list(range(30, 100, 7)) * 3
+    stats = record(10, 10, counts)
+    ranked = sorted(counts)
+    for fraction in (0.1, 0.5, 0.9, 0.99, 1.0):
+        assert stats_percentile(stats, fraction) == ranked[max(1, math.ceil(fraction * len(counts))) - 1]
+    assert stats_mean(stats) == pytest.approx(sum(counts) / len(counts))
+    assert stats_variance(stats) == pytest.approx(sum((c - stats_mean(stats)) ** 2 for c in counts) / len(counts))
+
+
+def test_records_of_different_grids_do_not_merge():
+    with pytest.raises(ValueError):
+        merge_game_stats(create_game_stats(10, 10), create_game_stats(10, 11))
@@ -0,0 +1,30 @@
+""" Lockstep batches play the same games as the Python backends (needs numpy). """
+
+import pytest
+from battleship import *
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("pattern", LOCKSTEP_PATTERNS)
+def test_every_game_sinks_its_fleet_within_grid_bounds(pattern):
+    ships = setup_ships(1)
+    np_rng = np.random.default_rng(6)
+    batch = create_lockstep_batch(50, 10, 10, ships, np_rng, 6)
+    count = play_lockstep_batch(batch, pattern, np_rng)
+    for game in range(50):
+        ship_grid = lockstep_grid(batch, game)
+        shot_grid = lockstep_grid(batch, game, False)
+        assert all_ships_sunk(10, 10, ship_grid, shot_grid, count[game])
+        assert count_ship_cells(ships) <= count[game] <= 100
+        assert sum(row[1:].count(MISS_CHAR) for row in shot_grid[1:]) == count[game] - count_ship_cells(ships)
+        if pattern == "top_left_to_bottom_right":   # sweep is the same shot for shot on the grid
+            assert count[game] == play_headless_game(10, 10, ship_grid, pattern, ships)
+
+
+@pytest.mark.parametrize("pattern", ["random", "random_odd"])
+def test_average_matches_grid_backend(pattern):
+    lockstep = run_lockstep_games(2000, 10, 10, 1, pattern, seed = 9)
+    grid = run_games(500, 10, 10, 1, pattern, seed = 9)
+    assert abs(stats_mean(lockstep) - stats_mean(grid)) < 1.5
+    assert grid["min"] >= count_ship_cells(setup_ships(1)) and lockstep["max"] <= 100
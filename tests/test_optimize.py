@@ -0,0 +1,43 @@
+""" Optimizer settings are checked and repeated looks at the data widen the pruning interval. """
+
+from optimize import *
+
+
+def test_settings_round_trip():
+    params = {"hunt_spacing": 3, "line_first": 0, "switch": 0.75, "name": "wide"}
+    assert parse_params(params_text(params)) == params
+    assert parse_space("hunt_spacing:2..4;line_first:0,1") == [("hunt_spacing", [2, 3, 4], 2, 4), ("line_first", [0, 1], None, None)]
+    assert len(grid_candidates(parse_space("hunt_spacing:2..4;line_first:0,1"))) == 6
+
+
+def test_unknown_settings_are_found():
+    assert unknown_params("random_smart", ["hunt_spacing", "bogus"]) == ["bogus"]
+    assert unknown_params("random", ["spacing"]) == ["spacing"]
+    assert unknown_params("mymodule:Strategy", ["anything"]) == []
+
+
+def test_pruning_interval_is_wider_for_more_looks():
+    assert abs(pruning_z(2, 1000, 1000) - OPTIMIZE_Z) < 1e-9   # one look needs no correction
+    widths = [pruning_z(candidates, 10000, 1000) for candidates in (2, 6, 30)]
+    assert OPTIMIZE_Z < widths[0] < widths[1] < widths[2]
+
+
+def test_seeded_optimizer_runs_repeat():
+    candidates = grid_candidates(parse_space("hunt_spacing:2,3"))
+    runs = [run_optimizer("random_smart", candidates, 10, 10, 1, 200, 100, 1, 50, 12, OPTIMIZE_Z, True) for n in range(2)]
+    for (first, again) in zip(runs[0][0], runs[1][0]):
+        assert first["stats"]["shots"] == again["stats"]["shots"]
+        assert first["pruned"] == again["pruned"]
+    assert runs[0][1] == runs[1][1]
+
+
+def test_candidates_playing_the_same_games_are_dropped(capsys):
+    # a spacing 3 lattice is shot long before 90% of the grid is, so the first two play the same games
+    candidates = [{"spacing": 3, "switch": 1.0}, {"spacing": 3, "switch": 0.9}, {"spacing": 2, "switch": 1.0}]
+    (results, pairs, timeouts, seconds) = run_optimizer("lattice", candidates, 10, 10, 1, 400, 100, 1, 50, 5, OPTIMIZE_Z, True)
+    assert same_games(pairs, 0, 1) and not same_games(pairs, 0, 2)
+    assert results[1]["pruned"] == 1 and results[1]["same_as"] == 0
+    assert results[1]["stats"]["games"] == 100   # no games after the first round
+    assert results[0]["same_as"] is None
+    print_optimizer_summary("lattice", results, pairs, timeouts, seconds)
+    assert "-0.00" not in capsys.readouterr().out
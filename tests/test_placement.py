@@ -0,0 +1,55 @@
+""" Placed fleets are valid for sparse and dense fleets, whether sampled, searched or packed in lines,
+    on the grid and the bitboard. """
+
+import pytest
+from battleship import *
+
+
+def check_grid(max_x, max_y, ships, ship_grid):
+    """Every ship character covers as many spots as its ships need and nothing else is on the grid"""
+    needed = {}
+    for (ship_type, ship_char, ship_size) in ships:
+        needed[ship_char] = needed.get(ship_char, 0) + ship_size
+    found = {}
+    for y in range(1, max_y + 1):
+        for x in range(1, max_x + 1):
+            if ship_grid[y][x] != EMPTY_CHAR:
+                found[ship_grid[y][x]] = found.get(ship_grid[y][x], 0) + 1
+    assert found == needed
+
+
+@pytest.mark.parametrize("size, num", [(10, 1), (10, 3), (26, 10), (26, 38)])
+def test_placed_fleets_are_valid(size, num):
+    ships = setup_ships(num)
+    for game in range(5):
+        (max_x, max_y, empty_grid) = create_initial_empty_grid(size, size, EMPTY_CHAR)
+        (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(1, game))
+        assert not timeout
+        check_grid(max_x, max_y, ships, ship_grid)
+
+        (board, timeout) = bb_place_ships(create_bitboard(max_x, max_y, ships), ships, create_rng(1, game))
+        assert not timeout
+        check_grid(max_x, max_y, ships, bitboard_to_grid(board))
+
+
+@pytest.mark.parametrize("sample_tries", [SAMPLE_TRIES, 0])
+def test_grid_and_bitboard_place_the_same_fleet(monkeypatch, sample_tries):
+    # SAMPLE_TRIES = 0 makes sampling give up at once so the backtracking search places the fleet
+    import setup_battleship
+    monkeypatch.setattr(setup_battleship, "SAMPLE_TRIES", sample_tries)
+    ships = setup_ships(10)
+    for game in range(3):
+        (max_x, max_y, empty_grid) = create_initial_empty_grid(26, 26, EMPTY_CHAR)
+        (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(2, game))
+        assert not timeout
+        check_grid(max_x, max_y, ships, ship_grid)
+        (board, timeout) = bb_place_ships(create_bitboard(max_x, max_y, ships), ships, create_rng(2, game))
+        assert bitboard_to_grid(board) == ship_grid
+
+
+def test_fleets_that_cannot_fit_time_out_at_once():
+    ships = setup_ships(25)
+    assert not fleet_can_fit(5, 5, ships)
+    (max_x, max_y, empty_grid) = create_initial_empty_grid(5, 5, EMPTY_CHAR)
+    assert place_ships(max_x, max_y, empty_grid, ships, create_rng(1, 0))[1]
+    assert not fleet_can_fit(4, 4, setup_ships(1))   # largest ship is longer than the grid
@@ -0,0 +1,37 @@
+""" Ship registries report hits and sunk ships, and play_game passes the events on. """
+
+from battleship import *
+
+
+def test_events_follow_the_ships():
+    ships = setup_ships(1)
+    (max_x, max_y, empty_grid) = create_initial_empty_grid(10, 10, EMPTY_CHAR)
+    layout = []
+    place_ships(max_x, max_y, empty_grid, ships, create_rng(2, 0), layout)
+    registry = create_ship_registry(max_x, ships, layout)
+
+    events = []
+    for (ship, (char, spots)) in enumerate(layout):
+        for c in spots:
+            events.append(register_shot(registry, c % max_x + 1, c // max_x + 1))
+        assert events[-1] == (("all sunk" if ship == len(layout) - 1 else "sunk"), ship)
+        assert all(event == ("hit", ship) for event in events[-len(spots):-1])
+    empty = next(c for c in range(max_x * max_y) if c not in registry["ship_of"])
+    assert register_shot(registry, empty % max_x + 1, empty // max_x + 1) == ("miss", None)
+    assert registry["afloat"] == 0
+
+
+def test_event_is_cleared_by_the_next_shot():
+    ships = setup_ships(1)
+    (max_x, max_y, empty_grid) = create_initial_empty_grid(10, 10, EMPTY_CHAR)
+    layout = []
+    (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(5, 0), layout)
+    (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+    shot_state = create_shot_state(max_x, max_y, ships, create_rng(5, 0, "random"))
+    shot_state["registry"] = create_ship_registry(max_x, ships, layout)
+    game = (0, (0, 0), (0, 0), [], count_ship_cells(ships))
+    while game[4] > 0:
+        game = play_game(max_x, max_y, ship_grid, shot_grid, "random", *game, shot_state, True)
+        (x, y) = game[3][-1]
+        first_hit = ship_grid[y][x] != EMPTY_CHAR and (x, y) not in game[3][:-1]
+        assert (shot_state["event"] is not None) == first_hit
@@ -0,0 +1,68 @@
+""" Replays rebuild every board of a recorded game, from a shot history or a shot log. """
+
+import sys
+from replay import *
+
+
+def record_game(seed, game, pattern = "random_smart"):
+    """Play one game the way run_games does and keep its fleet, shots and grid after every shot"""
+    (max_x, max_y) = set_grid_size(10, 10)
+    ships = setup_ships(1)
+    (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+    layout = []
+    (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(seed, game), layout)
+    (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+    shot_state = create_shot_state(max_x, max_y, ships, create_rng(seed, game, pattern))
+    shot_state["registry"] = create_ship_registry(max_x, ships, layout)
+    shot_history = []
+    grids = [[row[:] for row in shot_grid]]
+    count = 0
+    last_hit_xy = (0, 0)
+    last_shot_xy = (0, 0)
+    remaining = count_ship_cells(ships)
+    while remaining > 0:
+        (count, last_hit_xy, last_shot_xy, shot_history, remaining) = play_game(max_x, max_y, ship_grid, shot_grid, pattern, count, last_hit_xy, last_shot_xy, shot_history, remaining, shot_state, True)
+        grids.append([row[:] for row in shot_grid])
+    return (max_x, max_y, ship_grid, shot_history, count, grids)
+
+
+def test_seek_rebuilds_every_board():
+    (max_x, max_y, ship_grid, shot_history, count, grids) = record_game(6, 0, "random")
+    assert count > REPLAY_CHECKPOINT
+    replay = create_replay(max_x, max_y, ship_grid, shot_history)
+    assert verify_replay(replay, count) == []
+    for shot in list(range(len(grids))) + [3, 70, 1, len(grids) - 1, 0]:   # forward, back and across checkpoints
+        assert replay_grid(replay, shot) == grids[min(shot, len(grids) - 1)]
+
+
+def test_problems_are_found():
+    (max_x, max_y, ship_grid, shot_history, count, grids) = record_game(6, 0)
+    replay = create_replay(max_x, max_y, ship_grid, shot_history + [shot_history[0]])
+    problems = verify_replay(replay, count)
+    assert len(problems) == 3   # repeated shot, shot after last ship sank, count
+    replay = create_replay(max_x, max_y, ship_grid, shot_history[:-1])
+    assert verify_replay(replay, count - 1, False) == []
+    assert len(verify_replay(replay, count - 1)) == 1
+
+
+def test_logged_game_replays_with_its_fleet(tmp_path):
+    filename = tmp_path / "shots.bin"
+    run_games(5, 10, 10, 1, "random_smart", seed = 6, log_file = filename)
+    (max_x, max_y, ship_grid, shot_history, count, grids) = record_game(6, 3)
+
+    (logged_history, logged) = read_logged_game(filename, 3, max_x)
+    assert logged_history == shot_history
+    assert check_logged_results(ship_grid, logged_history, logged) == []
+    assert replay_grid(create_replay(max_x, max_y, ship_grid, logged_history), count) == grids[-1]
+
+    (other_grid, timeout) = place_ships(max_x, max_y, create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)[2],
+                                        setup_ships(1), create_rng(6, 4))
+    assert check_logged_results(other_grid, logged_history, logged) != []
+
+
+def test_unreadable_saved_game_is_reported(tmp_path, monkeypatch, capsys):
+    (tmp_path / "bad.sav").write_bytes(b"not a game")
+    for name in ("bad.sav", "missing.sav"):
+        monkeypatch.setattr(sys, "argv", ["replay.py", f"load={tmp_path / name}"])
+        main()
+        assert "COULD NOT BE READ:" in capsys.readouterr().out
@@ -0,0 +1,69 @@
+""" Saved games decode to what was encoded and resume exactly where they stopped. """
+
+import pytest
+from savegame import *
+
+
+def start_game(seed, game, num = 2):
+    """Place a fleet the way savegame.py main does and return an unplayed game"""
+    (max_x, max_y) = set_grid_size(10, 10)
+    ships = setup_ships(num)
+    (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+    layout = []
+    (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(seed, game), layout)
+    assert not timeout
+    (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+    return (max_x, max_y, ships, ship_grid, shot_grid, [], 0, layout)
+
+
+def test_encode_decode_round_trip():
+    (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, layout) = start_game(4, 2)
+    params = {"hunt_spacing": 3, "line_first": 0}
+    (count, remaining) = resume_game(max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, "random_smart",
+                                     layout, 4, 2, params, 25)
+    data = encode_game(max_x, max_y, ships, layout, shot_grid, shot_history, count, "random_smart", 4, 2, params)
+
+    decoded = decode_game(data)
+    assert decoded == (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, "random_smart",
+                       [(char, tuple(sorted(spots))) for (char, spots) in layout], "4", 2, params)
+    (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, pattern, layout, seed, game, params) = decoded
+    assert encode_game(max_x, max_y, ships, layout, shot_grid, shot_history, count, pattern, seed, game, params) == data
+
+
+@pytest.mark.parametrize("pattern", ["random", "random_smart", "density", "lattice", "top_left_to_bottom_right"])
+def test_resumed_game_matches_uninterrupted_game(tmp_path, pattern):
+    (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, layout) = start_game(9, 1)
+    (count, remaining) = resume_game(max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, pattern, layout, 9, 1, {})
+
+    (max_x, max_y, ships, ship_grid, part_grid, part_history, part_count, layout) = start_game(9, 1)
+    resume_game(max_x, max_y, ships, ship_grid, part_grid, part_history, part_count, pattern, layout, 9, 1, {}, 20)
+    save_game(tmp_path / "game.sav", max_x, max_y, ships, layout, part_grid, part_history, 20, pattern, 9, 1, {})
+    loaded = load_game(tmp_path / "game.sav")
+    (resumed_count, resumed_remaining) = resume_game(*loaded)
+
+    assert (resumed_count, resumed_remaining) == (count, remaining)
+    assert loaded[5] == shot_history
+    assert loaded[4] == shot_grid
+
+
+def test_history_that_does_not_replay_is_rejected():
+    (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, layout) = start_game(9, 1)
+    (count, remaining) = resume_game(max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, "random", layout, 9, 1, {}, 10)
+    with pytest.raises(ValueError):
+        rebuild_shot_state(max_x, max_y, ships, ship_grid, layout, shot_history, "random", 10, 1, {})
+
+
+def test_other_files_are_rejected():
+    with pytest.raises(ValueError):
+        decode_game(b"BSLG\x01" + bytes(40))
+    (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, layout) = start_game(1, 0)
+    data = bytearray(encode_game(max_x, max_y, ships, layout, shot_grid, shot_history, count, "random", 1, 0, {}))
+    data[4] = SAVE_VERSION + 1
+    with pytest.raises(ValueError):
+        decode_game(bytes(data))
+
+
+def test_game_without_settings_saves_empty_settings():
+    (max_x, max_y, ships, ship_grid, shot_grid, shot_history, count, layout) = start_game(4, 0)
+    data = encode_game(max_x, max_y, ships, layout, shot_grid, shot_history, count, "random", 4, 0, None)
+    assert decode_game(data)[-1] == {}
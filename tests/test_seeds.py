@@ -0,0 +1,41 @@
+""" Seeded runs repeat exactly and every game has its own streams (see create_rng). """
+
+from battleship import *
+from tournament import run_tournament
+
+
+def shot_counts(stats):
+    """Return statistics of a run without the wall time, which never repeats"""
+    return {key: value for (key, value) in stats.items() if key != "seconds"}
+
+
+def test_same_seed_and_stream_give_same_draws():
+    assert [create_rng(7, 3).random() for n in range(5)] == [create_rng(7, 3).random() for n in range(5)]
+    assert create_rng(7, 3).random() != create_rng(7, 4).random()
+    assert create_rng("7", 3).random() == create_rng(7, 3).random()
+
+
+def test_seeded_runs_repeat():
+    for pattern in ("random", "random_smart", "density", "lattice"):
+        first = run_games(50, 10, 10, 1, pattern, seed = 11)
+        again = run_games(50, 10, 10, 1, pattern, seed = 11)
+        assert shot_counts(first) == shot_counts(again)
+
+
+def test_single_game_repeats_on_its_own():
+    batch = run_games(20, 10, 10, 1, "random_smart", seed = 5)
+    longest = run_games(1, 10, 10, 1, "random_smart", seed = 5, first_game = batch["max_game"])
+    assert longest["max"] == batch["max"]
+
+
+def test_backends_play_the_same_games():
+    for pattern in ("random_smart", "density", "top_left_to_bottom_right"):
+        grid = run_games(40, 10, 10, 2, pattern, seed = 3, backend = "grid")
+        bitboard = run_games(40, 10, 10, 2, pattern, seed = 3, backend = "bitboard")
+        assert shot_counts(grid) == shot_counts(bitboard)
+
+
+def test_tournament_plays_the_games_of_a_run():
+    (totals, worker_stats, timeouts, seconds) = run_tournament(30, 10, 10, 1, ["random_smart", "density"], 1, 10, 9)
+    for pattern in ("random_smart", "density"):
+        assert shot_counts(totals[(pattern, 10, 10)]) == shot_counts(run_games(30, 10, 10, 1, pattern, seed = 9))
@@ -0,0 +1,77 @@
+""" The game server answers shots exactly and bots play it like batch games. """
+
+import asyncio
+from server import *
+
+
+def test_shots_report_every_ship_sunk_once():
+    state = create_server_state(2)
+    game = new_game(state, 10, 10, 1)
+    results = []
+    for (ship, ship_type, char, spots) in game["registry"]["ships"]:
+        for c in spots:
+            reply = take_shot(game, c % 10 + 1, c // 10 + 1)
+            results.append(reply["result"])
+        assert (reply["type"], reply["spots"]) == (ship_type, [[c % 10 + 1, c // 10 + 1] for c in spots])
+    assert results.count("sunk") == len(game["ships"])
+    assert results.count("hit") == count_ship_cells(game["ships"]) - len(game["ships"])
+    (ship, ship_type, char, spots) = game["registry"]["ships"][0]
+    reply = take_shot(game, spots[0] % 10 + 1, spots[0] // 10 + 1)
+    assert reply["result"] == "repeat" and reply["game_over"]
+
+
+def test_bot_games_play_like_batch_games():
+    async def play():
+        (state, listener) = await start_server(SERVER_HOST, 0, 4)
+        port = listener.sockets[0].getsockname()[1]
+        (reader, writer) = await asyncio.open_connection(SERVER_HOST, port)
+        counts = []
+        while len(counts) < 5:
+            (count, latencies) = await play_bot_game(reader, writer, "random_smart", 10, 10, 1, create_rng(4, len(counts), "random_smart"))
+            counts.append(count)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return counts
+
+    counts = asyncio.run(play())
+    stats = run_games(5, 10, 10, 1, "random_smart", seed = 4)
+    assert (len(counts), sum(counts), min(counts), max(counts)) == (stats["games"], stats["shots"], stats["min"], stats["max"])
+
+
+def test_bot_keeps_result_of_repeated_spot_and_reports_failed_games(monkeypatch):
+    def next_shot(shot_state):
+        if shot_state["first_hit"] is not None and not shot_state["repeated"]:
+            shot_state["repeated"] = True
+            return shot_state["first_hit"]   # server answers "repeat"
+        return pool_random_choice(shot_state["all"], shot_state["rng"])
+
+    def observe(shot_state, x, y, hit, event):
+        shot_state["seen"].append(((x, y), hit))
+        if hit and shot_state["first_hit"] is None:
+            shot_state["first_hit"] = (x, y)
+
+    def reset(shot_state):
+        shot_state["first_hit"] = None
+        shot_state["repeated"] = False
+        shot_state["seen"] = seen
+
+    seen = []
+    monkeypatch.setitem(SHOT_STRATEGIES, "repeat_first_hit", create_strategy("repeat_first_hit", next_shot, observe, reset))
+
+    async def play():
+        (state, listener) = await start_server(SERVER_HOST, 0, 4)
+        port = listener.sockets[0].getsockname()[1]
+        (reader, writer) = await asyncio.open_connection(SERVER_HOST, port)
+        played = await play_bot_game(reader, writer, "repeat_first_hit", 10, 10, 1, create_rng(4, 0))
+        failed = await play_bot_game(reader, writer, "repeat_first_hit", 5, 5, 25, create_rng(4, 1))
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return (played, failed)
+
+    (played, failed) = asyncio.run(play())
+    first_hit = next(xy for (xy, hit) in seen if hit)
+    assert [hit for (xy, hit) in seen if xy == first_hit] == [True, True]
+    assert played[0] == len(seen)
+    assert failed is None
@@ -0,0 +1,71 @@
+""" Shot logs read back every shot written, in order. """
+
+import pytest
+import sys
+from battleship import *
+
+
+def test_records_read_back_in_order(tmp_path):
+    filename = tmp_path / "shots.bin"
+    shots = [(0, 3, 4, True, "A"), (0, 1, 1, False, EMPTY_CHAR), (70000, 26, 26, True, "e")]
+    shot_log = open_shot_log(filename)
+    for (game_id, x, y, hit, char) in shots[:2]:
+        log_shot(shot_log, game_id, 26, x, y, hit, char)
+    close_shot_log(shot_log)
+    shot_log = open_shot_log(filename)   # appending writes no second header
+    (game_id, x, y, hit, char) = shots[2]
+    log_shot(shot_log, game_id, 26, x, y, hit, char)
+    close_shot_log(shot_log)
+
+    expected = [(game_id, (y - 1) * 26 + (x - 1), hit, char if hit else "") for (game_id, x, y, hit, char) in shots]
+    assert list(read_shot_log(filename, 2)) == expected
+
+
+def test_partly_written_record_is_ignored(tmp_path):
+    filename = tmp_path / "shots.bin"
+    shot_log = open_shot_log(filename)
+    log_shot(shot_log, 5, 10, 2, 3, True, "B")
+    shot_log.write(b"\x01\x02\x03")   # writer stopped part way through a record
+    close_shot_log(shot_log)
+    assert list(read_shot_log(filename)) == [(5, 21, True, "B")]
+
+
+@pytest.mark.parametrize("backend, pattern", [("grid", "random_smart"), ("bitboard", "random_smart"), ("bitboard", "random")])
+def test_batch_log_holds_every_shot_of_every_game(tmp_path, backend, pattern):
+    filename = tmp_path / "shots.bin"
+    stats = run_games(10, 10, 10, 1, pattern, 2, backend, filename)
+    records = list(read_shot_log(filename))
+    assert len(records) == stats["shots"]
+    assert sorted(set(game_id for (game_id, spot, hit, char) in records)) == list(range(10))
+    assert sum(1 for (game_id, spot, hit, char) in records if hit) == 10 * count_ship_cells(setup_ships(1))
+
+
+def test_other_files_are_rejected(tmp_path):
+    filename = tmp_path / "other.bin"
+    filename.write_bytes(b"BSAV\x02")
+    with pytest.raises(ValueError):
+        list(read_shot_log(filename))
+
+
+def test_batch_log_is_closed_when_a_game_fails(tmp_path, monkeypatch):
+    import battleship
+    closed = []
+    monkeypatch.setattr(battleship, "close_shot_log", lambda shot_log: closed.append(shot_log.close()))
+    run_games(2, 5, 5, 25, "random", 1, log_file = tmp_path / "timeout.bin")
+    assert len(closed) == 1
+
+    def fail(*args):
+        raise RuntimeError("game failed")
+    monkeypatch.setattr(battleship, "play_headless_game", fail)
+    with pytest.raises(RuntimeError):
+        run_games(2, 10, 10, 1, "random", 1, log_file = tmp_path / "failed.bin")
+    assert len(closed) == 2
+
+
+def test_displayed_game_closes_its_log_when_placement_times_out(tmp_path, monkeypatch):
+    import battleship
+    closed = []
+    monkeypatch.setattr(battleship, "close_shot_log", lambda shot_log: closed.append(shot_log.close()))
+    monkeypatch.setattr(sys, "argv", ["battleship.py", "x=5", "y=5", "num=25", "pattern=random", "log=" + str(tmp_path / "shots.bin")])
+    main()
+    assert len(closed) == 1
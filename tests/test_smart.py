@@ -0,0 +1,38 @@
+""" random_smart never repeats a spot and sinks a ship soon after hitting it. """
+
+import pytest
+from battleship import *
+
+
+def play_smart_game(max_x, max_y, ships, game):
+    """Play one random_smart game and return (ship_grid, shot_history)"""
+    (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+    (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(3, game))
+    assert not timeout
+    (max_x, max_y, shot_grid) = create_initial_empty_grid(max_x, max_y, NO_SHOT_CHAR)
+    shot_state = create_shot_state(max_x, max_y, ships, create_rng(3, game, "random_smart"))
+    count = 0
+    last_hit_xy = (0, 0)
+    last_shot_xy = (0, 0)
+    shot_history = []
+    remaining = count_ship_cells(ships)
+    while remaining > 0:
+        (count, last_hit_xy, last_shot_xy, shot_history, remaining) = play_game(max_x, max_y, ship_grid, shot_grid, "random_smart", count, last_hit_xy, last_shot_xy, shot_history, remaining, shot_state, True)
+    assert count == len(shot_history)
+    return (ship_grid, shot_history)
+
+
+@pytest.mark.parametrize("size, num", [(5, 1), (10, 1), (10, 3)])
+def test_no_spot_is_shot_twice(size, num):
+    for game in range(20):
+        (ship_grid, shot_history) = play_smart_game(size, size, setup_ships(num), game)
+        assert len(set(shot_history)) == len(shot_history)
+
+
+def test_lone_ship_sinks_soon_after_first_hit():
+    # First hit and four more hits, at most three probes beside the first hit miss and one shot passes an end
+    ships = [("aircraft carrier", "A", 5)]
+    for game in range(50):
+        (ship_grid, shot_history) = play_smart_game(10, 10, ships, game)
+        first_hit = next(n for (n, (x, y)) in enumerate(shot_history) if ship_grid[y][x] != EMPTY_CHAR)
+        assert len(shot_history) - first_hit <= 5 + 3 + 1
@@ -0,0 +1,32 @@
+""" Sparse boards show any window of a huge grid and play games without listing its spots. """
+
+from sparse import *
+
+
+def test_window_labels_columns_past_z():
+    board = create_sparse_board(1000, 1000, create_rng(1))
+    board["ships"][(27, 100)] = "A"
+    board["shots"][(28, 100)] = MISS_CHAR
+    rows = sparse_window(board, 24, 99, 6, 3)
+    assert rows[0] == ["___", "X", "Y", "Z", "AA", "AB", "AC"]
+    assert [row[0] for row in rows[1:]] == ["099", "100", "101"]
+    assert rows[2][1:] == [EMPTY_CHAR, EMPTY_CHAR, EMPTY_CHAR, "A", EMPTY_CHAR, EMPTY_CHAR]
+    assert sparse_window(board, 24, 99, 6, 3, False)[2][1:] == [NO_SHOT_CHAR] * 4 + [MISS_CHAR, NO_SHOT_CHAR]
+    assert [column_label(x) for x in (52, 53, 702, 703)] == ["AZ", "BA", "ZZ", "AAA"]
+
+
+def test_window_stops_at_edge_of_grid():
+    board = create_sparse_board(30, 12, create_rng(1))
+    rows = sparse_window(board, 25, 10)
+    assert rows[0][1:] == ["Y", "Z", "AA", "AB", "AC", "AD"]
+    assert len(rows) == 1 + 3
+
+
+def test_game_stops_at_shot_budget():
+    ships = setup_ships(1)
+    (board, timeout) = sparse_place_ships(create_sparse_board(40, 40, create_rng(4)), ships)
+    assert not timeout and len(board["ships"]) == count_ship_cells(ships)
+    assert play_sparse_game(board, "random_smart", 20) == 20
+    assert len(board["shots"]) == 20 and board["remaining"] > 0
+    count = play_sparse_game(board, "random_smart")
+    assert board["remaining"] == 0 and len(board["shots"]) == 20 + count
@@ -0,0 +1,28 @@
+""" Every way of playing looks shot patterns up in SHOT_STRATEGIES. """
+
+import pytest
+from battleship import *
+
+
+@pytest.mark.parametrize("backend", ["grid", "bitboard"])
+def test_registered_strategy_plays_every_backend(monkeypatch, backend):
+    calls = []
+
+    def next_shot(shot_state):
+        calls.append(shot_state["game_id"])
+        return sweep_next_shot(shot_state)
+
+    monkeypatch.setitem(SHOT_STRATEGIES, "counted_sweep", create_strategy("counted_sweep", next_shot))
+    stats = run_games(4, 10, 10, 1, "counted_sweep", seed = 2, backend = backend)
+    assert len(calls) == stats["shots"]
+    assert stats["shots"] == run_games(4, 10, 10, 1, "top_left_to_bottom_right", seed = 2, backend = backend)["shots"]
+
+
+def test_choose_shot_starts_strategy_once_per_game(monkeypatch):
+    resets = []
+    monkeypatch.setitem(SHOT_STRATEGIES, "counted_reset",
+                        create_strategy("counted_reset", sweep_next_shot, None, lambda shot_state: resets.append(1)))
+    shot_state = create_shot_state(5, 5, setup_ships(1))
+    shots = [choose_shot(shot_state, "counted_reset", True) for n in range(3)]
+    assert shots == [(1, 1)] * 3   # nothing marked taken so the sweep stays put
+    assert len(resets) == 1
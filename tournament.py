@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+""" Tournament mode: compare shot patterns over many games using every CPU core.
+    10. Split the requested games into chunks (work units).
+    20. Each worker generates a fleet with place_ships, or reads it from a fleet corpus
+        (see fleets.py), and plays every pattern against it.
+    30. Merge the per-chunk statistics (see gamestats.py) into one table per pattern and per worker.
+    40. Print summary table.
+"""
+
+# Import statements
+from battleship import *
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+import sys
+import time
+
+
+# Set constants
+TOURNAMENT_PATTERNS = ["top_left_to_bottom_right", "random", "random_odd", "random_even", "random_smart", "density"]
+DEFAULT_CHUNK_SIZE = 250  # games per work unit sent to a worker
+
+
+def play_chunk(work):
+    """Play one work unit of games in a worker process
+       Every pattern is played against the same fleet so results are comparable.
+       Fleet of game g is placed with stream create_rng(seed, g) and pattern p shoots
+       with stream create_rng(seed, g, p), so results do not depend on how games
+       are split between work units and workers. With a fleet corpus game g plays
+       fleet g of the corpus instead; a corpus written with the same seed holds the same fleets.
+
+       Parameters:
+       work: tuple of (num_games, max_x, max_y, num_groups, patterns, seed, first_game, fleets);
+             fleets is a corpus file name or None
+
+       Return:
+       (pid, table, timeouts, seconds): worker process id, statistics table with one record
+                                       per pattern (see gamestats.py), number of fleets that
+                                       could not be placed and wall time
+    """
+    (num_games, max_x, max_y, num_groups, patterns, seed, first_game, fleets) = work
+    start = time.perf_counter()
+    corpus = open_fleet_corpus(fleets) if fleets is not None else None
+
+    (max_x, max_y) = set_grid_size(max_x, max_y)
+    ships = setup_ships(num_groups)
+    table = {}
+    for pattern in patterns:
+        table_stats(table, pattern, max_x, max_y)
+    timeouts = 0
+
+    game = first_game
+    while game < first_game + num_games:
+        if corpus is None:
+            (max_x, max_y, empty_grid) = create_initial_empty_grid(max_x, max_y, EMPTY_CHAR)
+            layout = []
+            (ship_grid, timeout) = place_ships(max_x, max_y, empty_grid, ships, create_rng(seed, game), layout)
+        else:
+            (ship_grid, layout, timeout) = load_fleet(corpus, game)
+        if timeout:
+            timeouts = timeouts + 1
+        else:
+            for pattern in patterns:
+                game_start = time.perf_counter()
+                count = play_headless_game(max_x, max_y, ship_grid, pattern, ships, None, game, create_rng(seed, game, pattern), layout)
+                add_game_stats(table[(pattern, max_x, max_y)], count, time.perf_counter() - game_start, game)
+        game = game + 1
+
+    if corpus is not None:
+        close_fleet_corpus(corpus)
+    return (os.getpid(), table, timeouts, time.perf_counter() - start)
+
+
+def split_into_chunks(games, chunk_size):
+    """Split total number of games into work units of at most chunk_size games
+
+       Parameters:
+       games: total number of games
+       chunk_size: maximum games per work unit
+
+       Return:
+       chunks: list of game counts
+    """
+    chunks = []
+    while games > 0:
+        chunks.append(min(chunk_size, games))
+        games = games - chunk_size
+    return chunks
+
+
+def run_tournament(games, max_x, max_y, num_groups, patterns = TOURNAMENT_PATTERNS, workers = None,
+                   chunk_size = DEFAULT_CHUNK_SIZE, seed = None, fleets = None):
+    """Play games for every pattern across a pool of worker processes
+
+       Parameters:
+       games: number of fleets to generate; every pattern plays every fleet
+       max_x: width of grid
+       max_y: height of grid
+       num_groups: number of ship groups passed to setup_ships
+       patterns: list of shot patterns to compare
+       workers: number of worker processes (defaults to one per core)
+       chunk_size: number of games per work unit
+       seed: optional seed; every game has its own streams (see play_chunk)
+       fleets: optional fleet corpus file name; its grid size and ship groups must match
+
+       Return:
+       (totals, worker_stats, timeouts, seconds): merged statistics table with one record per
+           pattern, dictionary of worker pid to (games, seconds), total placement timeouts
+           and overall wall time
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    work = []
+    first_game = 0
+    for chunk in split_into_chunks(games, chunk_size):
+        work.append((chunk, max_x, max_y, num_groups, patterns, seed, first_game, fleets))
+        first_game = first_game + chunk
+
+    totals = {}
+    worker_stats = {}
+    timeouts = 0
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        for (chunk, (pid, table, chunk_timeouts, seconds)) in zip(work, pool.map(play_chunk, work)):
+            merge_stats_tables(totals, table)
+            (worker_games, worker_seconds) = worker_stats.get(pid, (0, 0.0))
+            worker_stats[pid] = (worker_games + chunk[0], worker_seconds + seconds)
+            timeouts = timeouts + chunk_timeouts
+
+    return (totals, worker_stats, timeouts, time.perf_counter() - start)
+
+
+def print_summary(totals, worker_stats, timeouts, seconds):
+    """Print table with one line per pattern and one line per worker
+
+       Parameters:
+       totals: merged statistics table from run_tournament
+       worker_stats: dictionary of worker pid to (games, seconds)
+       timeouts: number of fleets that could not be placed
+       seconds: overall wall time
+
+       Return:
+       nothing
+    """
+    print_stats_table(totals)
+    print("")
+
+    print(f"{'WORKER':<26}{'FLEETS':>9}{'FLEETS/SEC':>12}")
+    for (pid, (games, worker_seconds)) in sorted(worker_stats.items()):
+        rate = games / worker_seconds if worker_seconds > 0 else 0
+        print(f"{pid:<26}{games:>9}{rate:>12.1f}")
+    print("")
+
+    print("WORKERS=", len(worker_stats), "    ", "SETUP TIMEOUTS=", timeouts, "    ", "SECONDS=", round(seconds, 2))
+
+
+def handle_tournament_args(args):
+    """Handle arguments if any
+    Arguments format is:
+    "x=A" where A is width of grid (defaults to 10)
+    "y=B" where B is the height of the grid (defaults to 10)
+    "num=X" for X number of ship groups
+    "games=G" for G number of fleets every pattern plays (defaults to 1000)
+    "workers=W" for W worker processes (defaults to one per core)
+    "chunk=C" for C games per work unit
+    "patterns=P,Q" for comma separated list of patterns to compare
+    "seed=S" for seed S so the tournament can be repeated
+    "fleets=F" to play the fleets of corpus file F (see fleets.py); grid size and ship groups come from F
+
+    Parameters:
+    args: full command line contents
+
+    Return:
+    (x, y, n, games, workers, chunk_size, patterns, seed, fleets): tuple of settings
+    """
+    x = 10
+    y = 10
+    n = 1
+    games = 1000
+    workers = None
+    chunk_size = DEFAULT_CHUNK_SIZE
+    patterns = TOURNAMENT_PATTERNS
+    seed = None
+    fleets = None
+    for arg in args:
+        if arg.startswith("x="):
+            x = int(arg.split('=')[1])
+        if arg.startswith("y="):
+            y = int(arg.split('=')[1])
+        if arg.startswith("num="):
+            n = min(int(arg.split('=')[1]), MAX_SHIP_GROUPS)
+        if arg.startswith("games="):
+            games = int(arg.split('=')[1])
+        if arg.startswith("workers="):
+            workers = int(arg.split('=')[1])
+        if arg.startswith("chunk="):
+            chunk_size = max(int(arg.split('=')[1]), 1)
+        if arg.startswith("patterns="):
+            patterns = arg.split('=')[1].split(',')
+        if arg.startswith("seed="):
+            seed = int(arg.split('=')[1])
+        if arg.startswith("fleets="):
+            fleets = arg.split('=', 1)[1]
+    return (x, y, n, games, workers, chunk_size, patterns, seed, fleets)
+
+
+def main():
+    (x, y, n, games, workers, chunk_size, patterns, seed, fleets) = handle_tournament_args(sys.argv[1:])
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if fleets is not None:
+        try:
+            (x, y, n) = corpus_settings(fleets, games)
+        except (OSError, ValueError) as error:
+            print("FLEETS", fleets, "COULD NOT BE READ:", error)
+            return
+    (totals, worker_stats, timeouts, seconds) = run_tournament(games, x, y, n, patterns, workers, chunk_size, seed, fleets)
+    print_summary(totals, worker_stats, timeouts, seconds)
+    print("SEED=", seed)
+
+if __name__ == "__main__":
+    main()